@@ -1,6 +1,55 @@
 import React, { useState, useEffect } from 'react';
 import { Language } from '../types';
 
+const API_BASE = 'http://localhost:5000/api';
+
+// The whole disease catalog, fetched once (gzip-compressed) and indexed by normalized name and alias
+let catalogRequest: Promise<Record<string, any> | null> | null = null;
+
+// Same keys as the server's index (normalize_name in src/knowledge/disease_catalog.py): word tokens
+// as TOKEN_RE in src/nlp/symptom_extractor.py splits them, with its Indic spelling folds applied
+const NAME_TOKEN_RE = /(?:[\p{L}\p{N}]|[\u0900-\u0963\u0966-\u097F\u0A00-\u0A7F\u200c\u200d])+/gu;
+const INDIC_FOLD_RE = /[\u093c\u0a3c\u0901\u0a02\u200c\u200d]/g;
+const INDIC_FOLD: Record<string, string> = {
+  '\u093c': '', // Devanagari nukta
+  '\u0a3c': '', // Gurmukhi nukta
+  '\u0901': '\u0902', // chandrabindu -> anusvara
+  '\u0a02': '\u0a70', // bindi -> tippi
+  '\u200c': '', // zero-width non-joiner
+  '\u200d': '', // zero-width joiner
+};
+
+const normalizeToken = (token: string) =>
+  /^[\x00-\x7f]*$/.test(token) ? token : token.normalize('NFD').replace(INDIC_FOLD_RE, (c) => INDIC_FOLD[c]);
+
+const normalizeName = (name: string) =>
+  (name.normalize('NFKC').toLowerCase().match(NAME_TOKEN_RE) ?? []).map(normalizeToken).join(' ');
+
+const loadCatalog = () => {
+  if (!catalogRequest) {
+    catalogRequest = fetch(`${API_BASE}/diseases`)
+      .then((res) => (res.ok ? res.json() : null))
+      .then((data) => {
+        if (!data || !data.success) return null;
+        const byName: Record<string, any> = {};
+        data.diseases.forEach((disease: any) => {
+          byName[disease.name] = disease;
+        });
+        const index: Record<string, any> = {};
+        Object.entries(data.aliases).forEach(([alias, name]) => {
+          index[alias] = byName[name as string];
+        });
+        return index;
+      })
+      .catch(() => {
+        // Try again on the next modal; this one falls back to /api/disease
+        catalogRequest = null;
+        return null;
+      });
+  }
+  return catalogRequest;
+};
+
 interface DiseaseModalProps {
   diseaseLabel: string;
   isOpen: boolean;
@@ -20,8 +69,13 @@ export const DiseaseModal: React.FC<DiseaseModalProps> = ({
   useEffect(() => {
     if (isOpen && diseaseLabel) {
       setLoading(true);
-      fetch(`http://localhost:5000/api/disease?name=${encodeURIComponent(diseaseLabel)}`)
-        .then((res) => res.json())
+      loadCatalog()
+        .then(
+          (catalog) =>
+            catalog?.[normalizeName(diseaseLabel)] ??
+            // Not in the catalog as written (e.g. misspelled): the server corrects the name
+            fetch(`${API_BASE}/disease?name=${encodeURIComponent(diseaseLabel)}`).then((res) => res.json())
+        )
         .then((data) => {
           setDiseaseData(data);
           setLoading(false);
@@ -3,44 +3,217 @@
 """
 Flask API server that wraps the orchestrator.py functionality.
 Provides REST endpoints for the React frontend to interact with the local chatbot.
+Subsystems (chat, voice, medicine, records) are loaded on first use, see
+components.py; importing this module only loads Flask.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, send_file, g
 from flask_cors import CORS
 import os
 import sys
 import json
 import time
+import threading
 from werkzeug.utils import secure_filename
 
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# Import orchestrator functions - use simple version
-try:
-    from orchestrator_simple import analyze
-except ImportError:
-    # Fallback if simple version not available
-    from orchestrator import analyze
-
-# Import voice processor
-VOICE_ENABLED = False
-try:
-    from voice_processor import get_voice_processor
-    VOICE_ENABLED = True
-    print("[API] Voice processing enabled")
-except (ImportError, ModuleNotFoundError, Exception) as e:
-    VOICE_ENABLED = False
-    print(f"[API] Voice processing not available: {str(e)}")
+import components
+from components import ComponentUnavailable
+import metrics
+# Standard library only; the worker pool itself is created on first use
+from voice_jobs import VoiceQueueFull
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
+# Voice job settings
+LANG_CODES = {'en': 'EN', 'hi': 'HI', 'pa': 'PA'}
+VOICE_REQUEST_TIMEOUT = float(os.environ.get('SEHAT_VOICE_TIMEOUT', '30'))
+
+# Streaming transcription: bytes read from the upload per recognizer feed
+# (250 ms of 16 kHz 16-bit mono) and concurrent streams per server process
+STREAM_CHUNK_BYTES = int(os.environ.get('SEHAT_STREAM_CHUNK_BYTES', '8000'))
+MAX_TRANSCRIBE_STREAMS = int(os.environ.get('SEHAT_MAX_TRANSCRIBE_STREAMS', '8'))
+_stream_slots = threading.BoundedSemaphore(MAX_TRANSCRIBE_STREAMS)
+
+# Batch chat limits
+MAX_BATCH_SIZE = int(os.environ.get('SEHAT_MAX_BATCH_SIZE', '500'))
+BATCH_CHUNK_SIZE = int(os.environ.get('SEHAT_BATCH_CHUNK_SIZE', '32'))
+
+# Seconds browsers may reuse a disease response before revalidating it with its ETag
+DISEASE_MAX_AGE = int(os.environ.get('SEHAT_DISEASE_MAX_AGE', '3600'))
+
+
+def analyze(transcript, age=None, sex=None):
+    return components.chat.get().analyze(transcript=transcript, age=age, sex=sex)
+
+
+def analyze_many(records):
+    return components.chat.get().analyze_many(records)
+
+
+def _unavailable_response(error):
+    """503 for a component that is disabled here or could not be loaded"""
+    return jsonify({"success": False, "error": str(error)}), 503
+
+
+def format_chat_response(message, result):
+    """Shape an orchestrator result the way /api/chat returns it"""
+    return {
+        "success": True,
+        "message": message,
+        "result": result,
+        # Extract key fields for easier frontend access
+        "diagnoses": result.get("diagnoses", []),
+        "triage": result.get("overall_triage"),
+        "overall_triage": result.get("overall_triage"),
+        "symptoms_extracted": result.get("symptoms_extracted", []),
+        "precautions": result.get("mapped_precautions", {})
+    }
+
+# Set once warmup() has run; /api/ready reports 503 until then
+_ready = threading.Event()
+# Preloaded components that failed to load in warmup(); /api/ready reports 503 while any did
+_warmup_failures = {}
+
+
+def warmup():
+    """
+    Load the enabled fork-safe components and run one analysis, so lazy
+    structures and caches are built before serving. If one of them fails,
+    the server stays not ready. With SEHAT_LAZY=1 the server is ready at
+    once and components load on first use instead.
+    """
+    if _ready.is_set():
+        return
+    started = time.time()
+    failures = {} if components.LAZY_START else components.warm_all()
+    if failures:
+        _warmup_failures.update(failures)
+        print(f"[API] Warmup failed ({', '.join(failures)}); not ready")
+        return
+    _ready.set()
+    print(f"[API] Warmup complete in {time.time() - started:.2f}s")
+
+
+# Request instrumentation: one histogram observation per response, plus an
+# opt-in sampling profile of the request when X-Sehat-Profile is sent
+PROFILE_HEADER = 'X-Sehat-Profile'
+
+
+def _endpoint_label():
+    """Route template (bounded label cardinality), not the concrete path"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+    if metrics.PROFILING_ENABLED and request.headers.get(PROFILE_HEADER, '').lower() in ('1', 'true', 'yes'):
+        g.profiler = metrics.Profiler().start()
+
+
+@app.after_request
+def _record_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, _endpoint_label(),
+                                        request.method, str(response.status_code))
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.stop()
+        response.headers[f'{PROFILE_HEADER}-Id'] = profiler.id
+        response.headers[f'{PROFILE_HEADER}-Samples'] = str(profiler.sample_count)
+    return response
+
+
+@app.teardown_request
+def _count_exception(error):
+    if error is not None:
+        metrics.REQUEST_EXCEPTIONS.inc(_endpoint_label())
+
+
+def _collect_runtime_metrics():
+    """Scrape-time gauges: cache counters, voice queue depth, streaming slots"""
+    # Only report what exists; scraping must not load a component, create
+    # the TTS cache or start the voice worker pool
+    yield ('sehat_component_loaded', 'gauge', 'Whether each server component is loaded (1) or not (0)',
+           [({'component': c.name, 'status': c.status()}, int(c.loaded)) for c in components.COMPONENTS])
+
+    orchestrator = components.chat.peek()
+    voice = components.voice.peek()
+    caches = {}
+    if orchestrator is not None:
+        caches['analysis'] = orchestrator.analysis_cache.stats()
+        correct = getattr(orchestrator.symptom_extractor, '_correct', None)
+        if correct is not None:
+            info = correct.cache_info()
+            caches['fuzzy_correction'] = {'hits': info.hits, 'misses': info.misses}
+    if voice is not None and voice.tts_module._tts_cache is not None:
+        caches['tts'] = voice.tts_module._tts_cache.stats()
+    if caches:
+        yield from metrics.cache_family('sehat_cache', 'Cache', caches)
+    if orchestrator is not None:
+        yield ('sehat_cache_entries', 'gauge', 'Entries held by the analysis cache',
+               [({'cache': 'analysis'}, caches['analysis']['size'])])
+        knowledge = orchestrator.knowledge.stats()
+        yield ('sehat_knowledge_version_info', 'gauge', 'Knowledge version in use',
+               [({'version': str(knowledge['version'])}, 1)])
+        yield ('sehat_knowledge_reloads_total', 'counter', 'Knowledge hot reloads, by outcome',
+               [({'outcome': 'success'}, knowledge['reloads']), ({'outcome': 'failure'}, knowledge['failures'])])
+        yield ('sehat_knowledge_loaded_timestamp_seconds', 'gauge', 'When the knowledge in use was loaded',
+               [({}, knowledge['loaded_at'])])
+
+    in_use = MAX_TRANSCRIBE_STREAMS - _stream_slots._value
+    yield ('sehat_transcribe_streams', 'gauge', 'Streaming transcriptions in progress', [({}, in_use)])
+    yield ('sehat_transcribe_streams_max', 'gauge', 'Streaming transcription slots', [({}, MAX_TRANSCRIBE_STREAMS)])
+
+    if voice is not None and voice.jobs_module._voice_jobs is not None:
+            stats = voice.jobs_module._voice_jobs.stats()
+            yield ('sehat_voice_queue_depth', 'gauge', 'Voice jobs submitted but not finished', [({}, stats['pending'])])
+            yield ('sehat_voice_queue_capacity', 'gauge', 'Voice jobs admitted at once', [({}, stats['queue_size'])])
+            yield ('sehat_voice_workers', 'gauge', 'Voice worker processes', [({}, stats['workers'])])
+            yield ('sehat_voice_jobs_submitted_total', 'counter', 'Voice jobs accepted', [({}, stats['submitted'])])
+            yield ('sehat_voice_jobs_rejected_total', 'counter', 'Voice jobs rejected with a full queue',
+                   [({}, stats['rejected'])])
+
+
+metrics.REGISTRY.add_collector(_collect_runtime_metrics)
+
+
+@app.route('/api/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Metrics of the server (all workers, see metrics.py) in the Prometheus text exposition format"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Folded stacks of a request profiled with X-Sehat-Profile: 1 (needs SEHAT_PROFILING=1)"""
+    folded = metrics.folded_profile(profile_id) if metrics.PROFILING_ENABLED else None
+    if folded is None:
+        return jsonify({"success": False, "error": "Profile not found"}), 404
+    return Response(folded, mimetype='text/plain')
+
+
 # Health check endpoint
 @app.route('/api/health', methods=['GET'])
 def health():
-    """Health check endpoint"""
-    return jsonify({"status": "ok", "message": "API server is running"}), 200
+    """Liveness check; reports component states without loading any"""
+    return jsonify({"status": "ok", "message": "API server is running",
+                    "components": components.statuses()}), 200
+
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness probe: 200 only after warmup has loaded every preloaded component"""
+    if _warmup_failures:
+        return jsonify({"status": "failed", "ready": False, "failures": _warmup_failures}), 503
+    if not _ready.is_set():
+        return jsonify({"status": "starting", "ready": False}), 503
+    return jsonify({"status": "ok", "ready": True}), 200
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -87,20 +260,15 @@ def chat():
         result = analyze(transcript=message, age=age, sex=sex)
         
         # Format response
-        response = {
-            "success": True,
-            "message": message,
-            "result": result,
-            # Extract key fields for easier frontend access
-            "diagnoses": result.get("diagnoses", []),
-            "triage": result.get("overall_triage"),
-            "overall_triage": result.get("overall_triage"),
-            "symptoms_extracted": result.get("symptoms_extracted", []),
-            "precautions": result.get("mapped_precautions", {})
-        }
+        response = format_chat_response(message, result)
         
-        return jsonify(response), 200
+        started = time.perf_counter()
+        body = jsonify(response)
+        metrics.SERIALIZE_SECONDS.observe(time.perf_counter() - started, 'chat')
+        return body, 200
     
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
     except Exception as e:
         print(f"Error in /api/chat: {str(e)}")
         import traceback
@@ -110,18 +278,146 @@ def chat():
             "error": str(e)
         }), 500
 
+def _read_batch_records():
+    """Parse a batch body: a JSON array, {"records": [...]}, or NDJSON lines"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        lines = request.get_data(as_text=True).splitlines()
+        return [json.loads(line) for line in lines if line.strip()]
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get('records')
+    if not isinstance(data, list):
+        raise ValueError("Expected a JSON array of chat records")
+    return data
+
+
+def _analyze_batch_chunk(chunk):
+    """Run one chunk of (index, record) pairs and yield (index, response)"""
+    pending = []
+    for index, record in chunk:
+        message = str(record.get('message', '') if isinstance(record, dict) else '').strip()
+        if not message:
+            yield index, {"success": False, "index": index, "error": "Message cannot be empty"}
+            continue
+        pending.append((index, message, record))
+    results = analyze_many([
+        {'transcript': message, 'age': record.get('age'), 'sex': record.get('sex')}
+        for _, message, record in pending
+    ])
+    for (index, message, _), result in zip(pending, results):
+        yield index, {"index": index, **format_chat_response(message, result)}
+
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Process many queued consultations in one request.
+    
+    Request: JSON array (or {"records": [...]}) of /api/chat bodies, or
+    NDJSON with one body per line (Content-Type: application/x-ndjson).
+    
+    Response: {"success": true, "results": [...]} in input order, or NDJSON
+    streamed chunk by chunk when the request is NDJSON or the client sends
+    Accept: application/x-ndjson. Every result carries its input "index".
+    """
+    try:
+        records = _read_batch_records()
+    except Exception as e:
+        return jsonify({"success": False, "error": f"Invalid batch body: {str(e)}"}), 400
+
+    if not components.chat.enabled:
+        return _unavailable_response("The chat component is disabled on this server")
+    if len(records) > MAX_BATCH_SIZE:
+        return jsonify({
+            "success": False,
+            "error": f"Batch too large ({len(records)} > {MAX_BATCH_SIZE})"
+        }), 413
+
+    indexed = list(enumerate(records))
+    chunks = [indexed[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(indexed), BATCH_CHUNK_SIZE)]
+
+    wants_stream = (request.mimetype == 'application/x-ndjson'
+                    or request.accept_mimetypes.best == 'application/x-ndjson')
+    if wants_stream:
+        def generate():
+            try:
+                for chunk in chunks:
+                    for _, response in _analyze_batch_chunk(chunk):
+                        yield json.dumps(response, ensure_ascii=False) + '\n'
+            except Exception as e:
+                # Headers are already sent: the failure is reported as the last line
+                print(f"Error in /api/chat/batch stream: {str(e)}")
+                yield json.dumps({"success": False, "error": str(e)}, ensure_ascii=False) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    try:
+        results = [None] * len(records)
+        for chunk in chunks:
+            for index, response in _analyze_batch_chunk(chunk):
+                results[index] = response
+        started = time.perf_counter()
+        body = jsonify({"success": True, "count": len(results), "results": results})
+        metrics.SERIALIZE_SECONDS.observe(time.perf_counter() - started, 'chat_batch')
+        return body, 200
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        print(f"Error in /api/chat/batch: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """Analysis cache counters (hits, misses, evictions, hit ratio) and knowledge reloads"""
+    try:
+        orchestrator = components.chat.get()
+        return jsonify({
+            "success": True,
+            "knowledge_version": orchestrator.knowledge.version,
+            "knowledge": orchestrator.knowledge.stats(),
+            "analysis_cache": orchestrator.analysis_cache.stats()
+        }), 200
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/knowledge/reload', methods=['POST'])
+def knowledge_reload():
+    """Rebuild the knowledge from the data files now instead of waiting for the next poll.
+    Query param force=1 rebuilds even if no file changed.
+    """
+    try:
+        orchestrator = components.chat.get()
+        force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+        failures = orchestrator.knowledge.failures
+        swapped = orchestrator.reload_knowledge(force=force)
+        knowledge = orchestrator.knowledge.stats()
+        if knowledge['failures'] > failures:
+            return jsonify({"success": False, "error": knowledge['last_error'], "knowledge": knowledge}), 500
+        return jsonify({"success": True, "reloaded": swapped, "knowledge": knowledge}), 200
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 # Diagnostic endpoint to get symptoms list
 @app.route('/api/symptoms', methods=['GET'])
 def get_symptoms():
     """Get list of all known symptoms"""
     try:
-        from orchestrator import symptom_dict
-        symptoms = list(symptom_dict.keys())
+        symptoms = list(components.chat.get().symptom_dict.keys())
         return jsonify({
             "success": True,
             "symptoms": symptoms,
             "count": len(symptoms)
         }), 200
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
     except Exception as e:
         return jsonify({
             "success": False,
@@ -129,63 +425,129 @@ def get_symptoms():
         }), 500
 
 
+def _catalog_response(body, etag, encoding=None):
+    """A prebuilt catalog body with its ETag; 304 when the client already has it"""
+    response = Response(body, mimetype='application/json')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = DISEASE_MAX_AGE
+    return response.make_conditional(request)
+
+
 @app.route('/api/disease', methods=['GET'])
 def get_disease():
     """Return disease information by name (query param: name)
     Example: /api/disease?name=Malaria
+    Names match case-insensitively, by alias and with spelling correction
+    ("maleria"); known diseases are answered with a prebuilt body and ETag.
     """
     try:
         name = request.args.get('name')
         if not name:
             return jsonify({"success": False, "error": "Missing 'name' query parameter"}), 400
 
-        import orchestrator
-        
-        # Get disease description from knowledge base
-        disease_info = orchestrator.knowledge_loader.get_disease_info(name)
-        
-        # Get precautions for disease
-        precautions = orchestrator.precaution_loader.get_precautions(name)
-        
-        # Build response
-        response_data = {
-            "name": name,
-            "description": disease_info if isinstance(disease_info, str) else f"Information about {name}",
-            "symptoms": [],  # Could be populated from disease_info if structured
-            "precautions": precautions if precautions else [],
-            "recommendations": [
-                "Consult with a qualified healthcare professional",
-                "Do not self-diagnose or self-medicate",
-                "Follow medical advice from licensed practitioners"
-            ]
-        }
-        
-        return jsonify({"success": True, **response_data}), 200
+        catalog = components.chat.get().knowledge.current().catalog
+        entry = catalog.lookup(name)
+        if entry is None:
+            return jsonify({"success": True, **catalog.unknown(name)}), 200
+        return _catalog_response(entry.body, entry.etag)
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/diseases', methods=['GET'])
+def get_diseases():
+    """The whole disease catalog in one response, for clients to prefetch.
+    Body: {"diseases": [<as /api/disease>], "aliases": {normalized name: disease name}};
+    gzip-encoded when the client accepts it.
+    """
+    try:
+        catalog = components.chat.get().knowledge.current().catalog
+        if request.accept_encodings['gzip']:
+            response = _catalog_response(catalog.gzip_body, catalog.etag + '-gzip', encoding='gzip')
+        else:
+            response = _catalog_response(catalog.body, catalog.etag)
+        response.vary.add('Accept-Encoding')
+        return response
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+RECORDS_DB_PATH = components.RECORDS_DB_PATH
+
+
 @app.route('/api/health-record', methods=['POST'])
 def save_health_record():
     """Save uploaded health record metadata (framework).
-    Accepts JSON: { 'patient_id': str, 'title': str, 'notes': str }
+    Accepts JSON: { 'patient_id': str, 'title': str, 'notes': str }; title is required.
     Files/uploads can be added later.
     """
     try:
-        data = request.get_json() or {}
-        patient_id = data.get('patient_id', 'anonymous')
-        title = data.get('title', 'record')
-        notes = data.get('notes', '')
-
-        records_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'records')
-        os.makedirs(records_dir, exist_ok=True)
-        timestamp = int(time.time())
-        filename = f"{patient_id}_{timestamp}.json"
-        filepath = os.path.join(records_dir, filename)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({'patient_id': patient_id, 'title': title, 'notes': notes, 'created_at': timestamp}, f, ensure_ascii=False, indent=2)
-
-        return jsonify({"success": True, "message": "Health record saved", "file": filename}), 200
+        store = components.records.get()
+
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict):
+            return jsonify({"success": False, "error": "Expected a JSON object"}), 400
+        patient_id = data.get('patient_id') or 'anonymous'
+        title = data.get('title')
+        notes = data.get('notes') or ''
+        if not isinstance(title, str) or not title.strip():
+            return jsonify({"success": False, "error": "'title' is required"}), 400
+        if not isinstance(patient_id, str) or not isinstance(notes, str):
+            return jsonify({"success": False, "error": "'patient_id' and 'notes' must be strings"}), 400
+
+        record = store.add(patient_id, title, notes)
+
+        return jsonify({"success": True, "message": "Health record saved", "id": record['id'], "record": record}), 200
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/health-record/<int:record_id>', methods=['GET'])
+def get_health_record(record_id):
+    """Fetch one health record by ID"""
+    try:
+        record = components.records.get().get(record_id)
+        if record is None:
+            return jsonify({"success": False, "error": "Record not found"}), 404
+        return jsonify({"success": True, "record": record}), 200
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@app.route('/api/health-records', methods=['GET'])
+def list_health_records():
+    """List health records, newest first.
+    Query params: ?patient_id=p1&since=<epoch>&until=<epoch>&limit=50&cursor=<next_cursor>
+    """
+    try:
+        records, next_cursor = components.records.get().query(
+            patient_id=request.args.get('patient_id'),
+            since=request.args.get('since', type=float),
+            until=request.args.get('until', type=float),
+            limit=request.args.get('limit', 50, type=int),
+            cursor=request.args.get('cursor')
+        )
+        return jsonify({
+            "success": True,
+            "count": len(records),
+            "records": records,
+            "next_cursor": next_cursor
+        }), 200
+    except ValueError as e:
+        return jsonify({"success": False, "error": f"Invalid query: {str(e)}"}), 400
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -193,15 +555,15 @@ def save_health_record():
 @app.route('/api/medicine-search', methods=['GET'])
 def medicine_search():
     """Search for medicine availability near user location.
-    Query params: ?medicine=paracetamol&lat=30.98&lon=75.35
-    Returns pharmacies with stock information, sorted by availability and distance.
+    Query params: ?medicine=paracetamol&lat=30.98&lon=75.35&radius_km=25&k=10
+    Returns up to k pharmacies holding the medicine within radius_km, nearest first.
     """
     try:
-        from src.medicine.medicine_service import get_medicine_service
-        
         medicine = request.args.get('medicine', '').strip()
         user_lat = request.args.get('lat', type=float)
         user_lon = request.args.get('lon', type=float)
+        radius_km = request.args.get('radius_km', type=float)
+        k = request.args.get('k', type=int)
         
         if not medicine:
             return jsonify({
@@ -210,10 +572,12 @@ def medicine_search():
             }), 400
         
         # Get medicine service and search
-        service = get_medicine_service()
-        result = service.search_medicine(medicine, user_lat, user_lon)
+        service = components.medicine.get()
+        result = service.search_medicine(medicine, user_lat, user_lon, radius_km=radius_km, k=k)
         
         return jsonify(result), (200 if result.get('success') else 404)
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
     except Exception as e:
         print(f"[ERROR] Medicine search failed: {str(e)}")
         import traceback
@@ -221,6 +585,36 @@ def medicine_search():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@app.route('/api/medicine/stock', methods=['POST'])
+def medicine_stock_update():
+    """Apply pharmacy stock deltas without a restart.
+    Body: NDJSON (one delta per line) or a JSON array of deltas, e.g.
+    {"pharmacy_id": "P1", "medicine_name": "Paracetamol", "quantity": 30}
+    {"pharmacy_id": "P1", "medicine_name": "Paracetamol", "delta": -2}
+    """
+    try:
+        service = components.medicine.get()
+        from src.medicine.stock_ingest import parse_ndjson
+
+        if request.mimetype == 'application/json':
+            records = request.get_json()
+            if not isinstance(records, list):
+                return jsonify({"success": False, "error": "Expected a JSON array of stock deltas"}), 400
+        else:
+            try:
+                records = parse_ndjson(request.get_data(as_text=True))
+            except ValueError as e:
+                return jsonify({"success": False, "error": f"Invalid NDJSON: {str(e)}"}), 400
+
+        result = service.apply_stock_updates(records)
+        return jsonify({"success": True, **result}), 200
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except Exception as e:
+        print(f"[ERROR] Stock update failed: {str(e)}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 @app.route('/api/helplines', methods=['GET'])
 def helplines():
     """Return placeholder emergency contacts and helplines. Data will be provided/updated later."""
@@ -242,23 +636,64 @@ def helplines():
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+def _queue_full_response(error):
+    """429 backpressure when every voice worker slot is taken"""
+    return jsonify({"success": False, "error": str(error)}), 429, {'Retry-After': '2'}
+
+
+def _transcription_payload(detected_lang, text):
+    """Response body for a finished transcription"""
+    if not text:
+        return {
+            "success": False,
+            "error": "Could not transcribe audio. Please speak clearly."
+        }
+    return {
+        "success": True,
+        "text": text.strip(),
+        "detected_language": LANG_CODES.get(detected_lang, 'EN'),
+        "confidence": len(text.split())  # Simple confidence metric
+    }
+
+
+def _audio_codec():
+    """Codec negotiated from ?format= and the Accept header; None if unavailable"""
+    return components.speech.get().codec.negotiate(request.accept_mimetypes, request.args.get('format'))
+
+
+def _unsupported_codec_response():
+    return jsonify({
+        "success": False,
+        "error": "Unsupported audio format",
+        "formats": components.speech.get().codec.available_codecs()
+    }), 406
+
+
+def _wav_response(audio_bytes):
+    return app.response_class(
+        response=audio_bytes,
+        status=200,
+        mimetype='audio/wav',
+        headers={'Content-Disposition': 'attachment; filename="response.wav"'}
+    )
+
+
 @app.route('/api/transcribe', methods=['POST'])
 def transcribe_audio():
     """Transcribe audio to text using Vosk STT
     Supports: English, Hindi, Punjabi
+    Runs in the voice worker pool; answers 429 when the pool is saturated.
     """
     try:
-        if not VOICE_ENABLED:
-            return jsonify({
-                "success": False,
-                "error": "Voice processing not configured. Install vosk and pyaudio."
-            }), 500
+        voice = components.voice.get()
+        speech = components.speech.get()
         
         if 'audio' not in request.files:
             return jsonify({"success": False, "error": "No audio file provided"}), 400
         
         audio_file = request.files['audio']
-        language = request.form.get('language', 'en').lower()[:2]
+        # The client's language skips identification; omit it or send 'auto' to detect
+        language = speech.recognizer.normalize_language(request.form.get('language'))
         
         if not audio_file:
             return jsonify({"success": False, "error": "Audio file is empty"}), 400
@@ -266,28 +701,16 @@ def transcribe_audio():
         # Read audio data
         audio_data = audio_file.read()
         
-        # Get voice processor and transcribe
-        voice_processor = get_voice_processor()
-        
-        # Detect language and transcribe
-        detected_lang, text = voice_processor.detect_language(audio_data)
+        # Detect language (unless hinted) and transcribe in a worker process
+        detected_lang, text = voice.get_voice_jobs().run('transcribe', audio_data, language, timeout=VOICE_REQUEST_TIMEOUT)
         
-        if not text:
-            return jsonify({
-                "success": False,
-                "error": "Could not transcribe audio. Please speak clearly."
-            }), 400
-        
-        # Map language codes
-        lang_map = {'en': 'EN', 'hi': 'HI', 'pa': 'PA'}
-        
-        return jsonify({
-            "success": True,
-            "text": text.strip(),
-            "detected_language": lang_map.get(detected_lang, 'EN'),
-            "confidence": len(text.split())  # Simple confidence metric
-        }), 200
+        payload = _transcription_payload(detected_lang, text)
+        return jsonify(payload), (200 if payload["success"] else 400)
     
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except VoiceQueueFull as e:
+        return _queue_full_response(e)
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -297,6 +720,75 @@ def transcribe_audio():
         }), 500
 
 
+@app.route('/api/transcribe/stream', methods=['POST'])
+def transcribe_stream():
+    """Streaming transcription over chunked HTTP.
+    Body: raw 16 kHz 16-bit mono PCM, or a WAV stream in any PCM layout
+    (e.g. 48 kHz stereo from a phone, converted to 16 kHz mono on the fly),
+    uploaded with Transfer-Encoding: chunked while it is being recorded.
+    Query: language=en|hi|pa (default en), age, sex
+
+    Response: NDJSON events, written while the upload is still arriving:
+        {"type": "partial", "text": ...}   hypothesis for the current utterance
+        {"type": "final", "text": ...}     stabilized transcript so far
+        {"type": "analysis", ...}          /api/chat response for the stabilized transcript
+        {"type": "done", ...}              final transcript and /api/chat response
+    Analysis events are omitted when the chat component is disabled.
+    """
+    try:
+        recognizer = components.speech.get().recognizer
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    language = recognizer.normalize_language(request.args.get('language')) or recognizer.DEFAULT_LANGUAGE
+    age = request.args.get('age', type=int)
+    sex = request.args.get('sex')
+    with_analysis = components.chat.enabled
+
+    try:
+        transcriber = recognizer.StreamingTranscriber(language)
+    except RuntimeError as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+    if not _stream_slots.acquire(blocking=False):
+        return _queue_full_response(f"Too many transcription streams ({MAX_TRANSCRIBE_STREAMS} active)")
+
+    stream = request.stream
+
+    def event(data):
+        return json.dumps(data, ensure_ascii=False) + "\n"
+
+    def generate():
+        try:
+            last_partial = ''
+            while True:
+                chunk = stream.read(STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                if transcriber.feed(chunk):
+                    text = transcriber.text
+                    yield event({"type": "final", "text": text})
+                    # Re-analyze only when the stabilized text grows (cached per transcript)
+                    if with_analysis:
+                        yield event({"type": "analysis", **format_chat_response(text, analyze(transcript=text, age=age, sex=sex))})
+                elif transcriber.partial and transcriber.partial != last_partial:
+                    yield event({"type": "partial", "text": transcriber.partial})
+                last_partial = transcriber.partial
+
+            text = transcriber.finish()
+            done = {"type": "done", **_transcription_payload(language, text)}
+            if text and with_analysis:
+                done["chat"] = format_chat_response(text, analyze(transcript=text, age=age, sex=sex))
+            yield event(done)
+        except Exception as e:
+            print(f"[ERROR] Streaming transcription failed: {str(e)}")
+            yield event({"type": "error", "success": False, "error": str(e)})
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    # Released when the response is closed, even if the client never reads it
+    response.call_on_close(_stream_slots.release)
+    return response
+
+
 @app.route('/api/voice/speak', methods=['POST'])
 def voice_speak():
     """Convert text to speech
@@ -308,14 +800,14 @@ def voice_speak():
     }
     
     Response:
-    Audio file (WAV format) or JSON error
+    Audio file in the format negotiated from ?format= or Accept (WAV by
+    default; ulaw, flac and opus when available) or JSON error; 406 if the
+    requested format is unavailable
     """
     try:
-        if not VOICE_ENABLED:
-            return jsonify({
-                "success": False,
-                "error": "Voice processing not enabled"
-            }), 500
+        voice = components.voice.get()
+        speech = components.speech.get()
+        audio_codec = speech.codec
         
         data = request.get_json()
         text = data.get('text', '').strip()
@@ -326,24 +818,44 @@ def voice_speak():
                 "error": "Text cannot be empty"
             }), 400
         
-        # Get voice processor and convert to speech
-        voice_processor = get_voice_processor()
-        audio_bytes = voice_processor.text_to_speech(text)
+        # Same language codes and aliases as speech recognition ('hindi', 'ਪੰਜਾਬੀ', ...)
+        language = speech.recognizer.normalize_language(data.get('language')) or 'en'
+        codec = _audio_codec()
+        if codec is None:
+            return _unsupported_codec_response()
         
-        if not audio_bytes:
-            return jsonify({
-                "success": False,
-                "error": "Failed to generate speech"
-            }), 500
+        # Repeated phrases are served from the content-addressed cache
+        tts_cache = voice.get_tts_cache()
+        key = voice.cache_key(text, language)
+        audio_path = tts_cache.get_path(key)
+        if audio_path is None:
+            # Synthesize in a worker process
+            audio_bytes = voice.get_voice_jobs().run('speak', text, language, timeout=VOICE_REQUEST_TIMEOUT)
+            
+            if not audio_bytes:
+                return jsonify({
+                    "success": False,
+                    "error": "Failed to generate speech"
+                }), 500
+            audio_path = tts_cache.put(key, audio_bytes)
         
-        # Return audio as WAV file
-        return app.response_class(
-            response=audio_bytes,
-            status=200,
-            mimetype='audio/wav',
-            headers={'Content-Disposition': 'attachment; filename="response.wav"'}
-        )
+        mimetype, extension = audio_codec.CODECS[codec]
+        if codec != 'wav':
+            # Encoded variants are cached next to the WAV, so each phrase is transcoded once
+            audio_path = tts_cache.get_variant(key, codec, extension,
+                                               lambda wav: audio_codec.transcode_wav(wav, codec))
+            key = f"{key}.{codec}"
+        
+        # Return audio straight from disk
+        response = send_file(audio_path, mimetype=mimetype, as_attachment=True,
+                             download_name=f'response.{extension}', etag=key, conditional=True)
+        response.vary.add('Accept')
+        return response
     
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except VoiceQueueFull as e:
+        return _queue_full_response(e)
     except Exception as e:
         print(f"Error in /api/voice/speak: {str(e)}")
         return jsonify({
@@ -352,6 +864,121 @@ def voice_speak():
         }), 500
 
 
+@app.route('/api/voice/jobs', methods=['POST'])
+def create_voice_job():
+    """Queue a voice job and return its ID immediately (202)
+    
+    Transcription: multipart form with 'audio' (and optional 'language').
+    Speech: JSON { "text": "text to speak", "language": "en" }.
+    Returns 429 with Retry-After when the voice queue is full.
+    """
+    try:
+        voice = components.voice.get()
+
+        if 'audio' in request.files:
+            language = components.speech.get().recognizer.normalize_language(request.form.get('language'))
+            job = voice.get_voice_jobs().submit('transcribe', request.files['audio'].read(), language)
+        else:
+            data = request.get_json(silent=True) or {}
+            text = str(data.get('text', '')).strip()
+            if not text:
+                return jsonify({"success": False, "error": "Provide an 'audio' file or non-empty 'text'"}), 400
+            language = components.speech.get().recognizer.normalize_language(data.get('language')) or 'en'
+            job = voice.get_voice_jobs().submit('speak', text, language)
+
+        return jsonify({
+            "success": True,
+            **job.to_dict(),
+            "status_url": f"/api/voice/jobs/{job.id}",
+            "result_url": f"/api/voice/jobs/{job.id}/result",
+            "events_url": f"/api/voice/jobs/{job.id}/events"
+        }), 202
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
+    except VoiceQueueFull as e:
+        return _queue_full_response(e)
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _lookup_job(job_id):
+    # Jobs are shared by every server process, whichever one queued them
+    try:
+        jobs = components.voice.get().get_voice_jobs()
+    except ComponentUnavailable as e:
+        return None, _unavailable_response(e)
+    # Optional long-poll: ?wait=<seconds>
+    wait = min(request.args.get('wait', 0, type=float), VOICE_REQUEST_TIMEOUT)
+    job = jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if job is None:
+        return None, (jsonify({"success": False, "error": "Unknown or expired job"}), 404)
+    return job, None
+
+
+@app.route('/api/voice/jobs/<job_id>', methods=['GET'])
+def voice_job_status(job_id):
+    """Job status; finished transcriptions include their result"""
+    job, error = _lookup_job(job_id)
+    if error:
+        return error
+    data = {"success": True, **job.to_dict()}
+    if data["status"] == 'done' and job.kind == 'transcribe':
+        data["result"] = _transcription_payload(*components.voice.peek().get_voice_jobs().result(job))
+    return jsonify(data), 200
+
+
+@app.route('/api/voice/jobs/<job_id>/result', methods=['GET'])
+def voice_job_result(job_id):
+    """Job result: WAV audio for speech jobs, JSON for transcriptions (202 while pending)"""
+    job, error = _lookup_job(job_id)
+    if error:
+        return error
+    if not job.finished:
+        return jsonify({"success": True, **job.to_dict()}), 202
+    if job.status == 'failed':
+        return jsonify({"success": False, **job.to_dict()}), 500
+    result = components.voice.peek().get_voice_jobs().result(job)
+    if job.kind == 'speak':
+        if not result:
+            return jsonify({"success": False, "error": "Failed to generate speech"}), 500
+        return _wav_response(result)
+    payload = _transcription_payload(*result)
+    return jsonify(payload), (200 if payload["success"] else 400)
+
+
+@app.route('/api/voice/jobs/<job_id>/events', methods=['GET'])
+def voice_job_events(job_id):
+    """Server-sent events with status updates until the job finishes"""
+    job, error = _lookup_job(job_id)
+    if error:
+        return error
+    jobs = components.voice.peek().get_voice_jobs()
+
+    def generate():
+        last_status = None
+        deadline = time.time() + VOICE_REQUEST_TIMEOUT * 2
+        current = job
+        while True:
+            current = jobs.wait(current.id, 1.0)
+            if current is None:
+                yield f"event: error\ndata: {json.dumps({'success': False, 'error': 'Unknown or expired job'})}\n\n"
+                break
+            finished = current.finished
+            data = current.to_dict()
+            if finished and current.kind == 'transcribe' and data["status"] == 'done':
+                data["result"] = _transcription_payload(*jobs.result(current))
+            if data["status"] != last_status or finished:
+                last_status = data["status"]
+                yield f"event: status\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if finished or time.time() > deadline:
+                break
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache'})
+
+
 
 
 @app.route('/api/voice/record', methods=['POST'])
@@ -364,24 +991,30 @@ def voice_record():
         "duration": 5  # seconds to record
     }
     
-    Response: Audio file (WAV format)
+    Response: binary audio in the format negotiated from ?format= or Accept
+    (WAV by default, see audio_codec); base64 JSON only for clients that
+    prefer application/json or pass ?format=base64
     """
     try:
-        if not VOICE_ENABLED:
-            return jsonify({
-                "success": False,
-                "error": "Voice processing not available"
-            }), 500
+        voice = components.voice.get()
+        audio_codec = components.speech.get().codec
         
-        data = request.get_json() or {}
+        data = request.get_json(silent=True) or {}
         duration = data.get('duration', 5)
         
         # Validate duration
         if duration < 1 or duration > 30:
             duration = 5
         
-        voice_processor = get_voice_processor()
-        audio_data = voice_processor.record_audio(duration=duration)
+        # Legacy clients that only accept JSON still get base64 (a third larger)
+        as_json = request.args.get('format') == 'base64' or (
+            request.accept_mimetypes.best_match(['audio/*', 'application/json']) == 'application/json')
+        codec = 'wav' if as_json else _audio_codec()
+        if codec is None:
+            return _unsupported_codec_response()
+        
+        voice_processor = voice.get_voice_processor()
+        audio_data = voice_processor.record_audio(duration=duration, codec=codec)
         
         if not audio_data:
             return jsonify({
@@ -389,17 +1022,25 @@ def voice_record():
                 "error": "Failed to record audio"
             }), 500
         
-        # Return audio as base64 encoded JSON
-        import base64
-        audio_base64 = base64.b64encode(audio_data).decode('utf-8')
+        if as_json:
+            import base64
+            return jsonify({
+                "success": True,
+                "audio": base64.b64encode(audio_data).decode('ascii'),
+                "duration": duration,
+                "format": "wav"
+            }), 200
         
-        return jsonify({
-            "success": True,
-            "audio": audio_base64,
-            "duration": duration,
-            "format": "wav"
-        }), 200
+        # Binary body: no base64 inflation, no JSON wrapper
+        mimetype, extension = audio_codec.CODECS[codec]
+        return Response(audio_data, mimetype=mimetype, headers={
+            'Content-Disposition': f'attachment; filename="recording.{extension}"',
+            'X-Audio-Duration': str(duration),
+            'Vary': 'Accept'
+        })
     
+    except ComponentUnavailable as e:
+        return _unavailable_response(e)
     except Exception as e:
         print(f"[Error] Voice record failed: {e}")
         return jsonify({
@@ -409,14 +1050,31 @@ def voice_record():
 
 
 if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sehat Nabha API server")
+    parser.add_argument('--host', default=os.environ.get('SEHAT_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('SEHAT_PORT', '5000')))
+    parser.add_argument('--debug', action='store_true', help="Werkzeug dev server with debug tracebacks")
+    parser.add_argument('--production', action='store_true',
+                        help="Multi-worker production server (gunicorn, or waitress on Windows)")
+    args = parser.parse_args()
+
+    if args.production:
+        from wsgi import serve
+        serve(host=args.host, port=args.port)
+        sys.exit(0)
+
     print("Starting Sehat Nabha API Server...")
-    print("API will be available at http://localhost:5000")
+    print(f"API will be available at http://localhost:{args.port}")
     print("CORS enabled for http://localhost:3000 (Vite dev server)")
     
-    # Run Flask with debug mode
+    warmup()
+    # Development server; use --production (or gunicorn -c gunicorn.conf.py wsgi:app) to deploy
     app.run(
-        host='0.0.0.0',
-        port=5000,
-        debug=True,
+        host=args.host,
+        port=args.port,
+        debug=args.debug,
+        threaded=True,
         use_reloader=False  # Disable reloader to avoid double-initialization
     )
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Audio encodings for API responses.
+Clients pick one with the Accept header or ?format=; 16-bit WAV stays the
+default so existing clients are unaffected.
+
+    wav   audio/wav                16-bit PCM
+    ulaw  audio/wav                8-bit G.711 mu-law WAV, half the size (numpy only)
+    flac  audio/flac               lossless, roughly half the size (needs soundfile)
+    opus  audio/ogg; codecs=opus   speech quality at a tenth of the size (needs soundfile
+                                   built on libsndfile >= 1.0.29)
+
+Encoders write straight into the output buffer: the WAV header is packed
+with struct and the samples are copied once into a preallocated bytearray,
+with no BytesIO round trip and no base64 layer.
+"""
+
+import io
+import struct
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+import audio_dsp
+
+try:
+    import soundfile
+except (ImportError, OSError):
+    # OSError: the Python package is installed but libsndfile is not
+    soundfile = None
+
+# codec -> (Content-Type, file extension)
+CODECS: Dict[str, Tuple[str, str]] = {
+    'wav': ('audio/wav', 'wav'),
+    'ulaw': ('audio/wav', 'wav'),
+    'flac': ('audio/flac', 'flac'),
+    'opus': ('audio/ogg; codecs=opus', 'ogg'),
+}
+# Accept header media types per codec, in server preference order; mu-law
+# WAV shares audio/wav with PCM WAV, so it is only selectable with ?format=
+NEGOTIABLE: Dict[str, str] = {
+    'audio/wav': 'wav',
+    'audio/x-wav': 'wav',
+    'audio/wave': 'wav',
+    'audio/ogg': 'opus',
+    'audio/opus': 'opus',
+    'audio/flac': 'flac',
+    'audio/x-flac': 'flac',
+}
+DEFAULT_CODEC = 'wav'
+
+# Sample rates the Opus encoder accepts
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_MULAW = 7
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+
+def available_codecs() -> List[str]:
+    if soundfile is None:
+        return ['wav', 'ulaw']
+    formats = soundfile.available_subtypes('OGG')
+    return ['wav', 'ulaw', 'flac'] + (['opus'] if 'OPUS' in formats else [])
+
+
+def negotiate(accept, requested: Optional[str] = None) -> Optional[str]:
+    """
+    Pick a codec for a response.
+
+    Args:
+        accept: werkzeug MIMEAccept of the request (request.accept_mimetypes)
+        requested: explicit ?format= value, which wins over Accept
+
+    Returns:
+        codec name, or None if the client asked for something unavailable
+    """
+    codecs = available_codecs()
+    if requested:
+        requested = requested.strip().lower()
+        return requested if requested in codecs else None
+    offered = [mimetype for mimetype, codec in NEGOTIABLE.items() if codec in codecs]
+    best = accept.best_match(offered) if accept else None
+    return NEGOTIABLE[best] if best else DEFAULT_CODEC
+
+
+def wav_header(data_bytes: int, sample_rate: int, channels: int, sample_width: int,
+               format_tag: int = WAVE_FORMAT_PCM) -> bytes:
+    """Canonical 44-byte RIFF/WAVE header"""
+    block_align = channels * sample_width
+    return struct.pack('<4sI4s4sIHHIIHH4sI',
+                       b'RIFF', 36 + data_bytes, b'WAVE',
+                       b'fmt ', 16, format_tag, channels, sample_rate,
+                       sample_rate * block_align, block_align, sample_width * 8,
+                       b'data', data_bytes)
+
+
+def _with_header(samples: np.ndarray, sample_rate: int, channels: int, format_tag: int) -> bytearray:
+    """Header plus samples in one preallocated buffer (a single copy of the samples)"""
+    data_bytes = samples.nbytes
+    out = bytearray(44 + data_bytes)
+    out[:44] = wav_header(data_bytes, sample_rate, channels, samples.itemsize, format_tag)
+    np.frombuffer(out, dtype=samples.dtype, offset=44)[:] = samples.reshape(-1)
+    return out
+
+
+def ulaw_encode(samples: np.ndarray) -> np.ndarray:
+    """G.711 mu-law encode int16 samples (vectorized, bit-exact with the reference coder)"""
+    x = samples.astype(np.int32).reshape(-1) >> 2
+    negative = x < 0
+    magnitude = np.minimum(np.where(negative, -x, x), 8159) + 0x21
+    # frexp exponent is the bit length; segment 0 covers magnitudes below 0x40
+    segment = np.maximum(np.frexp(magnitude)[1] - 6, 0)
+    code = (np.minimum(segment, 7) << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+    code = np.where(segment > 7, 0x7F, code)
+    return (code ^ np.where(negative, 0x7F, 0xFF)).astype(np.uint8)
+
+
+def _to_opus_rate(samples: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, int]:
+    """Resample to the nearest Opus rate at or above sample_rate"""
+    if sample_rate in OPUS_RATES:
+        return samples, sample_rate
+    target = next((rate for rate in OPUS_RATES if rate >= sample_rate), OPUS_RATES[-1])
+    columns = [audio_dsp.to_int16(audio_dsp.resample(audio_dsp.to_float32(samples[:, c]), sample_rate, target))
+               for c in range(samples.shape[1])]
+    return np.stack(columns, axis=1), target
+
+
+def encode_pcm(samples: np.ndarray, sample_rate: int, codec: str = DEFAULT_CODEC) -> Buffer:
+    """
+    Encode int16 samples, shaped (frames,) or (frames, channels).
+
+    Returns:
+        The encoded file as a bytes-like object ready to send.
+    """
+    samples = np.asarray(samples, dtype=np.int16)
+    if samples.ndim == 1:
+        samples = samples[:, None]
+    channels = samples.shape[1]
+    if codec == 'wav':
+        return _with_header(samples, sample_rate, channels, WAVE_FORMAT_PCM)
+    if codec == 'ulaw':
+        return _with_header(ulaw_encode(samples), sample_rate, channels, WAVE_FORMAT_MULAW)
+    if soundfile is None or codec not in CODECS:
+        raise ValueError(f"Unsupported audio codec '{codec}'")
+    buffer = io.BytesIO()
+    if codec == 'opus':
+        samples, sample_rate = _to_opus_rate(samples, sample_rate)
+        soundfile.write(buffer, samples, sample_rate, format='OGG', subtype='OPUS')
+    else:
+        soundfile.write(buffer, samples, sample_rate, format='FLAC', subtype='PCM_16')
+    return buffer.getbuffer()
+
+
+def read_wav(data: Buffer) -> Tuple[np.ndarray, int]:
+    """(int16 samples shaped (frames, channels), sample rate) of any PCM WAV"""
+    samples, sample_rate = audio_dsp.read_wav_frames(data)
+    if samples.dtype != np.int16:
+        samples = audio_dsp.to_int16(audio_dsp.to_float32(samples))
+    return samples, sample_rate
+
+
+def transcode_wav(data: Buffer, codec: str) -> Buffer:
+    """Re-encode a PCM WAV (e.g. a cached TTS clip) into codec"""
+    if codec == 'wav':
+        return data
+    samples, sample_rate = read_wav(data)
+    return encode_pcm(samples, sample_rate, codec)
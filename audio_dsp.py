@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Vectorized audio DSP over WAV frames.
+Samples are numpy views over the frame bytes (8/16/24/32-bit PCM, any channel
+count); conversions run in fixed-size blocks or in place, never through a
+float64 copy of the whole clip. Phones upload 44.1/48 kHz stereo, and the
+recognizer wants 16 kHz mono int16. PCMConverter does that conversion chunk
+by chunk, keeping the resampler's filter and phase state across chunks, so
+streamed uploads are converted as they arrive.
+"""
+
+import struct
+from math import gcd
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from scipy import signal
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+TARGET_RATE = 16000
+# Samples processed per block by the in-place conversions
+BLOCK = 65536
+# Anti-aliasing FIR length for the streaming resampler
+RESAMPLE_TAPS = 63
+
+
+def parse_wav_header(data: Buffer) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Locate the PCM payload of a RIFF/WAVE prefix.
+
+    Returns:
+        (data offset, sample rate, channels, sample width) or None when more
+        bytes are needed. Raises ValueError if data is not a WAV file.
+    """
+    if len(data) < 12:
+        return None
+    if data[:4] != b'RIFF' or data[8:12] != b'WAVE':
+        raise ValueError("Not a WAV file")
+    offset, fmt = 12, None
+    while offset + 8 <= len(data):
+        chunk_id, size = struct.unpack_from('<4sI', data, offset)
+        body = offset + 8
+        if chunk_id == b'data':
+            if fmt is None:
+                raise ValueError("WAV data chunk before fmt chunk")
+            return (body,) + fmt
+        if body + size > len(data):
+            return None
+        if chunk_id == b'fmt ':
+            format_tag, channels, rate, _, _, bits = struct.unpack_from('<HHIIHH', data, body)
+            # 0xFFFE is WAVE_FORMAT_EXTENSIBLE, used by phones for plain PCM too
+            if format_tag not in (1, 0xFFFE):
+                raise ValueError(f"Unsupported WAV encoding {format_tag}")
+            fmt = (rate, channels, bits // 8)
+        offset = body + size + (size & 1)
+    return None
+
+
+def frames_to_array(frames: Buffer, sample_width: int, channels: int) -> np.ndarray:
+    """
+    Samples shaped (frames, channels) over the frame bytes.
+
+    8-bit (unsigned), 16-bit and 32-bit frames are zero-copy views; 24-bit
+    frames are widened into int32 with the sample in the top three bytes, so
+    they scale like 32-bit audio. A trailing partial frame is ignored.
+    """
+    frame_bytes = sample_width * channels
+    usable = len(frames) - len(frames) % frame_bytes
+    frames = memoryview(frames)[:usable]
+    if sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        samples = np.zeros(len(raw), dtype=np.int32)
+        view = samples.view(np.uint8).reshape(-1, 4)
+        view[:, 1:] = raw
+    else:
+        dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(sample_width)
+        if dtype is None:
+            raise ValueError(f"Unsupported sample width {sample_width}")
+        samples = np.frombuffer(frames, dtype=dtype)
+    return samples.reshape(-1, channels)
+
+
+def read_wav_frames(data: Buffer) -> Tuple[np.ndarray, int]:
+    """
+    (samples shaped (frames, channels), sample rate) of a PCM WAV, viewing data in place.
+
+    A data chunk declared longer than the bytes present (a truncated upload, or
+    the 0xFFFFFFFF placeholder of a streaming writer) is read up to the last
+    whole frame; a declared size that is not a whole number of frames raises
+    ValueError.
+    """
+    header = parse_wav_header(data)
+    if header is None:
+        raise ValueError("Truncated WAV header")
+    offset, sample_rate, channels, sample_width = header
+    block_align = channels * sample_width
+    if block_align == 0:
+        raise ValueError("WAV fmt chunk has no channels or zero sample width")
+    size = struct.unpack_from('<I', data, offset - 4)[0]
+    available = len(data) - offset
+    if size <= available and size % block_align:
+        raise ValueError(f"WAV data size {size} is not a multiple of the {block_align}-byte frame")
+    size = min(size, available)
+    return frames_to_array(memoryview(data)[offset:offset + size], sample_width, channels), sample_rate
+
+
+def to_float32(samples: np.ndarray) -> np.ndarray:
+    """Scale integer samples to float32 in [-1, 1) without a float64 intermediate"""
+    if samples.dtype == np.float32:
+        return samples
+    if samples.dtype == np.uint8:
+        out = np.subtract(samples, 128, dtype=np.float32)
+        out *= np.float32(1 / 128)
+        return out
+    scale = np.float32(1.0 / -np.iinfo(samples.dtype).min)
+    return np.multiply(samples, scale, dtype=np.float32)
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    """float32 samples in [-1, 1] to int16; samples is used as scratch"""
+    samples *= np.float32(32767)
+    np.rint(samples, out=samples)
+    np.clip(samples, -32768, 32767, out=samples)
+    return samples.astype(np.int16)
+
+
+def downmix(samples: np.ndarray) -> np.ndarray:
+    """Mono samples: the channel mean for multi-channel float input"""
+    if samples.ndim == 1 or samples.shape[1] == 1:
+        return samples.reshape(-1)
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def peak(samples: np.ndarray) -> float:
+    """Absolute peak without allocating an abs() copy (and without int16 overflow)"""
+    if samples.size == 0:
+        return 0.0
+    return max(float(samples.max()), -float(samples.min()))
+
+
+def normalize_peak(samples: np.ndarray, target: float = 1.0) -> np.ndarray:
+    """
+    Scale samples in place so the peak reaches target (full scale).
+
+    float32 samples are scaled directly; integer samples are scaled in blocks
+    of BLOCK samples through a float32 scratch buffer. Returns samples.
+    """
+    level = peak(samples)
+    if level == 0:
+        return samples
+    flat = samples.reshape(-1)
+    if samples.dtype.kind == 'f':
+        flat *= np.float32(target / level)
+        return samples
+    info = np.iinfo(samples.dtype)
+    gain = np.float32(target * info.max / level)
+    scratch = np.empty(min(BLOCK, len(flat)), dtype=np.float32)
+    for start in range(0, len(flat), BLOCK):
+        block = flat[start:start + BLOCK]
+        tmp = scratch[:len(block)]
+        np.multiply(block, gain, out=tmp)
+        np.rint(tmp, out=tmp)
+        np.clip(tmp, info.min, info.max, out=tmp)
+        block[:] = tmp
+    return samples
+
+
+def resample(samples: np.ndarray, src_rate: int, dst_rate: int = TARGET_RATE) -> np.ndarray:
+    """Whole-signal polyphase resampling of mono float32 samples"""
+    if src_rate == dst_rate:
+        return samples
+    common = gcd(src_rate, dst_rate)
+    return signal.resample_poly(samples, dst_rate // common, src_rate // common).astype(np.float32)
+
+
+class Resampler:
+    """
+    Streaming resampler for mono float32 chunks.
+    Downsampling runs an anti-aliasing FIR whose delay line carries over
+    between chunks, then linear interpolation at a phase that also carries
+    over, so chunk boundaries are seamless.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int = TARGET_RATE, taps: int = RESAMPLE_TAPS):
+        self.step = src_rate / dst_rate
+        self._fir = None
+        if dst_rate < src_rate:
+            self._fir = signal.firwin(taps, 0.9 * dst_rate / src_rate).astype(np.float32)
+            self._state = np.zeros(taps - 1, dtype=np.float32)
+        # Source position of the next output sample, relative to the next chunk's first sample
+        self._position = 0.0
+        self._last: Optional[np.float32] = None
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        if len(chunk) == 0:
+            return chunk
+        if self._fir is not None:
+            chunk, self._state = signal.lfilter(self._fir, 1.0, chunk, zi=self._state)
+        if self._last is None:
+            times, values = np.arange(len(chunk)), chunk
+        else:
+            times, values = np.arange(-1, len(chunk)), np.concatenate(([self._last], chunk))
+        end = len(chunk) - 1
+        count = int((end - self._position) // self.step) + 1 if end >= self._position else 0
+        positions = self._position + self.step * np.arange(count)
+        out = np.interp(positions, times, values).astype(np.float32)
+        self._position += self.step * count - len(chunk)
+        self._last = np.float32(chunk[-1])
+        return out
+
+
+class PCMConverter:
+    """Any PCM stream (rate, channels, width) to 16-bit mono PCM at target_rate, chunk by chunk"""
+
+    def __init__(self, sample_rate: int, channels: int, sample_width: int, target_rate: int = TARGET_RATE):
+        self.channels = channels
+        self.sample_width = sample_width
+        self.frame_bytes = channels * sample_width
+        self._resampler = Resampler(sample_rate, target_rate) if sample_rate != target_rate else None
+        # Partial frame held back until the next chunk completes it
+        self._carry = b''
+
+    def convert(self, data: Buffer) -> bytes:
+        if self._carry:
+            data = self._carry + bytes(data)
+        cut = len(data) - len(data) % self.frame_bytes
+        self._carry = bytes(data[cut:])
+        samples = downmix(to_float32(frames_to_array(memoryview(data)[:cut], self.sample_width, self.channels)))
+        if self._resampler is not None:
+            samples = self._resampler.process(samples)
+        return to_int16(samples).tobytes()
+
+
+def recognizer_pcm(data: Buffer, target_rate: int = TARGET_RATE) -> Buffer:
+    """16-bit mono PCM at target_rate for a complete WAV clip (passed through if already so)"""
+    samples, sample_rate = read_wav_frames(data)
+    if samples.dtype == np.int16 and samples.shape[1] == 1 and sample_rate == target_rate:
+        return memoryview(samples).cast('B')
+    mono = downmix(to_float32(samples))
+    return to_int16(resample(mono, sample_rate, target_rate)).tobytes()
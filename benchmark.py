@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite for the orchestrator and the HTTP API.
+
+    python benchmark.py micro [--output results.json]
+        In-process micro-benchmarks: symptom extraction across transcript
+        sizes, disease matching, urgency and precaution lookup, and
+        analyze()/analyze_many() over a synthetic corpus built from the
+        DiseaseAndSymptoms.csv rows.
+
+    python benchmark.py load [--url http://localhost:5000] [--duration 20] [--concurrency 8]
+        Closed-loop HTTP load against /api/chat, /api/disease,
+        /api/medicine-search and /api/health-record. Without --url an
+        in-process server is started on a free port, with synthetic
+        pharmacy stock. /api/health-record writes records: point the
+        server's SEHAT_RECORDS_DB at a scratch database (the in-process
+        server does this for you).
+
+    python benchmark.py compare baseline.json current.json [--threshold 0.10]
+        Compare two result files; exits 1 when any p50/p95 regressed by more
+        than the threshold.
+
+Every run writes one JSON document with per-case latency percentiles
+(p50/p95/p99 in milliseconds) and throughput, plus the git revision and
+interpreter it was measured on, so results can be compared across releases.
+"""
+
+import os
+import sys
+import csv
+import json
+import time
+import random
+import platform
+import tempfile
+import threading
+import subprocess
+from http.client import HTTPConnection, HTTPSConnection
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlencode, urlsplit
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, 'data') if os.path.isdir(os.path.join(BASE_DIR, 'data')) else BASE_DIR
+DS_PATH = os.path.join(DATA_DIR, 'DiseaseAndSymptoms.csv')
+
+SEED = 1234
+# Approximate transcript lengths (words) for the extraction benchmarks
+TRANSCRIPT_SIZES = {'short': 12, 'medium': 60, 'long': 400}
+# Medicines searched by the load generator unless --medicine is given
+DEFAULT_MEDICINES = ('Paracetamol', 'Amoxicillin', 'ORS', 'Cetirizine', 'Metformin', 'Ibuprofen')
+# Rough location of Nabha, used as the search origin
+DEFAULT_LOCATION = (30.3748, 76.1523)
+
+TEMPLATES = (
+    "I have {symptoms} since {duration}.",
+    "For {duration} I am having {symptoms}.",
+    "Doctor, my child has {symptoms}.",
+    "Since {duration} there is {symptoms} and I feel weak.",
+    "{symptoms}, started {duration} ago",
+)
+DURATIONS = ('yesterday', 'two days', 'a week', 'this morning', 'three days')
+# Clinically empty sentences used to pad transcripts to a target length
+PADDING = (
+    "I went to the market in the morning and came back by bus.",
+    "We live in a village near the canal with my parents.",
+    "My neighbour told me to come to the clinic today.",
+    "I did not take any medicine yet because the shop was closed.",
+)
+
+
+# ---------------------------------------------------------------------------
+# Measurement
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending sequence (q in 0..100)"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, min(len(sorted_values), int(round(q / 100 * len(sorted_values) + 0.5))))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ns: List[int], elapsed_s: float, operations: Optional[int] = None) -> Dict[str, Any]:
+    """Latency percentiles in milliseconds and throughput in operations per second"""
+    values = sorted(latencies_ns)
+    ms = [v / 1e6 for v in values]
+    count = operations if operations is not None else len(values)
+    return {
+        'count': count,
+        'mean_ms': round(sum(ms) / len(ms), 4) if ms else 0.0,
+        'min_ms': round(ms[0], 4) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 4),
+        'p95_ms': round(percentile(ms, 95), 4),
+        'p99_ms': round(percentile(ms, 99), 4),
+        'max_ms': round(ms[-1], 4) if ms else 0.0,
+        'throughput_per_s': round(count / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+    }
+
+
+def measure(fn: Callable[[Any], Any], inputs: Sequence[Any], repeat: int = 1, warmup: int = 1,
+            ops_per_call: int = 1) -> Dict[str, Any]:
+    """Time fn(x) for every input, repeat times, after warmup untimed passes"""
+    for _ in range(warmup):
+        for x in inputs:
+            fn(x)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for x in inputs:
+            t0 = time.perf_counter_ns()
+            fn(x)
+            latencies.append(time.perf_counter_ns() - t0)
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, len(latencies) * ops_per_call)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic corpus
+# ---------------------------------------------------------------------------
+
+def load_rows(path: str = DS_PATH) -> List[Dict[str, Any]]:
+    """(disease, symptoms) for every DiseaseAndSymptoms.csv row"""
+    rows = []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            if not row or row[0] == 'Disease':
+                continue
+            symptoms = [s.strip() for s in row[1:] if s.strip()]
+            if symptoms:
+                rows.append({'disease': row[0].strip(), 'symptoms': symptoms})
+    return rows
+
+
+def surface(symptom: str) -> str:
+    """Spoken form of a symptom id ("dischromic _patches" -> "dischromic patches")"""
+    return ' '.join(symptom.replace('_', ' ').split())
+
+
+def make_transcript(symptoms: List[str], rng: random.Random, words: int = 0) -> str:
+    """A patient-like sentence mentioning symptoms, padded to about words words"""
+    chosen = rng.sample(symptoms, min(len(symptoms), rng.randint(2, 5)))
+    spoken = [surface(s) for s in chosen]
+    listed = spoken[0] if len(spoken) == 1 else ', '.join(spoken[:-1]) + ' and ' + spoken[-1]
+    text = rng.choice(TEMPLATES).format(symptoms=listed, duration=rng.choice(DURATIONS))
+    while len(text.split()) < words:
+        text += ' ' + rng.choice(PADDING)
+    return text
+
+
+def build_corpus(rows: List[Dict[str, Any]], size: int, seed: int = SEED, words: int = 0) -> List[Dict[str, Any]]:
+    """size consultation records sampled (with replacement) from rows"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        row = rng.choice(rows)
+        corpus.append({
+            'transcript': make_transcript(row['symptoms'], rng, words),
+            'age': rng.randint(1, 85),
+            'sex': rng.choice(('M', 'F')),
+            'disease': row['disease'],
+        })
+    return corpus
+
+
+# ---------------------------------------------------------------------------
+# Micro-benchmarks
+# ---------------------------------------------------------------------------
+
+def run_micro(corpus_size: int = 500, repeat: int = 3) -> Dict[str, Any]:
+    import orchestrator
+
+    rows = load_rows()
+    results: Dict[str, Any] = {}
+
+    for name, words in TRANSCRIPT_SIZES.items():
+        transcripts = [r['transcript'] for r in build_corpus(rows, 200, SEED, words)]
+        results[f'extract.{name}'] = measure(orchestrator.symptom_extractor.scan, transcripts, repeat)
+
+    symptom_sets = [[s.strip() for s in r['symptoms']] for r in rows]
+    results['match'] = measure(orchestrator.disease_matcher.match, symptom_sets, repeat)
+    id_sets = [orchestrator.disease_matcher.to_ids(s) for s in symptom_sets]
+    results['match_batch'] = measure(lambda batch: orchestrator.disease_matcher.match_batch(batch),
+                                     [id_sets], repeat, ops_per_call=len(id_sets))
+
+    diseases = sorted({r['disease'] for r in rows})
+    results['urgency'] = measure(
+        lambda args: orchestrator.determine_disease_urgency(*args),
+        [(d, [], count) for d in diseases for count in (1, 3, 6)], repeat)
+    results['precautions'] = measure(orchestrator.precaution_loader.get_precautions, diseases, repeat)
+    results['disease_info'] = measure(orchestrator.knowledge_loader.get_disease_info, diseases, repeat)
+    catalog = orchestrator.knowledge.current().catalog
+    results['disease_lookup'] = measure(catalog.lookup, diseases, repeat)
+    # Misspelled names go through the fuzzy index
+    results['disease_lookup.fuzzy'] = measure(catalog.lookup, [d[:2] + d[3:] for d in diseases if len(d) > 5], repeat)
+
+    corpus = build_corpus(rows, corpus_size)
+    cache = orchestrator.analysis_cache
+
+    def analyze_cold(record):
+        cache.clear()
+        return orchestrator.analyze(record['transcript'], record['age'], record['sex'])
+
+    results['analyze.cold'] = measure(analyze_cold, corpus, repeat=1)
+    cache.clear()
+    results['analyze.warm'] = measure(
+        lambda record: orchestrator.analyze(record['transcript'], record['age'], record['sex']), corpus, repeat)
+
+    def analyze_batch(records):
+        cache.clear()
+        return orchestrator.analyze_many(records)
+
+    results['analyze_many.cold'] = measure(analyze_batch, [corpus], repeat, ops_per_call=len(corpus))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# HTTP load generator
+# ---------------------------------------------------------------------------
+
+class Scenario:
+    """One endpoint under load: builds requests from a seeded generator"""
+
+    def __init__(self, name: str, method: str, make: Callable[[random.Random], Any]):
+        self.name = name
+        self.method = method
+        # make(rng) -> (path, JSON body or None)
+        self.make = make
+
+
+def default_scenarios(rows: List[Dict[str, Any]], medicines: Sequence[str]) -> Dict[str, Scenario]:
+    corpus = build_corpus(rows, 1000)
+    diseases = sorted({r['disease'] for r in rows})
+    lat, lon = DEFAULT_LOCATION
+
+    def chat(rng):
+        record = rng.choice(corpus)
+        return '/api/chat', {'message': record['transcript'], 'age': record['age'], 'sex': record['sex']}
+
+    def disease(rng):
+        return '/api/disease?' + urlencode({'name': rng.choice(diseases)}), None
+
+    def medicine_search(rng):
+        query = {'medicine': rng.choice(medicines),
+                 'lat': round(lat + rng.uniform(-0.2, 0.2), 5),
+                 'lon': round(lon + rng.uniform(-0.2, 0.2), 5)}
+        return '/api/medicine-search?' + urlencode(query), None
+
+    def health_record(rng):
+        return '/api/health-record', {'patient_id': f'bench-{rng.randint(1, 500)}',
+                                      'title': 'benchmark record',
+                                      'notes': rng.choice(corpus)['transcript']}
+
+    return {
+        'chat': Scenario('chat', 'POST', chat),
+        'disease': Scenario('disease', 'GET', disease),
+        'medicine-search': Scenario('medicine-search', 'GET', medicine_search),
+        'health-record': Scenario('health-record', 'POST', health_record),
+    }
+
+
+def _connect(url: str, timeout: float):
+    parts = urlsplit(url)
+    conn_cls = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+    return conn_cls(parts.hostname, parts.port, timeout=timeout), parts.path.rstrip('/')
+
+
+def run_scenario(url: str, scenario: Scenario, duration: float, concurrency: int,
+                 timeout: float = 30.0, seed: int = SEED) -> Dict[str, Any]:
+    """
+    Closed-loop load: concurrency workers, each with one keep-alive
+    connection, issue requests back to back for duration seconds.
+    """
+    deadline = time.perf_counter() + duration
+    lock = threading.Lock()
+    latencies: List[int] = []
+    statuses: Dict[str, int] = {}
+    errors: Dict[str, int] = {}
+
+    def worker(index: int):
+        rng = random.Random(seed + index)
+        conn, prefix = _connect(url, timeout)
+        local_latencies, local_statuses, local_errors = [], {}, {}
+        while time.perf_counter() < deadline:
+            path, body = scenario.make(rng)
+            payload = json.dumps(body).encode('utf-8') if body is not None else None
+            headers = {'Content-Type': 'application/json'} if payload is not None else {}
+            t0 = time.perf_counter_ns()
+            try:
+                conn.request(scenario.method, prefix + path, body=payload, headers=headers)
+                response = conn.getresponse()
+                response.read()
+            except Exception as e:
+                kind = type(e).__name__
+                local_errors[kind] = local_errors.get(kind, 0) + 1
+                conn.close()
+                conn, prefix = _connect(url, timeout)
+                continue
+            local_latencies.append(time.perf_counter_ns() - t0)
+            status = str(response.status)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        conn.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, n in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + n
+            for kind, n in local_errors.items():
+                errors[kind] = errors.get(kind, 0) + n
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(latencies, elapsed)
+    summary.update({
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 3),
+        'status': dict(sorted(statuses.items())),
+        'errors': errors,
+        # 5xx responses and transport failures; 4xx (e.g. an unstocked medicine) are valid answers
+        'error_rate': round((sum(errors.values()) + sum(n for s, n in statuses.items() if int(s) >= 500))
+                            / max(1, len(latencies) + sum(errors.values())), 4),
+    })
+    return summary
+
+
+def write_stock_csv(path: str, medicines: Sequence[str], pharmacies: int = 200, seed: int = SEED) -> None:
+    """Synthetic pharmacy stock around DEFAULT_LOCATION, each pharmacy holding most of the medicines"""
+    rng = random.Random(seed)
+    lat, lon = DEFAULT_LOCATION
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['pharmacy_id', 'pharmacy_name', 'address', 'phone', 'latitude', 'longitude',
+                         'village', 'medicine_name', 'quantity', 'price'])
+        for i in range(pharmacies):
+            plat, plon = round(lat + rng.uniform(-0.5, 0.5), 5), round(lon + rng.uniform(-0.5, 0.5), 5)
+            for medicine in medicines:
+                if rng.random() < 0.8:
+                    writer.writerow([f'bench-{i}', f'Pharmacy {i}', f'Street {i}', '', plat, plon,
+                                     f'Village {i % 40}', medicine, rng.randint(0, 50), rng.randint(5, 200)])
+
+
+def start_local_server(medicines: Sequence[str] = DEFAULT_MEDICINES):
+    """
+    Serve api_server.app on a free localhost port in a background thread.
+    Records, stock deltas and (unless SEHAT_PHARMACY_STOCK names one) a
+    synthetic pharmacy stock file go to a scratch directory.
+    """
+    scratch = tempfile.mkdtemp(prefix='sehat-bench-')
+    os.environ.setdefault('SEHAT_RECORDS_DB', os.path.join(scratch, 'records.db'))
+    os.environ.setdefault('SEHAT_STOCK_LOG', os.path.join(scratch, 'stock_deltas.ndjson'))
+    if 'SEHAT_PHARMACY_STOCK' not in os.environ:
+        os.environ['SEHAT_PHARMACY_STOCK'] = os.path.join(scratch, 'pharmacy_stock.csv')
+        write_stock_csv(os.environ['SEHAT_PHARMACY_STOCK'], medicines)
+    from werkzeug.serving import WSGIRequestHandler, make_server
+    import api_server
+
+    class QuietHandler(WSGIRequestHandler):
+        # One access-log line per request would dominate the measurement
+        def log_request(self, *args, **kwargs):
+            pass
+
+    api_server.warmup()
+    server = make_server('127.0.0.1', 0, api_server.app, threaded=True, request_handler=QuietHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run_load(url: Optional[str], endpoints: Sequence[str], duration: float, concurrency: int,
+             medicines: Sequence[str], warmup: float = 2.0) -> Dict[str, Any]:
+    server = None
+    if not url:
+        server, url = start_local_server(medicines)
+        print(f"[Bench] Started in-process server at {url}")
+    scenarios = default_scenarios(load_rows(), medicines)
+    results: Dict[str, Any] = {'url': url}
+    try:
+        for name in endpoints:
+            scenario = scenarios[name]
+            if warmup > 0:
+                run_scenario(url, scenario, warmup, concurrency)
+            print(f"[Bench] {name}: {concurrency} workers for {duration:g}s")
+            results[name] = run_scenario(url, scenario, duration, concurrency)
+    finally:
+        if server is not None:
+            server.shutdown()
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+def environment() -> Dict[str, Any]:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR,
+                                  capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        revision = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def write_results(path: str, kind: str, results: Dict[str, Any], args: Dict[str, Any]) -> None:
+    document = {'kind': kind, 'environment': environment(), 'arguments': args, 'results': results}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    print(f"[Bench] Results written to {path}")
+
+
+def print_table(results: Dict[str, Any]) -> None:
+    print(f"{'case':<22}{'count':>8}{'p50 ms':>11}{'p95 ms':>11}{'p99 ms':>11}{'ops/s':>12}")
+    for name, r in results.items():
+        if not isinstance(r, dict) or 'p50_ms' not in r:
+            continue
+        print(f"{name:<22}{r['count']:>8}{r['p50_ms']:>11.3f}{r['p95_ms']:>11.3f}"
+              f"{r['p99_ms']:>11.3f}{r['throughput_per_s']:>12.1f}")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """Lines describing every shared case; regressions beyond threshold are marked"""
+    lines, regressions = [], 0
+    base_results, cur_results = baseline.get('results', {}), current.get('results', {})
+    for name, cur in cur_results.items():
+        base = base_results.get(name)
+        if not isinstance(cur, dict) or not isinstance(base, dict) or 'p50_ms' not in cur:
+            continue
+        parts = []
+        regressed = False
+        for metric in ('p50_ms', 'p95_ms'):
+            if base[metric] > 0:
+                change = (cur[metric] - base[metric]) / base[metric]
+                regressed |= change > threshold
+                parts.append(f"{metric} {base[metric]:.3f} -> {cur[metric]:.3f} ({change:+.1%})")
+        regressions += regressed
+        lines.append(f"{'REGRESSED ' if regressed else ''}{name}: " + ', '.join(parts))
+    lines.append(f"{regressions} regression(s) beyond {threshold:.0%}")
+    return lines
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sehat Nabha benchmark suite")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    micro = sub.add_parser('micro', help="In-process micro-benchmarks")
+    micro.add_argument('--corpus-size', type=int, default=500)
+    micro.add_argument('--repeat', type=int, default=3)
+    micro.add_argument('--output', default='benchmark_micro.json')
+
+    load = sub.add_parser('load', help="HTTP load generator")
+    load.add_argument('--url', help="Server base URL (default: start an in-process server)")
+    load.add_argument('--endpoint', action='append', choices=['chat', 'disease', 'medicine-search', 'health-record'],
+                      help="Endpoint to load (repeatable; default: all)")
+    load.add_argument('--duration', type=float, default=20.0, help="Seconds per endpoint")
+    load.add_argument('--warmup', type=float, default=2.0, help="Untimed seconds per endpoint")
+    load.add_argument('--concurrency', type=int, default=8)
+    load.add_argument('--medicine', action='append', help="Medicine name to search (repeatable)")
+    load.add_argument('--output', default='benchmark_load.json')
+
+    cmp_parser = sub.add_parser('compare', help="Compare two result files")
+    cmp_parser.add_argument('baseline')
+    cmp_parser.add_argument('current')
+    cmp_parser.add_argument('--threshold', type=float, default=0.10, help="Allowed slowdown (0.10 = 10%%)")
+
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline_doc = json.load(f)
+        with open(args.current, encoding='utf-8') as f:
+            current_doc = json.load(f)
+        report = compare(baseline_doc, current_doc, args.threshold)
+        print('\n'.join(report))
+        sys.exit(1 if any(line.startswith('REGRESSED') for line in report) else 0)
+
+    if args.command == 'micro':
+        data = run_micro(args.corpus_size, args.repeat)
+    else:
+        data = run_load(args.url, args.endpoint or ['chat', 'disease', 'medicine-search', 'health-record'],
+                        args.duration, args.concurrency, args.medicine or DEFAULT_MEDICINES, args.warmup)
+    print_table(data)
+    write_results(args.output, args.command, data, {k: v for k, v in vars(args).items() if k != 'command'})
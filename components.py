@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Lazily initialized API server subsystems.
+
+Each subsystem is a Component that imports its modules and builds its state
+on first use, so importing api_server costs Flask and nothing else:
+
+    chat      orchestrator (pandas, scipy, knowledge snapshot, semantic index)
+    voice     voice_processor, voice_jobs, tts_cache (pyttsx3, sounddevice, numpy)
+    speech    speech_recognizer, audio_codec (numpy, scipy, vosk); switched with voice
+    medicine  pharmacy stock index
+    records   health-record store
+
+SEHAT_COMPONENTS lists the switches enabled in this process (default:
+chat,voice,medicine,records); a disabled component is never imported and
+its endpoints answer 503. SEHAT_LAZY=1 skips warm-up, so the server starts
+serving at once and each component loads on its first request.
+"""
+
+import os
+import threading
+import importlib
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+SWITCHES = ('chat', 'voice', 'medicine', 'records')
+ENABLED = frozenset(
+    name.strip().lower()
+    for name in os.environ.get('SEHAT_COMPONENTS', ','.join(SWITCHES)).split(',')
+    if name.strip()
+)
+LAZY_START = os.environ.get('SEHAT_LAZY', '').lower() in ('1', 'true', 'yes')
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RECORDS_DB_PATH = os.environ.get('SEHAT_RECORDS_DB', os.path.join(BASE_DIR, 'records', 'records.db'))
+
+
+class ComponentUnavailable(Exception):
+    """The component is disabled in this process or failed to load"""
+
+
+class Component:
+    """A subsystem built once, on first use, by loader()"""
+
+    def __init__(self, name: str, loader: Callable[[], Any], switch: Optional[str] = None,
+                 warm: Optional[Callable[[Any], None]] = None, preload: bool = False):
+        self.name = name
+        self.switch = switch or name
+        # Loaded by warm_all(); only for state that is safe to share across a fork
+        self.preload = preload
+        self._loader = loader
+        self._warm = warm
+        self._value = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.switch in ENABLED
+
+    @property
+    def loaded(self) -> bool:
+        return self._value is not None
+
+    def peek(self) -> Any:
+        """The loaded value, or None; never triggers loading"""
+        return self._value
+
+    def get(self) -> Any:
+        """The loaded value, loading it now if needed; raises ComponentUnavailable"""
+        value = self._value
+        if value is not None:
+            return value
+        if not self.enabled:
+            raise ComponentUnavailable(f"The {self.name} component is disabled on this server")
+        with self._lock:
+            if self._value is None:
+                # A failed load is remembered: a missing dependency will not appear later
+                if self._error is not None:
+                    raise ComponentUnavailable(self._error)
+                try:
+                    self._value = self._loader()
+                    print(f"[API] Component '{self.name}' loaded")
+                except Exception as e:
+                    self._error = f"The {self.name} component is not available: {str(e)}"
+                    print(f"[API] {self._error}")
+                    raise ComponentUnavailable(self._error)
+            return self._value
+
+    def warm(self) -> Optional[str]:
+        """Load now and run the warm-up hook; the error when it failed, None otherwise (or if disabled)"""
+        if not self.enabled:
+            return None
+        try:
+            value = self.get()
+        except ComponentUnavailable as e:
+            return str(e)
+        if self._warm is not None:
+            try:
+                self._warm(value)
+            except Exception as e:
+                error = f"The {self.name} component failed to warm up: {str(e)}"
+                print(f"[API] {error}")
+                return error
+        return None
+
+    def status(self) -> str:
+        if not self.enabled:
+            return 'disabled'
+        if self._value is not None:
+            return 'loaded'
+        return 'failed' if self._error else 'idle'
+
+
+def _load_chat():
+    return importlib.import_module('orchestrator')
+
+
+def _warm_chat(orchestrator) -> None:
+    # Builds lazy structures and fills caches before the first real request
+    orchestrator.analyze(transcript="fever cough headache")
+
+
+def _load_voice():
+    voice_processor = importlib.import_module('voice_processor')
+    voice_jobs = importlib.import_module('voice_jobs')
+    tts_cache = importlib.import_module('tts_cache')
+    return SimpleNamespace(
+        get_voice_processor=voice_processor.get_voice_processor,
+        get_voice_jobs=voice_jobs.get_voice_jobs,
+        jobs_module=voice_jobs,
+        get_tts_cache=tts_cache.get_tts_cache,
+        tts_module=tts_cache,
+        cache_key=tts_cache.cache_key,
+    )
+
+
+def _load_speech():
+    return SimpleNamespace(
+        recognizer=importlib.import_module('speech_recognizer'),
+        codec=importlib.import_module('audio_codec'),
+    )
+
+
+def _load_medicine():
+    from src.medicine.medicine_service import get_medicine_service
+    return get_medicine_service()
+
+
+def _load_records():
+    from src.records.record_store import get_record_store
+    return get_record_store(RECORDS_DB_PATH)
+
+
+# Not preloaded: voice touches the audio devices, medicine may start a stock
+# watcher thread and records holds SQLite connections, none of which survive a fork
+chat = Component('chat', _load_chat, warm=_warm_chat, preload=True)
+voice = Component('voice', _load_voice)
+speech = Component('speech', _load_speech, switch='voice', preload=True)
+medicine = Component('medicine', _load_medicine)
+records = Component('records', _load_records)
+
+COMPONENTS: List[Component] = [chat, voice, speech, medicine, records]
+
+
+def warm_all() -> Dict[str, str]:
+    """
+    Load the enabled fork-safe components (e.g. in the gunicorn master before
+    forking). Returns the error of each one that failed, by component name.
+    """
+    failures = {}
+    for component in COMPONENTS:
+        if component.preload:
+            error = component.warm()
+            if error is not None:
+                failures[component.name] = error
+    return failures
+
+
+def statuses() -> Dict[str, str]:
+    """disabled / idle / loaded / failed per component, without loading anything"""
+    return {component.name: component.status() for component in COMPONENTS}
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Gunicorn settings for production serving of the Sehat Nabha API.
+Usage: gunicorn -c gunicorn.conf.py wsgi:app
+All values can be overridden with SEHAT_* environment variables.
+"""
+
+import gc
+import os
+import tempfile
+import multiprocessing
+
+bind = os.environ.get('SEHAT_BIND', '0.0.0.0:5000')
+
+# Processes x threads; a slow request only ties up one thread of one worker
+workers = int(os.environ.get('SEHAT_WORKERS', str(min(multiprocessing.cpu_count(), 4))))
+threads = int(os.environ.get('SEHAT_THREADS', '4'))
+worker_class = 'gthread'
+
+# Load orchestrator data in the master so workers share it copy-on-write
+preload_app = True
+
+# Request / shutdown timeouts (seconds)
+timeout = int(os.environ.get('SEHAT_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('SEHAT_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('SEHAT_KEEPALIVE', '5'))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('SEHAT_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.environ.get('SEHAT_MAX_REQUESTS_JITTER', '500'))
+
+accesslog = os.environ.get('SEHAT_ACCESS_LOG', '-')
+errorlog = '-'
+
+
+def on_starting(server):
+    # Workers add their metrics up in one directory so /api/metrics reports
+    # the whole server whichever worker answers (see metrics.py)
+    import metrics
+    directory = os.environ.get('SEHAT_METRICS_DIR') or tempfile.mkdtemp(prefix='sehat-metrics-')
+    metrics.enable_multiprocess(directory, clear=True)
+
+
+def when_ready(server):
+    # Move warmed-up objects out of the GC's reach so refcount/GC passes in
+    # the workers do not dirty the shared pages
+    gc.freeze()
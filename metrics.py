@@ -0,0 +1,588 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+In-process metrics in the Prometheus text exposition format (version 0.0.4).
+
+Histograms and counters are updated on the request path with one lock and
+a bisect per observation. Values that already live elsewhere (voice queue
+depth, cache hit counters) are read by collector callbacks only when
+/api/metrics is scraped, so they cost nothing per request.
+
+With several server processes (gunicorn workers) the registry is shared
+through a directory: gunicorn.conf.py enables this at server start with a
+fresh directory (or SEHAT_METRICS_DIR, emptied). Every process then writes
+its counters and histograms to its own file there every
+METRICS_FLUSH_INTERVAL seconds, and a scrape, whichever worker answers it,
+adds up the files of all workers. Files of workers that exited are folded
+into one archive file, so totals keep growing across worker recycling.
+Collector values are read in the answering process only and carry a
+worker="<pid>" label.
+
+A sampling Profiler can also be attached to a single request: a background
+thread snapshots the request thread's stack every PROFILE_INTERVAL seconds
+and aggregates the samples as folded stacks (flamegraph.pl / speedscope
+input). In multi-process mode finished profiles are also written to the
+shared directory, so any worker can return them.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import atexit
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no multi-process serving
+    fcntl = None
+
+# Latency buckets in seconds, from 100 microseconds (a cached analyze stage) to 30 s (voice jobs)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Sampling profiler: opt-in (it exposes stack traces), interval and retained profiles
+PROFILING_ENABLED = os.environ.get('SEHAT_PROFILING', '').lower() in ('1', 'true', 'yes')
+PROFILE_INTERVAL = float(os.environ.get('SEHAT_PROFILE_INTERVAL', '0.001'))
+MAX_PROFILES = 32
+
+# Multi-process mode: directory shared by the workers of one server, and how
+# often each worker writes its values there
+METRICS_DIR = os.environ.get('SEHAT_METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = float(os.environ.get('SEHAT_METRICS_FLUSH_INTERVAL', '5'))
+ARCHIVE_FILE = 'archive.json'
+PROFILES_DIR = 'profiles'
+_PROFILE_ID_RE = re.compile(r'[0-9a-f]{1,32}')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, optionally labelled"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        if _store is not None and not _store.started:
+            _store.start()
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self) -> Dict[Labels, float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset_after_fork(self) -> None:
+        # The lock may have been held by another thread of the parent
+        self._lock = threading.Lock()
+        self._values = {}
+
+    @staticmethod
+    def merge(value: float, other: float) -> float:
+        return value + other
+
+    def samples(self, values: Optional[Dict[Labels, float]] = None) -> List[str]:
+        """Sample lines of this process, or of the given (merged) values"""
+        if values is None:
+            values = self.snapshot()
+        return [f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}' for labels, value in values.items()]
+
+
+class Histogram:
+    """Cumulative-bucket histogram of observations (seconds), optionally labelled"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last slot is +Inf), sum]
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        if _store is not None and not _store.started:
+            _store.start()
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][slot] += 1
+            series[1] += value
+
+    def snapshot(self) -> Dict[Labels, list]:
+        with self._lock:
+            return {labels: [list(counts), total] for labels, (counts, total) in self._series.items()}
+
+    def reset_after_fork(self) -> None:
+        self._lock = threading.Lock()
+        self._series = {}
+
+    @staticmethod
+    def merge(series: list, other: list) -> list:
+        return [[a + b for a, b in zip(series[0], other[0])], series[1] + other[1]]
+
+    def samples(self, series: Optional[Dict[Labels, list]] = None) -> List[str]:
+        """Sample lines of this process, or of the given (merged) series"""
+        if series is None:
+            series = self.snapshot()
+        lines = []
+        for labels, (counts, total) in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f'{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}')
+            lines.append(f'{self.name}_count{_labels(self.labelnames, labels)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Metrics plus scrape-time collectors, rendered together"""
+
+    def __init__(self):
+        self._metrics: List = []
+        # callback() -> iterable of (name, type, help, [(labels dict, value)])
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable) -> None:
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self) -> Dict[str, Dict[Labels, object]]:
+        """Current values of every metric of this process, by metric name"""
+        with self._lock:
+            metrics = list(self._metrics)
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def reset_after_fork(self) -> None:
+        """Forget every value (in a freshly forked process)"""
+        self._lock = threading.Lock()
+        for metric in self._metrics:
+            metric.reset_after_fork()
+
+    def merge(self, snapshots: Iterable[Dict[str, Dict[Labels, object]]]) -> Dict[str, Dict[Labels, object]]:
+        """Sum of several snapshots (of processes running this registry)"""
+        with self._lock:
+            by_name = {metric.name: metric for metric in self._metrics}
+        merged: Dict[str, Dict[Labels, object]] = {}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                metric = by_name.get(name)
+                if metric is None:
+                    continue
+                target = merged.setdefault(name, {})
+                for labels, value in series.items():
+                    target[labels] = metric.merge(target[labels], value) if labels in target else value
+        return merged
+
+    def render(self) -> str:
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        merged = _store.collect() if _store is not None else None
+        # Collector values belong to the answering process only
+        worker = f'{os.getpid()}' if _store is not None else None
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            lines.extend(metric.samples(merged.get(metric.name, {}) if merged is not None else None))
+        for collector in collectors:
+            try:
+                families = list(collector())
+            except Exception as e:
+                print(f"[Metrics] Collector failed: {str(e)}")
+                continue
+            for name, kind, documentation, samples in families:
+                lines.append(f'# HELP {name} {documentation}')
+                lines.append(f'# TYPE {name} {kind}')
+                for labels, value in samples:
+                    if worker is not None:
+                        labels = {**labels, 'worker': worker}
+                    lines.append(f'{name}{_labels(list(labels), list(labels.values()))} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _encode(snapshot: Dict[str, Dict[Labels, object]]) -> Dict[str, list]:
+    return {name: [[list(labels), value] for labels, value in series.items()] for name, series in snapshot.items()}
+
+
+def _decode(data: Dict[str, list]) -> Dict[str, Dict[Labels, object]]:
+    return {name: {tuple(labels): value for labels, value in series} for name, series in data.items()}
+
+
+def _write_json(path: str, data) -> None:
+    # Readers only ever see a complete file
+    temp = f'{path}.{os.getpid()}.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(temp, path)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MultiProcessStore:
+    """
+    Values of one registry shared through a directory by the processes of one server.
+    Each process owns the file <pid>-<id>.json and rewrites it every
+    interval seconds (and on scrape and exit); collect() sums all files.
+    """
+
+    def __init__(self, registry: 'Registry', directory: str, interval: float = METRICS_FLUSH_INTERVAL):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self.started = False
+        self._path = None
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self) -> None:
+        # A forked worker starts from zero: what the parent counted is the parent's
+        self.registry.reset_after_fork()
+        self.started = False
+        self._path = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            # The id keeps a recycled pid from overwriting an exited worker's file
+            self._path = os.path.join(self.directory, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+        return self._path
+
+    def start(self) -> None:
+        """Write this process's file every interval seconds from now on"""
+        with self._lock:
+            if self.started:
+                return
+            self.started = True
+        threading.Thread(target=self._flush_loop, name='metrics-flush', daemon=True).start()
+        atexit.register(self.flush)
+
+    def _flush_loop(self) -> None:
+        pid = os.getpid()
+        while True:
+            time.sleep(self.interval)
+            if os.getpid() != pid:
+                return
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"[Metrics] Could not write {self.path}: {str(e)}")
+
+    def flush(self) -> None:
+        with self._lock:
+            _write_json(self.path, _encode(self.registry.snapshot()))
+
+    def collect(self) -> Dict[str, Dict[Labels, object]]:
+        """Sum of the values of every process that has run this registry since server start"""
+        self.flush()
+        with self._locked():
+            archive = self._read(os.path.join(self.directory, ARCHIVE_FILE)) or {'absorbed': [], 'metrics': {}}
+            absorbed = set(archive['absorbed'])
+            live, dead = [], []
+            for filename in sorted(os.listdir(self.directory)):
+                if not filename.endswith('.json') or filename == ARCHIVE_FILE:
+                    continue
+                path = os.path.join(self.directory, filename)
+                if filename in absorbed:
+                    # Folded into the archive by a scrape that stopped before deleting it
+                    self._remove(path)
+                    continue
+                data = self._read(path)
+                if data is None:
+                    continue
+                pid = int(filename.split('-', 1)[0])
+                (live if _pid_alive(pid) else dead).append((filename, path, data))
+
+            if dead:
+                snapshots = [_decode(archive['metrics'])] + [_decode(data) for _, _, data in dead]
+                archive = {'absorbed': [filename for filename, _, _ in dead],
+                           'metrics': _encode(self.registry.merge(snapshots))}
+                _write_json(os.path.join(self.directory, ARCHIVE_FILE), archive)
+                for _, path, _ in dead:
+                    self._remove(path)
+
+        return self.registry.merge([_decode(archive['metrics'])] + [_decode(data) for _, _, data in live])
+
+    def save_profile(self, profile_id: str, folded: str) -> None:
+        """Keep a finished profile where every process can read it (the MAX_PROFILES newest)"""
+        directory = os.path.join(self.directory, PROFILES_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{profile_id}.folded')
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'w', encoding='utf-8') as f:
+            f.write(folded)
+        os.replace(temp, path)
+        profiles = [entry for entry in os.scandir(directory) if entry.name.endswith('.folded')]
+        if len(profiles) > MAX_PROFILES:
+            profiles.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in profiles[:-MAX_PROFILES]:
+                self._remove(entry.path)
+
+    def load_profile(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID_RE.fullmatch(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, PROFILES_DIR, f'{profile_id}.folded'), encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _locked(self):
+        return _DirectoryLock(os.path.join(self.directory, '.lock'))
+
+    @staticmethod
+    def _read(path: str) -> Optional[Dict]:
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[Metrics] Skipping unreadable {path}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class _DirectoryLock:
+    """Exclusive flock on a file; one scrape at a time archives exited workers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        return False
+
+
+REGISTRY = Registry()
+_store: Optional[MultiProcessStore] = None
+
+
+def enable_multiprocess(directory: str, clear: bool = False) -> MultiProcessStore:
+    """
+    Share REGISTRY through directory from now on; call it in the parent
+    before the worker processes are forked. clear removes the files of a
+    previous server run.
+    """
+    global _store
+    if clear and os.path.isdir(directory):
+        for filename in os.listdir(directory):
+            if filename.endswith('.json'):
+                MultiProcessStore._remove(os.path.join(directory, filename))
+        profiles = os.path.join(directory, PROFILES_DIR)
+        if os.path.isdir(profiles):
+            for filename in os.listdir(profiles):
+                MultiProcessStore._remove(os.path.join(profiles, filename))
+    if _store is None or _store.directory != directory:
+        _store = MultiProcessStore(REGISTRY, directory)
+    return _store
+
+
+if METRICS_DIR:
+    enable_multiprocess(METRICS_DIR)
+
+# Orchestrator
+ANALYZE_STAGE_SECONDS = REGISTRY.histogram(
+    'sehat_analyze_stage_seconds', 'Time spent in each analyze() stage', ['stage'])
+ANALYZE_ERRORS = REGISTRY.counter(
+    'sehat_analyze_errors_total', 'analyze() calls that failed, by exception type', ['exception'])
+
+# HTTP
+REQUEST_SECONDS = REGISTRY.histogram(
+    'sehat_http_request_duration_seconds', 'Time to produce a response (streamed bodies excluded)',
+    ['endpoint', 'method', 'status'])
+REQUEST_EXCEPTIONS = REGISTRY.counter(
+    'sehat_http_exceptions_total', 'Unhandled exceptions raised by request handlers', ['endpoint'])
+SERIALIZE_SECONDS = REGISTRY.histogram(
+    'sehat_http_serialize_seconds', 'JSON serialization time of analysis responses', ['endpoint'])
+
+
+class StageTimer:
+    """
+    Laps of one call through consecutive stages.
+    lap(stage) records the time since the previous lap (or construction),
+    so instrumenting n stages costs n clock reads and n observations.
+    """
+
+    __slots__ = ('histogram', '_last')
+
+    def __init__(self, histogram: Histogram = ANALYZE_STAGE_SECONDS):
+        self.histogram = histogram
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.histogram.observe(now - self._last, stage)
+        self._last = now
+
+
+def cache_family(name: str, documentation: str, caches: Dict[str, Dict]) -> List[Tuple]:
+    """hits/misses counters and hit ratio gauges for caches whose stats() include hits and misses"""
+    hits = [({'cache': cache}, stats.get('hits', 0)) for cache, stats in caches.items()]
+    misses = [({'cache': cache}, stats.get('misses', 0)) for cache, stats in caches.items()]
+    ratios = [
+        ({'cache': cache}, stats['hits'] / (stats['hits'] + stats['misses']) if stats.get('hits', 0) + stats.get('misses', 0) else 0.0)
+        for cache, stats in caches.items()
+    ]
+    return [
+        (f'{name}_hits_total', 'counter', f'{documentation} hits', hits),
+        (f'{name}_misses_total', 'counter', f'{documentation} misses', misses),
+        (f'{name}_hit_ratio', 'gauge', f'{documentation} hit ratio since start', ratios),
+    ]
+
+
+class Profiler:
+    """Sampling profiler for one thread; samples are folded stacks with counts"""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = PROFILE_INTERVAL):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval = interval
+        self.id = uuid.uuid4().hex[:12]
+        self.samples: Dict[str, int] = {}
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}')
+                frame = frame.f_back
+            folded = ';'.join(reversed(stack))
+            self.samples[folded] = self.samples.get(folded, 0) + 1
+
+    def start(self) -> 'Profiler':
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name=f'profiler-{self.id}', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> 'Profiler':
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        _store_profile(self)
+        return self
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def folded(self) -> str:
+        """One 'frame;frame;frame count' line per distinct stack, heaviest first"""
+        ordered = sorted(self.samples.items(), key=lambda item: -item[1])
+        return ''.join(f'{stack} {count}\n' for stack, count in ordered)
+
+
+_profiles: 'OrderedDict[str, Profiler]' = OrderedDict()
+_profiles_lock = threading.Lock()
+
+def _store_profile(profiler: Profiler) -> None:
+    with _profiles_lock:
+        _profiles[profiler.id] = profiler
+        while len(_profiles) > MAX_PROFILES:
+            _profiles.popitem(last=False)
+    if _store is not None:
+        # Next to the metric files, so whichever worker answers GET /api/profiles/<id> finds it
+        try:
+            _store.save_profile(profiler.id, profiler.folded())
+        except OSError as e:
+            print(f"[Metrics] Could not save profile {profiler.id}: {str(e)}")
+
+
+def get_profile(profile_id: str) -> Optional[Profiler]:
+    """A recent finished profile of this process by id (the MAX_PROFILES newest are kept)"""
+    with _profiles_lock:
+        return _profiles.get(profile_id)
+
+
+def folded_profile(profile_id: str) -> Optional[str]:
+    """Folded stacks of a recent finished profile, recorded by any process of the server"""
+    profiler = get_profile(profile_id)
+    if profiler is not None:
+        return profiler.folded()
+    return _store.load_profile(profile_id) if _store is not None else None
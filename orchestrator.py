@@ -4,146 +4,425 @@
 Orchestrator for Sehat Nabha chatbot.
 Main entry point that coordinates all modules (NLP, rules, knowledge).
 Uses modular components for symptom extraction, disease matching, and triage.
+
+Every structure built from the data files lives in one Knowledge bundle held
+by the `knowledge` registry. Each analysis reads the bundle once, so when a
+CSV changes and the registry swaps a rebuilt bundle in, requests in flight
+finish on the version they started with. The module-level names
+(symptom_extractor, disease_matcher, ...) follow the active bundle for
+existing callers.
 """
 
 import os
 import sys
-import pandas as pd
-from typing import Dict, List, Any
+import json
+import hashlib
+from typing import Dict, List, Any, Optional, Tuple
 
 # Add src directory to path for imports
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, os.path.join(BASE_DIR, 'src'))
 
 # Import modular components
-from nlp.symptom_extractor import SymptomExtractor
+from nlp.symptom_extractor import SymptomExtractor, FILLER_WORDS
 from rules.triage_engine import TriageEngine
 from rules.disease_matcher import DiseaseMatcher
+from rules.urgency_table import FrozenDict, UrgencyTable
 from knowledge.knowledge_loader import KnowledgeLoader
 from knowledge.precaution_loader import PrecautionLoader
+from knowledge.snapshot import KnowledgeSnapshot, file_checksum, load_snapshot
+from knowledge.registry import KnowledgeRegistry
+from knowledge.disease_catalog import DiseaseCatalog
+from knowledge.semantic_index import SemanticIndex, load_index, SYMPTOM, DISEASE
+from cache.result_cache import ResultCache
+from metrics import ANALYZE_ERRORS, StageTimer
+
+# CONFIG - paths (CSV files live in data/ when present, otherwise next to this file)
+DATA_DIR = os.path.join(BASE_DIR, "data")
+if not os.path.isdir(DATA_DIR):
+    DATA_DIR = BASE_DIR
+DS_PATH = os.path.join(DATA_DIR, "DiseaseAndSymptoms.csv")
+KB_PATH = os.path.join(DATA_DIR, "disease_knowledgebase.csv")
+PREC_PATH = os.path.join(DATA_DIR, "Disease precaution.csv")
+SEVERITY_PATH = os.path.join(DATA_DIR, "disease_severity.csv")
+LEXICON_PATH = os.path.join(DATA_DIR, "symptom_lexicon.csv")
+SNAPSHOT_PATH = os.environ.get("SEHAT_SNAPSHOT_PATH", os.path.join(DATA_DIR, "knowledge.snap"))
+SEMANTIC_INDEX_PATH = os.environ.get("SEHAT_SEMANTIC_INDEX_PATH", os.path.join(DATA_DIR, "knowledge.vec"))
+# Local sentence-transformers model directory; the hashing embedder is used when unset
+SEMANTIC_MODEL_PATH = os.environ.get("SEHAT_EMBED_MODEL") or None
 
-# CONFIG - paths
-DS_PATH = os.path.join(BASE_DIR, "data", "DiseaseAndSymptoms.csv")
-KB_PATH = os.path.join(BASE_DIR, "data", "disease_knowledgebase.csv")
-PREC_PATH = os.path.join(BASE_DIR, "data", "Disease precaution.csv")
+# Semantic fallback: consulted when exact extraction finds fewer than
+# SEMANTIC_MIN_SYMPTOMS symptoms; hits below the score thresholds are ignored
+SEMANTIC_MIN_SYMPTOMS = int(os.environ.get("SEHAT_SEMANTIC_MIN_SYMPTOMS", "2"))
+SEMANTIC_SYMPTOM_SCORE = float(os.environ.get("SEHAT_SEMANTIC_SYMPTOM_SCORE", "0.42"))
+SEMANTIC_DISEASE_SCORE = float(os.environ.get("SEHAT_SEMANTIC_DISEASE_SCORE", "0.25"))
+SEMANTIC_MAX_INFERRED = 3
+
+# Seconds between checks of the data files for changes; 0 disables hot reload
+KNOWLEDGE_POLL_SECONDS = float(os.environ.get("SEHAT_KNOWLEDGE_POLL", "10"))
 
 # Load data once at startup
-def load_data():
-    """Load all CSV data files"""
+def load_data() -> KnowledgeSnapshot:
+    """Load the compiled knowledge snapshot, recompiling it if a CSV changed"""
     try:
-        ds_df = pd.read_csv(DS_PATH) if os.path.exists(DS_PATH) else pd.DataFrame()
-        kb_df = pd.read_csv(KB_PATH) if os.path.exists(KB_PATH) else pd.DataFrame()
-        prec_df = pd.read_csv(PREC_PATH) if os.path.exists(PREC_PATH) else pd.DataFrame()
-        return ds_df, kb_df, prec_df
+        return load_snapshot(DS_PATH, KB_PATH, PREC_PATH, SNAPSHOT_PATH)
     except Exception as e:
         print(f"Warning: Could not load data files: {e}")
-        return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
-
-# Load all data
-ds_df, kb_df, prec_df = load_data()
+        return KnowledgeSnapshot.empty()
 
-# Build dictionaries from CSV data
-def build_symptom_dict(ds_df: pd.DataFrame) -> Dict[str, List[str]]:
+# Build dictionaries from the snapshot
+def build_symptom_dict(snapshot: KnowledgeSnapshot) -> Dict[str, List[str]]:
     """Build a dictionary mapping diseases to symptoms"""
-    symptom_dict = {}
-    if 'Disease' in ds_df.columns:
-        for _, row in ds_df.iterrows():
-            disease = str(row['Disease']).strip()
-            symptoms = []
-            for col in ds_df.columns:
-                if col.startswith('Symptom_'):
-                    symptom = str(row[col]).strip()
-                    if symptom and symptom != 'nan':
-                        symptoms.append(symptom)
-            if disease not in symptom_dict:
-                symptom_dict[disease] = []
-            symptom_dict[disease].extend(symptoms)
-    for disease in symptom_dict:
-        symptom_dict[disease] = list(set(symptom_dict[disease]))
-    return symptom_dict
-
-def build_kb_dict(kb_df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    return snapshot.symptom_dict()
+
+def build_kb_dict(snapshot: KnowledgeSnapshot) -> Dict[str, Dict[str, Any]]:
     """Build a dictionary of disease knowledge"""
-    kb_dict = {}
-    if 'Disease' in kb_df.columns:
-        for _, row in kb_df.iterrows():
-            disease = str(row['Disease']).strip()
-            kb_dict[disease] = row.to_dict()
-    return kb_dict
+    return dict(snapshot.knowledge)
 
-# Initialize data dictionaries
-symptom_dict = build_symptom_dict(ds_df)
-kb_dict = build_kb_dict(kb_df)
+def load_semantic_index(snapshot: KnowledgeSnapshot) -> Optional[SemanticIndex]:
+    """Open the retrieval index, rebuilding it if the knowledge changed; None disables the fallback"""
+    try:
+        return load_index(snapshot, LEXICON_PATH, SEMANTIC_INDEX_PATH, SEMANTIC_MODEL_PATH)
+    except Exception as e:
+        print(f"Warning: Semantic fallback disabled: {e}")
+        return None
+
+class Knowledge:
+    """Every structure built from the data files, for one version of them; never mutated"""
+
+    def __init__(self, snapshot: KnowledgeSnapshot):
+        self.snapshot = snapshot
+        self.symptom_dict = build_symptom_dict(snapshot)
+        self.kb_dict = build_kb_dict(snapshot)
+        self.symptom_extractor = SymptomExtractor(snapshot.symptoms, LEXICON_PATH)
+        self.disease_matcher = DiseaseMatcher(snapshot)
+        self.knowledge_loader = KnowledgeLoader(snapshot)
+        self.precaution_loader = PrecautionLoader(snapshot)
+        self.urgency_table = UrgencyTable(snapshot.diseases, SEVERITY_PATH)
+        self.semantic_index = load_semantic_index(snapshot)
+        # The snapshot covers the three knowledge CSVs; the lexicon and severity table count too
+        sources = [snapshot.version, file_checksum(LEXICON_PATH), file_checksum(SEVERITY_PATH)]
+        self.version = hashlib.sha256(json.dumps(sources).encode('utf-8')).hexdigest()[:12]
+        self.catalog = DiseaseCatalog(snapshot, self.symptom_dict, self.version)
+
+def build_knowledge() -> Knowledge:
+    knowledge = Knowledge(load_data())
+    print(f"  - Loaded {len(knowledge.symptom_dict)} diseases (knowledge version {knowledge.version})")
+    return knowledge
 
 # Initialize modular components
 print(f"Initializing Sehat Nabha orchestrator...")
-print(f"  - Loaded {len(symptom_dict)} diseases")
 
-symptom_extractor = SymptomExtractor(symptom_dict)
+knowledge = KnowledgeRegistry(
+    build_knowledge,
+    [DS_PATH, KB_PATH, PREC_PATH, SEVERITY_PATH, LEXICON_PATH],
+    interval=KNOWLEDGE_POLL_SECONDS,
+)
 triage_engine = TriageEngine()
-disease_matcher = DiseaseMatcher(symptom_dict, kb_dict)
-knowledge_loader = KnowledgeLoader(KB_PATH)
-precaution_loader = PrecautionLoader(PREC_PATH)
+analysis_cache = ResultCache(
+    maxsize=int(os.environ.get("SEHAT_CACHE_SIZE", "2048")),
+    ttl=float(os.environ.get("SEHAT_CACHE_TTL", "600")),
+)
+
+def _publish(active: Knowledge) -> None:
+    """Point the module-level names at the active bundle (for callers outside analyze)"""
+    global snapshot, symptom_dict, kb_dict, symptom_extractor, disease_matcher
+    global knowledge_loader, precaution_loader, urgency_table, semantic_index
+    snapshot = active.snapshot
+    symptom_dict = active.symptom_dict
+    kb_dict = active.kb_dict
+    symptom_extractor = active.symptom_extractor
+    disease_matcher = active.disease_matcher
+    knowledge_loader = active.knowledge_loader
+    precaution_loader = active.precaution_loader
+    urgency_table = active.urgency_table
+    semantic_index = active.semantic_index
+
+def _on_knowledge_swap(old: Knowledge, new: Knowledge) -> None:
+    _publish(new)
+    # Keys carry the version, so old entries could never hit again; free them now
+    analysis_cache.clear()
+
+_publish(knowledge.current())
+knowledge.on_swap(_on_knowledge_swap)
+
+def reload_knowledge(force: bool = False) -> bool:
+    """Rebuild from the data files now (if changed, or force); True when a new version went live"""
+    return knowledge.reload(force)
 
 def extract_symptoms(text: str) -> List[str]:
     """Extract mentioned symptoms from user input (wrapper for component)"""
-    return symptom_extractor.extract_symptoms(text)
+    return knowledge.current().symptom_extractor.extract_symptoms(text)
 
 def find_matching_diseases(symptoms: List[str]) -> List[Dict[str, Any]]:
     """Find diseases that match the given symptoms (wrapper for component)"""
-    return disease_matcher.find_matching_diseases(symptoms)
+    return knowledge.current().disease_matcher.find_matching_diseases(symptoms)
 
 def determine_triage_level(symptoms: List[str]) -> Dict[str, Any]:
     """Determine urgency level based on symptoms (wrapper for component)"""
     return triage_engine.determine_triage_level(symptoms)
 
+def age_bucket(age: Any) -> Optional[str]:
+    """Coarse age band used in cache keys"""
+    try:
+        age = int(age)
+    except (TypeError, ValueError):
+        return None
+    if age < 5:
+        return 'infant'
+    if age < 13:
+        return 'child'
+    if age < 18:
+        return 'teen'
+    if age < 60:
+        return 'adult'
+    return 'senior'
+
+def _cache_key(kb: Knowledge, symptom_ids: Tuple[int, ...], tokens: List[str], age: Any, sex: Any) -> Tuple:
+    """Canonical key: knowledge version, symptom IDs, triage tokens, age band and sex"""
+    triage_tokens = tuple(sorted(set(tokens) - FILLER_WORDS))
+    sex_key = str(sex).strip().upper()[:1] if sex else None
+    return (kb.version, symptom_ids, triage_tokens, age_bucket(age), sex_key)
+
+def _residual_text(transcript: str, matches: List[Dict[str, Any]]) -> str:
+    """The transcript with exactly matched spans cut out"""
+    pieces, last = [], 0
+    for m in matches:
+        if m['start'] is not None:
+            pieces.append(transcript[last:m['start']])
+            last = m['end']
+    pieces.append(transcript[last:])
+    return ' '.join(pieces)
+
+def _semantic_fallback(kb: Knowledge, scanned: List[Tuple[str, List[Dict[str, Any]]]]) -> List[Tuple[List[Dict[str, Any]], List[Tuple[str, float]]]]:
+    """
+    Retrieval fallback for (transcript, matches) pairs with too few exact symptoms.
+    The unmatched part of every such transcript goes to the semantic index in
+    one batch. Returns, per pair, the matches extended with inferred symptoms
+    (no character span) and (disease, similarity) pairs retrieved from
+    disease descriptions.
+    """
+    results = [(matches, []) for _, matches in scanned]
+    if kb.semantic_index is None:
+        return results
+    pending = [
+        i for i, (_, matches) in enumerate(scanned)
+        if len({m['symptom'] for m in matches}) < SEMANTIC_MIN_SYMPTOMS
+    ]
+    if not pending:
+        return results
+    queries = [_residual_text(*scanned[i]) for i in pending]
+    for i, hits in zip(pending, kb.semantic_index.search(queries, k=8)):
+        matches = list(scanned[i][1])
+        known = {m['symptom'] for m in matches}
+        inferred, diseases = 0, []
+        for kind, name, score in hits:
+            if kind == SYMPTOM and score >= SEMANTIC_SYMPTOM_SCORE and name not in known and inferred < SEMANTIC_MAX_INFERRED:
+                known.add(name)
+                inferred += 1
+                matches.append({'symptom': name, 'text': None, 'start': None, 'end': None,
+                                'similarity': round(score, 3)})
+            elif kind == DISEASE and score >= SEMANTIC_DISEASE_SCORE:
+                diseases.append((name, score))
+        results[i] = (matches, diseases)
+    return results
+
+def _with_retrieved(kb: Knowledge, ranked_diagnoses: List[Dict[str, Any]], retrieved: List[Tuple[str, float]]) -> List[Dict[str, Any]]:
+    """Append retrieved diseases not already ranked, up to the matcher's top_k"""
+    names = {d['name'] for d in ranked_diagnoses}
+    for name, similarity in retrieved:
+        if len(ranked_diagnoses) >= kb.disease_matcher.top_k:
+            break
+        if name not in names:
+            names.add(name)
+            ranked_diagnoses.append(kb.disease_matcher.retrieved(name, similarity))
+    return ranked_diagnoses
+
+def _diagnose(kb: Knowledge, extracted_symptoms: List[str], overall_triage: Dict[str, Any],
+              ranked_diagnoses: List[Dict[str, Any]], get_precautions,
+              timer: Optional[StageTimer] = None) -> Dict[str, Any]:
+    """Attach urgency and precautions to ranked diagnoses (the cacheable part of a result)"""
+    # Add urgency level for each disease
+    for diagnosis in ranked_diagnoses:
+        diagnosis['urgency'] = kb.urgency_table.lookup(diagnosis['name'], diagnosis['match_count'])
+    if timer is not None:
+        timer.lap('urgency')
+    for diagnosis in ranked_diagnoses:
+        diagnosis['precautions'] = get_precautions(diagnosis['name'])
+    
+    mapped_precautions = {}
+    if ranked_diagnoses:
+        top_diagnosis = ranked_diagnoses[0]['name']
+        precautions = get_precautions(top_diagnosis)
+        mapped_precautions = {'disease': top_diagnosis, 'precautions': precautions}
+    
+    return {
+        'diagnoses': ranked_diagnoses,
+        'overall_triage': overall_triage,
+        'mapped_precautions': mapped_precautions,
+    }
+
+def _thaw(value: Any) -> Any:
+    """Copy of the dicts and lists in a cached value; read-only urgency responses stay shared"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_thaw(v) for v in value]
+    return value
+
+def _assemble_result(kb: Knowledge, transcript: str, age: int, sex: str, matches: List[Dict[str, Any]],
+                     diagnosis: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the response dict; diagnosis may be shared with the cache, so the response gets a copy"""
+    diagnosis = _thaw(diagnosis)
+    return {
+        'transcript': transcript,
+        'symptoms_extracted': [
+            {'name': m['symptom'], 'text': m['text'], 'start': m['start'], 'end': m['end'],
+             **({'similarity': m['similarity']} if 'similarity' in m else {})}
+            for m in matches
+        ],
+        'diagnoses': diagnosis['diagnoses'],
+        'overall_triage': diagnosis['overall_triage'],
+        'mapped_precautions': diagnosis['mapped_precautions'],
+        'age': age,
+        'sex': sex,
+        'knowledge_version': kb.version,
+        'success': True
+    }
+
+def _error_result(transcript: str, error: Exception) -> Dict[str, Any]:
+    import traceback
+    traceback.print_exc()
+    ANALYZE_ERRORS.inc(type(error).__name__)
+    return {
+        'transcript': transcript,
+        'symptoms_extracted': [],
+        'diagnoses': [],
+        'overall_triage': None,
+        'mapped_precautions': {},
+        'error': str(error),
+        'success': False
+    }
+
 def analyze(transcript: str, age: int = None, sex: str = None) -> Dict[str, Any]:
     """
     Main analysis function using modular components.
     Coordinates between NLP, rules, and knowledge modules.
+    Results for equivalent inputs are served from analysis_cache; each call
+    returns its own copy (only the urgency responses are shared, read-only).
+    Each stage's duration is recorded in the sehat_analyze_stage_seconds
+    histogram (stages skipped on a cache hit are not recorded).
     """
     try:
-        extracted_symptoms = symptom_extractor.extract_symptoms(transcript)
-        overall_triage = triage_engine.determine_triage_level(extracted_symptoms + transcript.lower().split())
-        disease_matches = disease_matcher.find_matching_diseases(extracted_symptoms)
-        ranked_diagnoses = disease_matcher.rank_diseases(disease_matches)
-        
-        # Add urgency level for each disease
-        for diagnosis in ranked_diagnoses:
-            disease_name = diagnosis['name']
-            disease_urgency = determine_disease_urgency(disease_name, extracted_symptoms, diagnosis['match_count'])
-            diagnosis['urgency'] = disease_urgency
-            diagnosis['precautions'] = precaution_loader.get_precautions(disease_name)
-        
-        mapped_precautions = {}
-        if ranked_diagnoses:
-            top_diagnosis = ranked_diagnoses[0]['name']
-            precautions = precaution_loader.get_precautions(top_diagnosis)
-            mapped_precautions = {'disease': top_diagnosis, 'precautions': precautions}
-        
-        result = {
-            'transcript': transcript,
-            'symptoms_extracted': [{'name': s} for s in extracted_symptoms],
-            'diagnoses': ranked_diagnoses,
-            'overall_triage': overall_triage,
-            'mapped_precautions': mapped_precautions,
-            'age': age,
-            'sex': sex,
-            'success': True
-        }
+        timer = StageTimer()
+        # One version of the knowledge for the whole call, even if a reload swaps it meanwhile
+        kb = knowledge.current()
+        # One pass yields both the symptom hits and the tokens used for triage
+        matches, tokens = kb.symptom_extractor.scan(transcript)
+        timer.lap('extract')
+        matches, retrieved = _semantic_fallback(kb, [(transcript, matches)])[0]
+        timer.lap('semantic')
+        extracted_symptoms = list(dict.fromkeys(m['symptom'] for m in matches))
+        key = _cache_key(kb, tuple(sorted(kb.disease_matcher.to_ids(extracted_symptoms))), tokens, age, sex)
+        diagnosis = analysis_cache.get(key)
+        timer.lap('cache')
+        if diagnosis is None:
+            overall_triage = triage_engine.determine_triage_level(extracted_symptoms + tokens)
+            timer.lap('triage')
+            ranked_diagnoses = _with_retrieved(kb, kb.disease_matcher.match(extracted_symptoms), retrieved)
+            timer.lap('match')
+            diagnosis = _diagnose(kb, extracted_symptoms, overall_triage, ranked_diagnoses,
+                                  kb.precaution_loader.get_precautions, timer)
+            timer.lap('precautions')
+            analysis_cache.put(key, diagnosis)
+        result = _assemble_result(kb, transcript, age, sex, matches, diagnosis)
+        timer.lap('assemble')
         return result
     except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return {
-            'transcript': transcript,
-            'symptoms_extracted': [],
-            'diagnoses': [],
-            'overall_triage': None,
-            'mapped_precautions': {},
-            'error': str(e),
-            'success': False
-        }
+        return _error_result(transcript, e)
+
+def analyze_many(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Analyze a batch of consultations in one pass.
+    Each record is {'transcript': str, 'age': int, 'sex': str}. Identical
+    transcripts are scanned once, cache misses with distinct symptom sets are
+    matched together in one sparse product, and precautions are looked up once
+    per disease. Results are returned in input order.
+    """
+    timer = StageTimer()
+    kb = knowledge.current()
+    scans = {}
+    raw_scans = {}
+    for record in records:
+        transcript = record.get('transcript') or ''
+        if transcript in scans or transcript in raw_scans:
+            continue
+        try:
+            raw_scans[transcript] = kb.symptom_extractor.scan(transcript)
+        except Exception as e:
+            scans[transcript] = _error_result(transcript, e)
+    timer.lap('batch_extract')
+
+    # One batched retrieval query for every transcript with too few exact symptoms
+    fallback = _semantic_fallback(kb, [(transcript, matches) for transcript, (matches, _) in raw_scans.items()])
+    for (transcript, (_, tokens)), (matches, retrieved) in zip(raw_scans.items(), fallback):
+        extracted = list(dict.fromkeys(m['symptom'] for m in matches))
+        scans[transcript] = (matches, tokens, extracted, tuple(sorted(kb.disease_matcher.to_ids(extracted))), retrieved)
+    timer.lap('batch_semantic')
+
+    # Look up every record first so only cache misses reach the matcher
+    cached = []
+    symptom_sets = {}
+    for record in records:
+        scanned = scans[record.get('transcript') or '']
+        if isinstance(scanned, dict):
+            cached.append(None)
+            continue
+        _, tokens, _, ids, _ = scanned
+        key = _cache_key(kb, ids, tokens, record.get('age'), record.get('sex'))
+        diagnosis = analysis_cache.get(key)
+        if diagnosis is None:
+            symptom_sets.setdefault(ids, None)
+        cached.append((key, diagnosis))
+
+    id_sets = list(symptom_sets)
+    for ids, diagnoses in zip(id_sets, kb.disease_matcher.match_batch(id_sets, top_k=kb.disease_matcher.top_k)):
+        symptom_sets[ids] = diagnoses
+    timer.lap('batch_match')
+
+    precautions = {}
+    def get_precautions(name: str) -> List[str]:
+        if name not in precautions:
+            precautions[name] = kb.precaution_loader.get_precautions(name)
+        return precautions[name]
+
+    computed = {}
+    results = []
+    for record, entry in zip(records, cached):
+        transcript = record.get('transcript') or ''
+        scanned = scans[transcript]
+        if isinstance(scanned, dict):
+            results.append(dict(scanned))
+            continue
+        try:
+            matches, tokens, extracted, ids, retrieved = scanned
+            key, diagnosis = entry
+            if diagnosis is None:
+                diagnosis = computed.get(key)
+            if diagnosis is None:
+                overall_triage = triage_engine.determine_triage_level(extracted + tokens)
+                # Copy the shared diagnoses so records with the same symptoms do not alias
+                ranked_diagnoses = _with_retrieved(kb, [dict(d) for d in symptom_sets[ids]], retrieved)
+                diagnosis = _diagnose(kb, extracted, overall_triage, ranked_diagnoses, get_precautions)
+                computed[key] = diagnosis
+                analysis_cache.put(key, diagnosis)
+            results.append(_assemble_result(kb, transcript, record.get('age'), record.get('sex'), matches, diagnosis))
+        except Exception as e:
+            results.append(_error_result(transcript, e))
+    timer.lap('batch_diagnose')
+    return results
 
 
 def determine_disease_urgency(disease_name: str, symptoms: List[str], match_count: int) -> Dict[str, Any]:
@@ -152,110 +431,11 @@ def determine_disease_urgency(disease_name: str, symptoms: List[str], match_coun
     1. Match count (primary factor)
     2. Disease type severity (secondary factor)
     
-    Higher match count = higher urgency
+    Higher match count = higher urgency. Severity is classified once per
+    disease at load time (see disease_severity.csv); the returned dict is a
+    shared read-only object.
     """
-    # Disease severity mapping (predefined medical knowledge)
-    high_severity_diseases = {
-        'heart attack': True, 'stroke': True, 'myocardial infarction': True,
-        'sepsis': True, 'acute respiratory distress': True, 'pneumonia': True,
-        'meningitis': True, 'encephalitis': True, 'anaphylaxis': True,
-        'status asthmaticus': True, 'hemorrhage': True, 'trauma': True
-    }
-    
-    medium_severity_diseases = {
-        'appendicitis': True, 'pancreatitis': True, 'cholecystitis': True,
-        'dengue': True, 'malaria': True, 'typhoid': True, 'hepatitis': True,
-        'gastroenteritis': True, 'urinary tract infection': True, 'kidney stones': True,
-        'severe infection': True, 'diabetes': True
-    }
-    
-    disease_lower = disease_name.lower()
-    
-    # Check if disease is in high severity list
-    if any(severe in disease_lower for severe in high_severity_diseases.keys()):
-        # High severity disease + 4+ matching symptoms = CRITICAL
-        if match_count >= 4:
-            return {
-                'level': 'Critical',
-                'color': 'red',
-                'icon': '🚨',
-                'reasoning': f'{disease_name} is a critical condition',
-                'action': 'Call emergency services (102/911) immediately'
-            }
-        # High severity disease + 2-3 matching symptoms = URGENT
-        elif match_count >= 2:
-            return {
-                'level': 'Urgent',
-                'color': 'red',
-                'icon': '⚠️',
-                'reasoning': f'{disease_name} requires immediate hospital visit',
-                'action': 'Go to hospital/emergency center NOW'
-            }
-        # High severity disease + 1 matching symptom = MODERATE
-        else:
-            return {
-                'level': 'Moderate',
-                'color': 'amber',
-                'icon': '⏱️',
-                'reasoning': f'Symptoms suggest {disease_name}, needs urgent evaluation',
-                'action': 'Visit hospital within 2-4 hours'
-            }
-    
-    # Check if disease is in medium severity list
-    if any(med in disease_lower for med in medium_severity_diseases.keys()):
-        # Medium severity + 4+ matching symptoms = URGENT
-        if match_count >= 4:
-            return {
-                'level': 'Urgent',
-                'color': 'amber',
-                'icon': '⚠️',
-                'reasoning': f'{disease_name} needs prompt medical attention',
-                'action': 'Visit hospital/clinic today'
-            }
-        # Medium severity + 2-3 matching symptoms = MODERATE
-        elif match_count >= 2:
-            return {
-                'level': 'Moderate',
-                'color': 'amber',
-                'icon': '⏱️',
-                'reasoning': f'{disease_name} requires medical consultation soon',
-                'action': 'See doctor within 24 hours'
-            }
-        # Medium severity + 1 matching symptom = MILD
-        else:
-            return {
-                'level': 'Mild',
-                'color': 'green',
-                'icon': '✓',
-                'reasoning': f'Possible {disease_name}, monitor symptoms',
-                'action': 'Home care, consult doctor if symptoms worsen'
-            }
-    
-    # Low severity diseases (common cold, minor infections, etc.)
-    if match_count >= 4:
-        return {
-            'level': 'Moderate',
-            'color': 'amber',
-            'icon': '⏱️',
-            'reasoning': f'Likely {disease_name}, moderate match',
-            'action': 'See doctor within 2-3 days'
-        }
-    elif match_count >= 2:
-        return {
-            'level': 'Mild',
-            'color': 'green',
-            'icon': '✓',
-            'reasoning': f'Possible {disease_name}, monitor symptoms',
-            'action': 'Home care, consult doctor if needed'
-        }
-    
-    return {
-        'level': 'Mild',
-        'color': 'green',
-        'icon': '✓',
-        'reasoning': f'Low likelihood of {disease_name}',
-        'action': 'Monitor symptoms, consult if they persist'
-    }
+    return knowledge.current().urgency_table.lookup(disease_name, match_count)
 
 if __name__ == '__main__':
     # Test the analyzer
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Offline speech recognition with Vosk.
+Models are loaded once per process and kept resident; recognizers are cheap
+and created per stream. StreamingTranscriber accepts audio as it arrives and
+reports partial and stabilized text, so recognition overlaps a slow upload
+instead of starting after the whole clip has been received.
+
+When the client does not say which language it spoke, identify_and_transcribe
+decodes only a short prefix with each resident model, keeps the language
+whose words were recognized most confidently and decodes the clip in that
+language alone.
+
+Models are looked up as models/vosk-<lang> (override the directory with
+SEHAT_VOSK_MODEL_DIR, or one model with SEHAT_VOSK_MODEL_EN/_HI/_PA).
+"""
+
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from audio_dsp import PCMConverter, parse_wav_header, recognizer_pcm
+
+try:
+    import vosk
+    vosk.SetLogLevel(-1)
+except ImportError:
+    vosk = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get('SEHAT_VOSK_MODEL_DIR', os.path.join(BASE_DIR, 'models'))
+LANGUAGES = ('en', 'hi', 'pa')
+DEFAULT_LANGUAGE = 'en'
+
+# Language codes, names and native names clients send as a hint
+LANGUAGE_ALIASES = {
+    'en': 'en', 'eng': 'en', 'english': 'en',
+    'hi': 'hi', 'hin': 'hi', 'hindi': 'hi', 'हिन्दी': 'hi', 'हिंदी': 'hi',
+    'pa': 'pa', 'pan': 'pa', 'punjabi': 'pa', 'ਪੰਜਾਬੀ': 'pa',
+}
+
+SAMPLE_RATE = 16000
+# Give up looking for the WAV data chunk after this many bytes
+MAX_WAV_HEADER = 4096
+# Bytes fed to the recognizer at a time when transcribing a whole clip
+FEED_BYTES = 8000
+# Seconds of audio decoded per candidate language during identification
+LID_PREFIX_SECONDS = float(os.environ.get('SEHAT_LID_PREFIX_SECONDS', '2.0'))
+
+
+def model_path(language: str) -> str:
+    return os.environ.get(f'SEHAT_VOSK_MODEL_{language.upper()}') or os.path.join(MODEL_DIR, f'vosk-{language}')
+
+
+_models: Dict[str, object] = {}
+_models_lock = threading.Lock()
+
+def get_model(language: str):
+    """Resident Vosk model for language, loaded on first use; None if not installed"""
+    if vosk is None:
+        return None
+    model = _models.get(language)
+    if model is None:
+        with _models_lock:
+            model = _models.get(language)
+            if model is None:
+                path = model_path(language)
+                if not os.path.isdir(path):
+                    return None
+                print(f"[STT] Loading {language} model from {path}")
+                model = _models[language] = vosk.Model(path)
+    return model
+
+
+def normalize_language(value: Optional[str]) -> Optional[str]:
+    """Language code for a client hint, or None when absent, 'auto' or unknown"""
+    if not value:
+        return None
+    return LANGUAGE_ALIASES.get(str(value).strip().lower())
+
+
+def installed_languages() -> List[str]:
+    """Languages whose model is present (loads them)"""
+    return [language for language in LANGUAGES if get_model(language) is not None]
+
+
+class StreamingTranscriber:
+    """
+    Incremental recognizer for one audio stream: raw 16-bit mono PCM, or a
+    WAV stream in any PCM format (converted to 16 kHz mono as it arrives)
+    """
+
+    def __init__(self, language: str, sample_rate: int = SAMPLE_RATE):
+        self.model = get_model(language)
+        if self.model is None:
+            raise RuntimeError(f"No speech model installed for '{language}'")
+        self.language = language
+        self.sample_rate = sample_rate
+        self.segments: List[str] = []
+        # Per-word recognizer confidence of every stabilized word
+        self.confidences: List[float] = []
+        self.partial = ''
+        self._recognizer = None
+        self._converter: Optional[PCMConverter] = None
+        # Bytes held back until we know whether the stream starts with a WAV header
+        self._head = b''
+        # Odd trailing byte carried over so samples never split across feeds
+        self._carry = b''
+
+    @property
+    def text(self) -> str:
+        """Stabilized transcript: every utterance the recognizer has finalized"""
+        return ' '.join(self.segments)
+
+    @property
+    def confidence(self) -> float:
+        """Mean word confidence so far; 0.0 before any word is recognized"""
+        if not self.confidences:
+            return 0.0
+        return sum(self.confidences) / len(self.confidences)
+
+    def _start(self, data: bytes) -> Optional[bytes]:
+        self._head += data
+        if len(self._head) < 4:
+            return None
+        if self._head[:4] == b'RIFF':
+            header = parse_wav_header(self._head)
+            if header is None:
+                if len(self._head) > MAX_WAV_HEADER:
+                    raise ValueError("WAV header too large")
+                return None
+            offset, rate, channels, width = header
+            if (rate, channels, width) != (SAMPLE_RATE, 1, 2):
+                self._converter = PCMConverter(rate, channels, width, SAMPLE_RATE)
+            self.sample_rate = SAMPLE_RATE
+            data = self._head[offset:]
+        else:
+            data = self._head
+        self._head = b''
+        self._recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
+        self._recognizer.SetWords(True)
+        return data
+
+    def feed(self, data: bytes) -> bool:
+        """Feed the next piece of the stream; True when a new utterance was stabilized"""
+        if self._recognizer is None:
+            data = self._start(data)
+            if data is None:
+                return False
+        if self._converter is not None:
+            data = self._converter.convert(data)
+        else:
+            data = self._carry + data
+            cut = len(data) & ~1
+            data, self._carry = data[:cut], data[cut:]
+        if not data:
+            return False
+        if self._recognizer.AcceptWaveform(data):
+            self.partial = ''
+            return self._add_segment(self._recognizer.Result())
+        self.partial = json.loads(self._recognizer.PartialResult()).get('partial', '')
+        return False
+
+    def _add_segment(self, result: str) -> bool:
+        result = json.loads(result)
+        segment = result.get('text', '').strip()
+        self.confidences.extend(word.get('conf', 0.0) for word in result.get('result', []))
+        if segment:
+            self.segments.append(segment)
+        return bool(segment)
+
+    def feed_all(self, data: bytes) -> None:
+        for start in range(0, len(data), FEED_BYTES):
+            self.feed(data[start:start + FEED_BYTES])
+
+    def finish(self) -> str:
+        """Flush the recognizer and return the full transcript (feeding may continue)"""
+        if self._recognizer is not None:
+            self._add_segment(self._recognizer.FinalResult())
+        self.partial = ''
+        return self.text
+
+
+def transcribe(audio_data: bytes, language: str) -> str:
+    """Transcribe a complete clip in one pass"""
+    transcriber = StreamingTranscriber(language)
+    transcriber.feed_all(audio_data)
+    return transcriber.finish()
+
+
+def identify_and_transcribe(audio_data: bytes, hint: Optional[str] = None) -> Tuple[str, str]:
+    """
+    Pick the spoken language and transcribe the clip.
+
+    A hint (code or language name) skips identification entirely. Otherwise
+    every installed model decodes only the first LID_PREFIX_SECONDS with a
+    throwaway recognizer, and the most confident language then decodes the
+    clip from the start. Probes are flushed at the prefix boundary, which
+    would split a word spanning it, so the winner never continues from its
+    probe; only a clip no longer than the prefix reuses the probe's text.
+
+    Returns:
+        (language code, transcript)
+    """
+    if audio_data[:4] == b'RIFF':
+        # Whole clip at hand: convert once with the polyphase resampler
+        audio_data = recognizer_pcm(audio_data)
+
+    language = normalize_language(hint)
+    if language is not None and get_model(language) is not None:
+        return language, transcribe(audio_data, language)
+
+    candidates = installed_languages()
+    if not candidates:
+        raise RuntimeError("No speech models installed")
+    if len(candidates) == 1:
+        return candidates[0], transcribe(audio_data, candidates[0])
+
+    split = int(LID_PREFIX_SECONDS * SAMPLE_RATE) * 2
+    prefix, rest = audio_data[:split], audio_data[split:]
+    probes = {}
+    for candidate in candidates:
+        probe = probes[candidate] = StreamingTranscriber(candidate)
+        probe.feed_all(prefix)
+        probe.finish()
+    language = max(candidates, key=lambda c: (probes[c].confidence, c == DEFAULT_LANGUAGE))
+    if not rest:
+        return language, probes[language].text
+    return language, transcribe(audio_data, language)
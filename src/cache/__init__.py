@@ -0,0 +1 @@
+"""In-process result caches"""
@@ -0,0 +1 @@
+"""Knowledge base loaders backed by the compiled snapshot"""
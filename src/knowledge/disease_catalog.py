@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disease catalog: name index and prebuilt /api/disease responses.
+
+Names are looked up through one normalized index (case, spacing and
+punctuation folded) that also holds aliases: the parts of names such as
+"Dimorphic hemmorhoids(piles)", the spellings the knowledge base CSV uses
+for the same disease, and the common, Hindi and Punjabi names in
+DISEASE_ALIASES. Names still not found are corrected with the bigram
+FuzzyIndex ("maleria" -> Malaria).
+
+Every response body is serialized once, when the catalog is built, together
+with its ETag; the whole catalog is also kept as one JSON document and its
+gzip encoding. A catalog belongs to one knowledge version and is rebuilt
+with it.
+"""
+
+import re
+import gzip
+import json
+import hashlib
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from knowledge.snapshot import KnowledgeSnapshot
+from nlp.fuzzy_index import FuzzyIndex
+from nlp.symptom_extractor import TOKEN_RE, normalize_token
+
+# Extra names per disease, keyed by the normalized catalog name
+DISEASE_ALIASES: Dict[str, Tuple[str, ...]] = {
+    'malaria': ('मलेरिया', 'ਮਲੇਰੀਆ'),
+    'dengue': ('dengue fever', 'डेंगू', 'ਡੇਂਗੂ'),
+    'typhoid': ('typhoid fever', 'enteric fever', 'मियादी बुखार', 'टाइफाइड', 'ਟਾਈਫਾਈਡ'),
+    'tuberculosis': ('tb', 'टीबी', 'तपेदिक', 'क्षय रोग', 'ਟੀਬੀ'),
+    'jaundice': ('पीलिया', 'ਪੀਲੀਆ'),
+    'pneumonia': ('निमोनिया', 'ਨਿਮੋਨੀਆ'),
+    'common cold': ('cold', 'जुकाम', 'सर्दी जुकाम', 'ਜ਼ੁਕਾਮ'),
+    'chicken pox': ('chickenpox', 'varicella', 'चेचक', 'छोटी माता', 'ਚੇਚਕ'),
+    'diabetes': ('diabetes mellitus', 'sugar', 'मधुमेह', 'शुगर', 'ਸ਼ੂਗਰ'),
+    'hypertension': ('high blood pressure', 'high bp', 'उच्च रक्तचाप', 'हाई बीपी', 'ਹਾਈ ਬੀਪੀ'),
+    'hypoglycemia': ('low blood sugar', 'low sugar'),
+    'bronchial asthma': ('asthma', 'दमा', 'ਦਮਾ'),
+    'heart attack': ('myocardial infarction', 'दिल का दौरा', 'ਦਿਲ ਦਾ ਦੌਰਾ'),
+    'migraine': ('माइग्रेन', 'आधासीसी'),
+    'gastroenteritis': ('stomach flu', 'दस्त उल्टी'),
+    'gerd': ('acid reflux', 'gastroesophageal reflux disease', 'एसिडिटी'),
+    'peptic ulcer diseae': ('peptic ulcer disease', 'peptic ulcer', 'stomach ulcer', 'अल्सर'),
+    'osteoarthristis': ('osteoarthritis',),
+    'dimorphic hemmorhoids piles': ('hemorrhoids', 'haemorrhoids', 'बवासीर', 'ਬਵਾਸੀਰ'),
+    'vertigo paroymsal positional vertigo': ('paroxysmal positional vertigo', 'bppv', 'चक्कर'),
+    'paralysis brain hemorrhage': ('stroke', 'लकवा', 'ਅਧਰੰਗ'),
+    'urinary tract infection': ('uti', 'मूत्र संक्रमण'),
+    'aids': ('hiv', 'hiv aids', 'एड्स', 'ਏਡਜ਼'),
+    'fungal infection': ('fungus', 'दाद', 'ਦਾਦ'),
+    'acne': ('pimples', 'मुंहासे', 'ਮੁਹਾਸੇ'),
+    'allergy': ('एलर्जी', 'ਐਲਰਜੀ'),
+    'arthritis': ('गठिया', 'ਗਠੀਆ'),
+    'psoriasis': ('सोरायसिस',),
+    'varicose veins': ('varicose', 'वैरिकाज़ नसें'),
+}
+
+RECOMMENDATIONS = [
+    "Consult with a qualified healthcare professional",
+    "Do not self-diagnose or self-medicate",
+    "Follow medical advice from licensed practitioners",
+]
+
+# Text in parentheses is a second name: "Paralysis (brain hemorrhage)", "(vertigo) ..."
+_PARENTHESIS_RE = re.compile(r'\(([^)]*)\)')
+
+
+def normalize_name(name: str) -> str:
+    """Index key of a name: case-folded tokens joined by single spaces"""
+    text = unicodedata.normalize('NFKC', name or '').casefold()
+    return ' '.join(normalize_token(token) for token in TOKEN_RE.findall(text))
+
+
+def name_forms(name: str) -> List[str]:
+    """Keys a name is known by: the whole name, the name without its parenthesis and the parenthesis"""
+    forms = [normalize_name(name), normalize_name(_PARENTHESIS_RE.sub(' ', name))]
+    forms += [normalize_name(part) for part in _PARENTHESIS_RE.findall(name)]
+    return [form for form in dict.fromkeys(forms) if form]
+
+
+def _dumps(data) -> bytes:
+    # Same shape as jsonify (sorted keys, compact)
+    return json.dumps(data, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _etag(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:20]
+
+
+class CatalogEntry:
+    """One disease: its data and the serialized /api/disease response"""
+
+    __slots__ = ('name', 'data', 'body', 'etag')
+
+    def __init__(self, name: str, data: Dict):
+        self.name = name
+        self.data = data
+        self.body = _dumps({"success": True, **data})
+        self.etag = _etag(self.body)
+
+
+class DiseaseCatalog:
+    """Every disease in one knowledge version, indexed by normalized name and alias"""
+
+    def __init__(self, snapshot: KnowledgeSnapshot, symptom_dict: Dict[str, List[str]], version: str):
+        self.version = version
+        self._index: Dict[str, str] = {}
+        names: Dict[str, Dict[str, Optional[str]]] = {}
+
+        # The diagnosed names come first: they are what clients ask for
+        for disease in snapshot.diseases:
+            self._claim(names, disease.strip(), {'symptoms': disease})
+        for disease in snapshot.knowledge:
+            self._claim(names, disease.strip(), {'knowledge': disease})
+        for disease in snapshot.precautions:
+            self._claim(names, disease.strip(), {'precautions': disease})
+
+        self.entries: Dict[str, CatalogEntry] = {}
+        for name, sources in names.items():
+            record = snapshot.knowledge.get(sources.get('knowledge'), {})
+            symptoms = symptom_dict.get(sources.get('symptoms'), [])
+            self.entries[name] = CatalogEntry(name, {
+                "name": name,
+                "description": record.get('Description') or f"Information about {name}",
+                "symptoms": [symptom.replace('_', ' ').strip() for symptom in symptoms],
+                "precautions": list(snapshot.precautions.get(sources.get('precautions'), [])),
+                "recommendations": RECOMMENDATIONS,
+                "knowledge_version": version,
+            })
+
+        for key, aliases in DISEASE_ALIASES.items():
+            name = self._index.get(key)
+            if name is not None:
+                for alias in aliases:
+                    self._index.setdefault(normalize_name(alias), name)
+        self._fuzzy = FuzzyIndex(self._index)
+
+        self.body = _dumps({
+            "success": True,
+            "knowledge_version": version,
+            "count": len(self.entries),
+            "diseases": [entry.data for entry in self.entries.values()],
+            "aliases": self._index,
+        })
+        self.etag = _etag(self.body)
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+
+    def _claim(self, names: Dict[str, Dict[str, Optional[str]]], name: str, source: Dict[str, str]) -> None:
+        """Attach a source row to the disease one of its forms already names, or start a new disease"""
+        forms = name_forms(name)
+        if not forms:
+            return
+        existing = next((self._index[form] for form in forms if form in self._index), None)
+        if existing is None:
+            existing = name
+            names[name] = {}
+        names[existing].update(source)
+        for form in forms:
+            self._index.setdefault(form, existing)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Catalog name for a name, alias or misspelling; None if nothing is close"""
+        forms = name_forms(name)
+        for form in forms:
+            if form in self._index:
+                return self._index[form]
+        for form in forms:
+            # A misspelling as close to two diseases ("hepatitis") names neither
+            candidates = {self._index[word] for word in self._fuzzy.closest(form)}
+            if len(candidates) == 1:
+                return candidates.pop()
+        return None
+
+    def lookup(self, name: str) -> Optional[CatalogEntry]:
+        resolved = self.resolve(name)
+        return self.entries[resolved] if resolved is not None else None
+
+    def unknown(self, name: str) -> Dict:
+        """Response data for a name that resolves to no disease"""
+        return {
+            "name": name,
+            "description": f"Information about {name}",
+            "symptoms": [],
+            "precautions": [],
+            "recommendations": RECOMMENDATIONS,
+            "knowledge_version": self.version,
+        }
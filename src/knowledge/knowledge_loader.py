@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disease knowledge lookups (descriptions) served from the knowledge snapshot.
+"""
+
+from typing import Dict, Any, Optional
+
+from knowledge.snapshot import KnowledgeSnapshot
+
+
+class KnowledgeLoader:
+    """Look up disease descriptions by name"""
+
+    def __init__(self, snapshot: KnowledgeSnapshot):
+        self.knowledge = snapshot.knowledge
+        self._by_lower = {name.lower(): name for name in self.knowledge}
+
+    def get_disease_record(self, name: str) -> Optional[Dict[str, Any]]:
+        """Full knowledge row for a disease, matched case-insensitively"""
+        if not name:
+            return None
+        key = self._by_lower.get(name.strip().lower())
+        return self.knowledge.get(key) if key else None
+
+    def get_disease_info(self, name: str) -> Optional[str]:
+        """Description text for a disease, or None if unknown"""
+        record = self.get_disease_record(name)
+        return record.get('Description') if record else None
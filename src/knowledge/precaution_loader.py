@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disease precaution lookups served from the knowledge snapshot.
+"""
+
+from typing import List
+
+from knowledge.snapshot import KnowledgeSnapshot
+
+
+class PrecautionLoader:
+    """Look up precautions by disease name"""
+
+    def __init__(self, snapshot: KnowledgeSnapshot):
+        self.precautions = snapshot.precautions
+        self._by_lower = {name.lower(): name for name in self.precautions}
+
+    def get_precautions(self, name: str) -> List[str]:
+        """Precautions for a disease, matched case-insensitively"""
+        if not name:
+            return []
+        key = self._by_lower.get(name.strip().lower())
+        return list(self.precautions.get(key, [])) if key else []
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Versioned registry of the active knowledge, with hot reload.
+
+The registry holds one immutable bundle of knowledge structures. Readers
+take a reference with current() once per request and use only that
+bundle, so a reload never changes data under a request in flight.
+reload() builds a complete new bundle off to the side and publishes it
+with a single reference assignment (read-copy-update). The old bundle is
+freed when its last reader drops it.
+
+A watcher thread stats the source files every interval seconds and
+reloads when one of them changes. The thread is started lazily by
+current() and again after a fork, so each gunicorn worker watches its
+own copy (pool workers that never read the knowledge never start one).
+"""
+
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+Fingerprint = Tuple[Tuple[str, Optional[int], Optional[int]], ...]
+
+
+def fingerprint(paths: Sequence[str]) -> Fingerprint:
+    """(path, mtime_ns, size) of every source; None values for a missing file"""
+    result = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+            result.append((path, st.st_mtime_ns, st.st_size))
+        except OSError:
+            result.append((path, None, None))
+    return tuple(result)
+
+
+class KnowledgeRegistry:
+    """Holds the current knowledge bundle; build() must return an object with a .version"""
+
+    def __init__(self, build: Callable[[], Any], sources: Sequence[str], interval: float = 0.0):
+        self._build = build
+        self.sources = list(sources)
+        self.interval = interval
+        self._listeners: List[Callable[[Any, Any], None]] = []
+        self._reload_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._watching = False
+        self._fingerprint = fingerprint(self.sources)
+        self._current = build()
+        self.loaded_at = time.time()
+        self.reloads = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        if hasattr(os, 'register_at_fork'):
+            # Threads do not survive fork; let the child start its own watcher
+            os.register_at_fork(after_in_child=self._forget_watcher)
+
+    @property
+    def version(self) -> str:
+        return self._current.version
+
+    def current(self) -> Any:
+        """The active bundle; hold on to it for the whole request"""
+        if not self._watching and self.interval > 0:
+            self._start_watcher()
+        return self._current
+
+    def on_swap(self, listener: Callable[[Any, Any], None]) -> None:
+        """Call listener(old, new) after every successful swap"""
+        self._listeners.append(listener)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Rebuild if a source changed (or force) and swap the new bundle in.
+
+        Returns True when a new version was published. A failed build keeps
+        the current version and is reported through failures/last_error.
+        """
+        with self._reload_lock:
+            current_fingerprint = fingerprint(self.sources)
+            if not force and current_fingerprint == self._fingerprint:
+                return False
+            started = time.time()
+            try:
+                new = self._build()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                print(f"[Knowledge] Reload failed, keeping {self.version}: {e}")
+                return False
+            # Taken before the build: a change made during it is seen on the next poll
+            self._fingerprint = current_fingerprint
+            old = self._current
+            if new.version == old.version:
+                return False
+            self._current = new
+            self.loaded_at = time.time()
+            self.reloads += 1
+            self.last_error = None
+            print(f"[Knowledge] Swapped {old.version} -> {new.version} in {time.time() - started:.2f}s")
+        for listener in self._listeners:
+            try:
+                listener(old, new)
+            except Exception as e:
+                print(f"[Knowledge] Swap listener failed: {e}")
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'loaded_at': self.loaded_at,
+            'reloads': self.reloads,
+            'failures': self.failures,
+            'last_error': self.last_error,
+            'poll_seconds': self.interval,
+        }
+
+    def _forget_watcher(self) -> None:
+        self._watching = False
+        self._reload_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+
+    def _start_watcher(self) -> None:
+        # Not the reload lock: a request must never wait for a rebuild
+        with self._watch_lock:
+            if self._watching:
+                return
+            self._watching = True
+
+        def loop():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"[Knowledge] Watcher error: {e}")
+
+        threading.Thread(target=loop, name='knowledge-watcher', daemon=True).start()
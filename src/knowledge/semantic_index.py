@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Semantic retrieval index over the disease knowledge base.
+Symptom phrases (every symptom surface form and lexicon synonym) and disease
+descriptions are embedded offline into one float32 matrix. At runtime the
+matrix is opened with a single mmap and a batch of queries is scored with one
+matrix product, so free text such as "my skin is burning and peeling" can
+still reach symptoms and diseases when exact extraction finds too little.
+
+Embeddings come from a dependency-free hashing embedder (word and character
+trigram features weighted by IDF) or, when a sentence-transformers model is
+stored locally, from that model. Neither needs the network.
+
+File layout (little endian):
+    magic (8 bytes) | format version (u32) | meta length (u32) | meta JSON
+    | padding to 8 bytes | idf float32[dim] (hashing only) | vectors float32[n_docs, dim]
+
+Build step:
+    python src/knowledge/semantic_index.py [data_dir] [output] [--model DIR]
+"""
+
+import os
+import sys
+import json
+import mmap
+import zlib
+import struct
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Allow running as a script (build step)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from knowledge.snapshot import KnowledgeSnapshot, file_checksum, load_snapshot
+from nlp.symptom_extractor import FILLER_WORDS, load_lexicon, tokenize
+
+MAGIC = b'SNKVECT\x00'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<8sII')
+
+HASHING_DIM = 4096
+# Character trigrams tolerate inflection ("peeling" ~ "peel") but count less than whole words
+TRIGRAM_WEIGHT = 0.5
+
+SYMPTOM = 'symptom'
+DISEASE = 'disease'
+
+
+def _features(text: str) -> Dict[str, float]:
+    """Word and boundary-marked character trigram features of the non-filler words"""
+    features: Dict[str, float] = {}
+    for word in tokenize(text):
+        if word in FILLER_WORDS:
+            continue
+        features['w:' + word] = 1.0
+        padded = f'<{word}>'
+        for i in range(len(padded) - 2):
+            features.setdefault('c:' + padded[i:i + 3], TRIGRAM_WEIGHT)
+    return features
+
+
+class HashingEmbedder:
+    """Hashed bag of word/trigram features weighted by IDF, L2-normalized"""
+
+    name = 'hashing'
+
+    def __init__(self, dim: int = HASHING_DIM, idf: Optional[np.ndarray] = None):
+        self.dim = dim
+        self.idf = idf if idf is not None else np.ones(dim, dtype=np.float32)
+
+    def _slot(self, feature: str) -> int:
+        # crc32 rather than hash(): stable across processes and runs
+        return zlib.crc32(feature.encode('utf-8')) % self.dim
+
+    def fit(self, texts: Sequence[str]) -> 'HashingEmbedder':
+        """Learn IDF weights from the indexed documents"""
+        df = np.zeros(self.dim, dtype=np.float32)
+        for text in texts:
+            df[list({self._slot(f) for f in _features(text)})] += 1
+        self.idf = (np.log((1 + len(texts)) / (1 + df)) + 1).astype(np.float32)
+        return self
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in _features(text).items():
+                slot = self._slot(feature)
+                vectors[row, slot] = max(vectors[row, slot], weight)
+        vectors *= self.idf
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
+
+
+class LocalModelEmbedder:
+    """sentence-transformers model loaded from a local directory (never downloads)"""
+
+    name = 'model'
+
+    def __init__(self, path: str):
+        from sentence_transformers import SentenceTransformer
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"Embedding model directory {path} not found")
+        self.path = path
+        self.model = SentenceTransformer(path, device='cpu')
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return self.model.encode(list(texts), batch_size=64, normalize_embeddings=True,
+                                 convert_to_numpy=True).astype(np.float32)
+
+
+def index_documents(snapshot: KnowledgeSnapshot, lexicon_path: Optional[str]) -> List[Tuple[str, str, str]]:
+    """(kind, name, text) for every symptom phrase and disease description"""
+    docs = []
+    known = set(snapshot.symptoms)
+    for symptom in snapshot.symptoms:
+        docs.append((SYMPTOM, symptom, ' '.join(tokenize(symptom))))
+    for symptom, term in load_lexicon(lexicon_path):
+        if symptom in known:
+            docs.append((SYMPTOM, symptom, term))
+    for disease in snapshot.diseases:
+        description = (snapshot.knowledge.get(disease) or {}).get('Description') or ''
+        docs.append((DISEASE, disease, f"{disease}. {description}"))
+    return docs
+
+
+def source_key(snapshot: KnowledgeSnapshot, lexicon_path: Optional[str], model_path: Optional[str]) -> Dict[str, Any]:
+    """What an index was built from; a mismatch means it is stale"""
+    return {
+        'knowledge': snapshot.version,
+        'lexicon': file_checksum(lexicon_path) if lexicon_path else None,
+        'embedder': os.path.abspath(model_path) if model_path else HashingEmbedder.name,
+    }
+
+
+class SemanticIndex:
+    """Read-only view over a built index"""
+
+    def __init__(self, meta: Dict[str, Any], vectors: np.ndarray, embedder, buffer: Any = None):
+        self.meta = meta
+        self.docs: List[Tuple[str, str]] = [tuple(doc) for doc in meta['docs']]
+        self.source: Dict[str, Any] = meta['source']
+        self.vectors = vectors
+        self.embedder = embedder
+        # Keep the mmap alive for as long as the array views exist
+        self._buffer = buffer
+
+    def search(self, queries: Sequence[str], k: int = 5) -> List[List[Tuple[str, str, float]]]:
+        """
+        Nearest documents for a batch of queries, scored by cosine similarity.
+
+        Returns:
+            One list per query of (kind, name, score), best first. A name
+            appears once per kind, with its best-scoring phrase.
+        """
+        if not queries or not len(self.docs):
+            return [[] for _ in queries]
+        scores = self.embedder.embed(queries) @ self.vectors.T
+        # Over-fetch so several phrases of one symptom do not crowd out others
+        fetch = min(len(self.docs), k * 4)
+        top = np.argpartition(-scores, fetch - 1, axis=1)[:, :fetch]
+        results = []
+        for row, candidates in enumerate(top):
+            hits, seen = [], set()
+            for doc_id in candidates[np.argsort(-scores[row, candidates], kind='stable')]:
+                score = float(scores[row, doc_id])
+                if score <= 0:
+                    break
+                if self.docs[doc_id] in seen:
+                    continue
+                seen.add(self.docs[doc_id])
+                hits.append((self.docs[doc_id][0], self.docs[doc_id][1], score))
+                if len(hits) == k:
+                    break
+            results.append(hits)
+        return results
+
+
+def build_index(snapshot: KnowledgeSnapshot, lexicon_path: Optional[str], out_path: str,
+                model_path: Optional[str] = None) -> None:
+    """Embed every document and write the index atomically to out_path"""
+    docs = index_documents(snapshot, lexicon_path)
+    texts = [text for _, _, text in docs]
+    if model_path:
+        embedder = LocalModelEmbedder(model_path)
+        idf = np.zeros(0, dtype=np.float32)
+    else:
+        embedder = HashingEmbedder().fit(texts)
+        idf = embedder.idf
+    vectors = embedder.embed(texts) if texts else np.zeros((0, embedder.dim), dtype=np.float32)
+
+    meta = {
+        'docs': [[kind, name] for kind, name, _ in docs],
+        'dim': int(embedder.dim),
+        'embedder': embedder.name,
+        'source': source_key(snapshot, lexicon_path, model_path),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    padding = -(_HEADER.size + len(meta_bytes)) % 8
+
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix='.semantic-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(b'\x00' * padding)
+            f.write(idf.astype('<f4').tobytes())
+            f.write(vectors.astype('<f4').tobytes())
+        os.replace(tmp_path, out_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_index(path: str) -> SemanticIndex:
+    """Map an index file into memory; raises ValueError if it is not readable"""
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buf) < _HEADER.size:
+        raise ValueError(f"Semantic index {path} is truncated")
+    magic, version, meta_len = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Semantic index {path} has an unsupported format")
+    meta = json.loads(buf[_HEADER.size:_HEADER.size + meta_len].decode('utf-8'))
+    offset = _HEADER.size + meta_len
+    offset += -offset % 8
+    dim = meta['dim']
+    if meta['embedder'] == HashingEmbedder.name:
+        idf = np.frombuffer(buf, dtype='<f4', count=dim, offset=offset)
+        offset += idf.nbytes
+        embedder = HashingEmbedder(dim, idf)
+    else:
+        embedder = LocalModelEmbedder(meta['source']['embedder'])
+    vectors = np.frombuffer(buf, dtype='<f4', count=len(meta['docs']) * dim, offset=offset)
+    return SemanticIndex(meta, vectors.reshape(len(meta['docs']), dim), embedder, buffer=buf)
+
+
+def load_index(snapshot: KnowledgeSnapshot, lexicon_path: Optional[str], index_path: str,
+               model_path: Optional[str] = None) -> SemanticIndex:
+    """Open the index, rebuilding it first if missing or built from other sources"""
+    source = source_key(snapshot, lexicon_path, model_path)
+    if os.path.exists(index_path):
+        try:
+            index = open_index(index_path)
+            if index.source == source:
+                return index
+        except ValueError:
+            pass
+    print(f"[Semantic] Building semantic index -> {index_path}")
+    build_index(snapshot, lexicon_path, index_path, model_path)
+    return open_index(index_path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the semantic retrieval index")
+    parser.add_argument('data_dir', nargs='?', default=os.getcwd())
+    parser.add_argument('output', nargs='?')
+    parser.add_argument('--model', help="Local sentence-transformers model directory (default: hashing embedder)")
+    args = parser.parse_args()
+
+    out = args.output or os.path.join(args.data_dir, 'knowledge.vec')
+    snap = load_snapshot(
+        os.path.join(args.data_dir, 'DiseaseAndSymptoms.csv'),
+        os.path.join(args.data_dir, 'disease_knowledgebase.csv'),
+        os.path.join(args.data_dir, 'Disease precaution.csv'),
+        os.path.join(args.data_dir, 'knowledge.snap'),
+    )
+    build_index(snap, os.path.join(args.data_dir, 'symptom_lexicon.csv'), out, args.model)
+    index = open_index(out)
+    print(f"Wrote {out}: {len(index.docs)} documents, {index.meta['dim']} dimensions ({index.meta['embedder']})")
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compiled knowledge snapshot for Sehat Nabha.
+Compiles DiseaseAndSymptoms.csv, disease_knowledgebase.csv and
+Disease precaution.csv into one versioned binary file that is opened with a
+single mmap, so workers skip CSV parsing. Only the int32 incidence arrays are
+read in place and shared between workers through the page cache; the meta
+JSON (names, knowledge rows, precautions) is decoded into ordinary Python
+objects in every process (one json.loads of about 25 KB for the shipped CSVs).
+
+File layout (little endian):
+    magic (8 bytes) | format version (u32) | meta length (u32) | meta JSON
+    | padding to 8 bytes | indptr int32[n_diseases + 1] | indices int32[nnz]
+
+The meta JSON holds the interned symptom and disease names, knowledge rows,
+precautions and the SHA-256 of every source CSV. The int32 arrays are the
+disease -> symptom-ID incidence lists in CSR form.
+"""
+
+import os
+import csv
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+MAGIC = b'SNKSNAP\x00'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<8sII')
+
+
+def file_checksum(path: str) -> Optional[str]:
+    """SHA-256 of a source file, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_checksums(ds_path: str, kb_path: str, prec_path: str) -> Dict[str, Optional[str]]:
+    """Checksums of the three source CSVs keyed by role"""
+    return {
+        'symptoms': file_checksum(ds_path),
+        'knowledge': file_checksum(kb_path),
+        'precautions': file_checksum(prec_path),
+    }
+
+
+def _read_rows(path: str) -> List[Dict[str, str]]:
+    if not os.path.exists(path):
+        return []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+def _clean(value: Any) -> str:
+    return str(value).strip() if value is not None else ''
+
+
+class KnowledgeSnapshot:
+    """Read-only view over a compiled snapshot (arrays mapped, meta decoded per process)"""
+
+    def __init__(self, meta: Dict[str, Any], indptr: np.ndarray, indices: np.ndarray, buffer: Any = None):
+        self.meta = meta
+        self.symptoms: List[str] = meta['symptoms']
+        self.diseases: List[str] = meta['diseases']
+        self.knowledge: Dict[str, Dict[str, Any]] = meta['knowledge']
+        self.precautions: Dict[str, List[str]] = meta['precautions']
+        self.checksums: Dict[str, Optional[str]] = meta['checksums']
+        self.symptom_ids = {name: i for i, name in enumerate(self.symptoms)}
+        self.disease_ids = {name: i for i, name in enumerate(self.diseases)}
+        self.indptr = indptr
+        self.indices = indices
+        # Keep the mmap alive for as long as the array views exist
+        self._buffer = buffer
+
+    @property
+    def version(self) -> str:
+        """Short content hash identifying this knowledge version"""
+        digest = hashlib.sha256(json.dumps(self.checksums, sort_keys=True).encode('utf-8'))
+        return digest.hexdigest()[:12]
+
+    @classmethod
+    def empty(cls) -> 'KnowledgeSnapshot':
+        meta = {'symptoms': [], 'diseases': [], 'knowledge': {}, 'precautions': {}, 'checksums': {}}
+        return cls(meta, np.zeros(1, dtype=np.int32), np.zeros(0, dtype=np.int32))
+
+    def disease_symptom_ids(self, disease_id: int) -> np.ndarray:
+        """Symptom IDs recorded for a disease"""
+        return self.indices[self.indptr[disease_id]:self.indptr[disease_id + 1]]
+
+    def symptom_dict(self) -> Dict[str, List[str]]:
+        """Disease name -> list of symptom names"""
+        return {
+            disease: [self.symptoms[s] for s in self.disease_symptom_ids(d)]
+            for d, disease in enumerate(self.diseases)
+        }
+
+
+def compile_snapshot(ds_path: str, kb_path: str, prec_path: str, out_path: str) -> None:
+    """Parse the source CSVs and write a snapshot atomically to out_path"""
+    symptom_ids: Dict[str, int] = {}
+    disease_symptoms: Dict[str, List[int]] = {}
+    for row in _read_rows(ds_path):
+        disease = _clean(row.get('Disease'))
+        if not disease:
+            continue
+        seen = disease_symptoms.setdefault(disease, [])
+        for col, value in row.items():
+            if not col or not col.startswith('Symptom_'):
+                continue
+            symptom = _clean(value)
+            if not symptom or symptom == 'nan':
+                continue
+            sid = symptom_ids.setdefault(symptom, len(symptom_ids))
+            if sid not in seen:
+                seen.append(sid)
+
+    diseases = list(disease_symptoms)
+    indptr = np.zeros(len(diseases) + 1, dtype='<i4')
+    for i, disease in enumerate(diseases):
+        indptr[i + 1] = indptr[i] + len(disease_symptoms[disease])
+    indices = np.fromiter(
+        (sid for disease in diseases for sid in disease_symptoms[disease]),
+        dtype='<i4', count=int(indptr[-1]),
+    )
+
+    knowledge = {}
+    for row in _read_rows(kb_path):
+        disease = _clean(row.get('Disease'))
+        if disease:
+            knowledge[disease] = {_clean(k): (_clean(v) or None) for k, v in row.items() if k}
+
+    precautions = {}
+    for row in _read_rows(prec_path):
+        disease = _clean(row.get('Disease'))
+        if disease:
+            precautions[disease] = [
+                _clean(v) for k, v in row.items()
+                if k and k.startswith('Precaution_') and _clean(v)
+            ]
+
+    meta = {
+        'symptoms': list(symptom_ids),
+        'diseases': diseases,
+        'knowledge': knowledge,
+        'precautions': precautions,
+        'checksums': source_checksums(ds_path, kb_path, prec_path),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    padding = -(_HEADER.size + len(meta_bytes)) % 8
+
+    out_dir = os.path.dirname(os.path.abspath(out_path))
+    os.makedirs(out_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=out_dir, prefix='.snapshot-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, FORMAT_VERSION, len(meta_bytes)))
+            f.write(meta_bytes)
+            f.write(b'\x00' * padding)
+            f.write(indptr.tobytes())
+            f.write(indices.tobytes())
+        # Atomic swap so concurrently starting workers never see a partial file
+        os.replace(tmp_path, out_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def open_snapshot(path: str) -> KnowledgeSnapshot:
+    """Map a snapshot file into memory; raises ValueError if it is not readable"""
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buf) < _HEADER.size:
+        raise ValueError(f"Snapshot {path} is truncated")
+    magic, version, meta_len = _HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError(f"Snapshot {path} has an unsupported format")
+    meta = json.loads(buf[_HEADER.size:_HEADER.size + meta_len].decode('utf-8'))
+    offset = _HEADER.size + meta_len
+    offset += -offset % 8
+    n_diseases = len(meta['diseases'])
+    indptr = np.frombuffer(buf, dtype='<i4', count=n_diseases + 1, offset=offset)
+    offset += indptr.nbytes
+    indices = np.frombuffer(buf, dtype='<i4', count=int(indptr[-1]), offset=offset)
+    return KnowledgeSnapshot(meta, indptr, indices, buffer=buf)
+
+
+def load_snapshot(ds_path: str, kb_path: str, prec_path: str, snapshot_path: str) -> KnowledgeSnapshot:
+    """Open the snapshot, recompiling it first if missing or a source CSV changed"""
+    checksums = source_checksums(ds_path, kb_path, prec_path)
+    if os.path.exists(snapshot_path):
+        try:
+            snapshot = open_snapshot(snapshot_path)
+            if snapshot.checksums == checksums:
+                return snapshot
+        except ValueError:
+            pass
+    print(f"[Snapshot] Compiling knowledge snapshot -> {snapshot_path}")
+    compile_snapshot(ds_path, kb_path, prec_path, snapshot_path)
+    return open_snapshot(snapshot_path)
+
+
+if __name__ == '__main__':
+    # Build step: python src/knowledge/snapshot.py [data_dir] [output]
+    data_dir = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    out = sys.argv[2] if len(sys.argv) > 2 else os.path.join(data_dir, 'knowledge.snap')
+    compile_snapshot(
+        os.path.join(data_dir, 'DiseaseAndSymptoms.csv'),
+        os.path.join(data_dir, 'disease_knowledgebase.csv'),
+        os.path.join(data_dir, 'Disease precaution.csv'),
+        out,
+    )
+    snap = open_snapshot(out)
+    print(f"Wrote {out}: {len(snap.diseases)} diseases, {len(snap.symptoms)} symptoms, version {snap.version}")
@@ -0,0 +1 @@
+"""Medicine availability search"""
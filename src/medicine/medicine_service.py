@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Medicine availability search over pharmacy stock.
+Pharmacy stock is read from pharmacy_stock.csv (one row per pharmacy and
+medicine) into a PharmacyIndex, so a search only measures distance to nearby
+pharmacies that hold the medicine. Stock deltas received since the CSV was
+exported are replayed from the shared stock log (see stock_ingest.py).
+"""
+
+import os
+import csv
+import threading
+from typing import Any, Dict, Optional
+
+from src.medicine.pharmacy_index import PharmacyIndex
+from src.medicine.stock_ingest import StockIngestor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+_DATA_DIR = os.path.join(BASE_DIR, 'data') if os.path.isdir(os.path.join(BASE_DIR, 'data')) else BASE_DIR
+STOCK_PATH = os.environ.get('SEHAT_PHARMACY_STOCK', os.path.join(_DATA_DIR, 'pharmacy_stock.csv'))
+
+# Accepted stock deltas, shared by every server process and replayed at startup
+STOCK_LOG_PATH = os.environ.get('SEHAT_STOCK_LOG', os.path.join(_DATA_DIR, 'stock_deltas.ndjson'))
+
+# Optional directory polled for NDJSON stock drop files
+STOCK_DROP_DIR = os.environ.get('SEHAT_STOCK_DROP_DIR')
+
+DEFAULT_RADIUS_KM = float(os.environ.get('SEHAT_PHARMACY_RADIUS_KM', '50'))
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def load_stock_csv(path: str) -> PharmacyIndex:
+    """Build an index from a stock CSV (pharmacy_id, pharmacy_name, address, phone,
+    latitude, longitude, village, medicine_name, quantity, price)"""
+    index = PharmacyIndex()
+    if not os.path.exists(path):
+        return index
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            pid = (row.get('pharmacy_id') or '').strip()
+            if not pid:
+                continue
+            if pid not in index.pharmacies:
+                index.add_pharmacy({
+                    'pharmacy_id': pid,
+                    'pharmacy_name': (row.get('pharmacy_name') or '').strip(),
+                    'address': (row.get('address') or '').strip(),
+                    'phone': (row.get('phone') or '').strip(),
+                    'village': (row.get('village') or '').strip(),
+                    'latitude': _float(row.get('latitude')),
+                    'longitude': _float(row.get('longitude')),
+                })
+            medicine = (row.get('medicine_name') or '').strip()
+            if medicine:
+                index.set_stock(pid, medicine, int(_float(row.get('quantity')) or 0), _float(row.get('price')))
+    return index
+
+
+class MedicineService:
+    """Search pharmacies for a medicine"""
+
+    def __init__(self, stock_path: str = STOCK_PATH, log_path: Optional[str] = STOCK_LOG_PATH):
+        self.stock_path = stock_path
+        # Replaced wholesale by StockIngestor; read it once per request
+        self.index = load_stock_csv(stock_path)
+        self.ingestor = StockIngestor(self, log_path, lambda: load_stock_csv(stock_path))
+        replayed = self.ingestor.sync()
+        print(f"[Medicine] Indexed {len(self.index.pharmacies)} pharmacies, {len(self.index.stock)} medicines"
+              f" ({replayed} logged stock deltas replayed)")
+        if STOCK_DROP_DIR:
+            self.ingestor.watch_directory(STOCK_DROP_DIR)
+
+    def apply_stock_updates(self, records) -> Dict[str, Any]:
+        """Apply stock deltas without blocking concurrent searches"""
+        return self.ingestor.apply(records)
+
+    def search_medicine(self, medicine: str, user_lat: Optional[float] = None, user_lon: Optional[float] = None,
+                        radius_km: Optional[float] = None, k: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Pharmacies holding the medicine, nearest first.
+        radius_km only applies when a location is given (defaults to
+        SEHAT_PHARMACY_RADIUS_KM); k caps the number of results.
+        """
+        # Pick up deltas other workers logged (one stat when there are none)
+        self.ingestor.sync()
+        index = self.index
+        k = max(1, min(int(k or DEFAULT_LIMIT), MAX_LIMIT))
+        has_location = user_lat is not None and user_lon is not None
+        if has_location and radius_km is None:
+            radius_km = DEFAULT_RADIUS_KM
+        pharmacies = index.nearest(medicine, user_lat, user_lon, radius_km if has_location else None, k)
+        if not pharmacies:
+            return {
+                "success": False,
+                "medicine_name": medicine,
+                "error": f"No pharmacies with '{medicine}' in stock" + (f" within {radius_km:g} km" if has_location else ""),
+                "available_medicines": index.medicines()[:50],
+            }
+        return {
+            "success": True,
+            "medicine_name": pharmacies[0]['medicine_name'],
+            "total_results": len(pharmacies),
+            "radius_km": radius_km if has_location else None,
+            "pharmacies": pharmacies,
+            "stock_version": index.version,
+        }
+
+
+# Global medicine service instance
+_medicine_service = None
+_medicine_service_lock = threading.Lock()
+
+def get_medicine_service() -> MedicineService:
+    """Get or create the process-wide medicine service"""
+    global _medicine_service
+    if _medicine_service is None:
+        with _medicine_service_lock:
+            if _medicine_service is None:
+                _medicine_service = MedicineService()
+    return _medicine_service
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Spatial and inverted indexes over pharmacy stock.
+Pharmacies are bucketed into a fixed lat/lon grid, and each medicine maps to
+the pharmacies that stock it. A nearest-pharmacy query walks grid rings
+outward from the user and only measures haversine distance to pharmacies in
+those cells that hold the medicine, stopping once no closer result is possible.
+"""
+
+import math
+import heapq
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195
+CELL_DEG = 0.1  # ~11 km grid cells
+LOW_STOCK_THRESHOLD = 10
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in kilometres"""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def medicine_key(name: str) -> str:
+    return ' '.join(str(name).lower().split())
+
+
+def availability(quantity: int) -> str:
+    if quantity <= 0:
+        return 'Out of Stock'
+    if quantity < LOW_STOCK_THRESHOLD:
+        return 'Low Stock'
+    return 'In Stock'
+
+
+def _cell(lat: float, lon: float) -> Tuple[int, int]:
+    return int(math.floor(lat / CELL_DEG)), int(math.floor(lon / CELL_DEG))
+
+
+def _ring_cells(ci: int, cj: int, ring: int):
+    """Cells on the square ring at Chebyshev distance ring from (ci, cj)"""
+    if ring == 0:
+        yield ci, cj
+        return
+    for j in range(cj - ring, cj + ring + 1):
+        yield ci - ring, j
+        yield ci + ring, j
+    for i in range(ci - ring + 1, ci + ring):
+        yield i, cj - ring
+        yield i, cj + ring
+
+
+class PharmacyIndex:
+    """Grid index of pharmacies plus a medicine -> pharmacy stock inverted index"""
+
+    def __init__(self, pharmacies: Iterable[Dict[str, Any]] = (), stock: Iterable[Dict[str, Any]] = ()):
+        # pharmacy_id -> pharmacy info (name, address, phone, latitude, longitude, village)
+        self.pharmacies: Dict[str, Dict[str, Any]] = {}
+        # (cell_lat, cell_lon) -> set of pharmacy IDs
+        self.cells: Dict[Tuple[int, int], set] = {}
+        # medicine key -> {pharmacy_id: {'medicine_name', 'quantity', 'price'}}
+        self.stock: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Bounding box of occupied cells (min_i, max_i, min_j, max_j)
+        self.bounds: Optional[Tuple[int, int, int, int]] = None
+        self.version = 0
+        # Inner containers shared with the index this one was cloned from;
+        # copied on first write so readers of the old version never see changes
+        self._shared_cells: set = set()
+        self._shared_stock: set = set()
+        for pharmacy in pharmacies:
+            self.add_pharmacy(pharmacy)
+        for item in stock:
+            self.set_stock(item['pharmacy_id'], item['medicine_name'], item.get('quantity', 0), item.get('price'))
+
+    def clone(self) -> 'PharmacyIndex':
+        """Copy-on-write copy for applying updates while readers keep using self"""
+        new = PharmacyIndex.__new__(PharmacyIndex)
+        new.pharmacies = dict(self.pharmacies)
+        new.cells = dict(self.cells)
+        new.stock = dict(self.stock)
+        new.bounds = self.bounds
+        new.version = self.version + 1
+        new._shared_cells = set(self.cells)
+        new._shared_stock = set(self.stock)
+        return new
+
+    def _own_cell(self, cell: Tuple[int, int]) -> set:
+        if cell in self._shared_cells:
+            self._shared_cells.discard(cell)
+            self.cells[cell] = set(self.cells[cell])
+        return self.cells.setdefault(cell, set())
+
+    def _own_holders(self, key: str) -> Dict[str, Dict[str, Any]]:
+        if key in self._shared_stock:
+            self._shared_stock.discard(key)
+            self.stock[key] = dict(self.stock[key])
+        return self.stock.setdefault(key, {})
+
+    def add_pharmacy(self, pharmacy: Dict[str, Any]) -> None:
+        """Insert or replace a pharmacy"""
+        pid = str(pharmacy['pharmacy_id'])
+        old = self.pharmacies.get(pid)
+        if old is not None and old.get('latitude') is not None:
+            self._own_cell(_cell(old['latitude'], old['longitude'])).discard(pid)
+        self.pharmacies[pid] = pharmacy
+        if pharmacy.get('latitude') is not None and pharmacy.get('longitude') is not None:
+            i, j = _cell(pharmacy['latitude'], pharmacy['longitude'])
+            self._own_cell((i, j)).add(pid)
+            if self.bounds is None:
+                self.bounds = (i, i, j, j)
+            else:
+                min_i, max_i, min_j, max_j = self.bounds
+                self.bounds = (min(min_i, i), max(max_i, i), min(min_j, j), max(max_j, j))
+
+    def set_stock(self, pharmacy_id: str, medicine_name: str, quantity: int, price: Optional[float] = None) -> None:
+        """Set the absolute quantity (and optionally price) of a medicine at a pharmacy"""
+        holders = self._own_holders(medicine_key(medicine_name))
+        entry = holders.get(str(pharmacy_id), {})
+        holders[str(pharmacy_id)] = {
+            'medicine_name': medicine_name,
+            'quantity': max(int(quantity), 0),
+            'price': entry.get('price') if price is None else price,
+        }
+
+    def adjust_stock(self, pharmacy_id: str, medicine_name: str, delta: int) -> None:
+        """Add delta (may be negative) to the current quantity"""
+        entry = self.stock.get(medicine_key(medicine_name), {}).get(str(pharmacy_id), {})
+        self.set_stock(pharmacy_id, medicine_name, entry.get('quantity', 0) + int(delta))
+
+    def medicines(self) -> List[str]:
+        """Display names of every medicine currently in stock somewhere"""
+        names = set()
+        for holders in self.stock.values():
+            for entry in holders.values():
+                if entry['quantity'] > 0:
+                    names.add(entry['medicine_name'])
+                    break
+        return sorted(names)
+
+    def _result(self, pid: str, entry: Dict[str, Any], distance: Optional[float]) -> Dict[str, Any]:
+        pharmacy = self.pharmacies[pid]
+        distance_km = round(distance, 2) if distance is not None else None
+        return {
+            'pharmacy_id': pid,
+            'pharmacy_name': pharmacy.get('pharmacy_name'),
+            'name': pharmacy.get('pharmacy_name'),
+            'address': pharmacy.get('address'),
+            'phone': pharmacy.get('phone'),
+            'latitude': pharmacy.get('latitude'),
+            'longitude': pharmacy.get('longitude'),
+            'village': pharmacy.get('village'),
+            'distance': distance_km if distance_km is not None else 0,
+            'distance_km': distance_km,
+            'medicine_name': entry['medicine_name'],
+            'quantity': entry['quantity'],
+            'stock': entry['quantity'],
+            'in_stock': entry['quantity'] > 0,
+            'price': entry['price'],
+            'availability': availability(entry['quantity']),
+        }
+
+    def nearest(self, medicine: str, lat: Optional[float] = None, lon: Optional[float] = None,
+                radius_km: Optional[float] = None, k: int = 10) -> List[Dict[str, Any]]:
+        """Up to k pharmacies holding the medicine, nearest first (most stock first without a location)"""
+        # Every pharmacy that ever stocked the medicine, sold-out entries included;
+        # only the no-location path and the small-list shortcut iterate over it
+        holders = self.stock.get(medicine_key(medicine))
+        if not holders or k <= 0:
+            return []
+
+        if lat is None or lon is None:
+            in_stock = ((pid, e) for pid, e in holders.items() if e['quantity'] > 0)
+            best = heapq.nsmallest(k, in_stock, key=lambda item: (-item[1]['quantity'], item[0]))
+            return [self._result(pid, entry, None) for pid, entry in best]
+
+        # Few holders: measuring them directly is cheaper than walking cells
+        if len(holders) <= 4 * k:
+            scored = []
+            for pid, entry in holders.items():
+                pharmacy = self.pharmacies.get(pid)
+                if entry['quantity'] <= 0 or not pharmacy or pharmacy.get('latitude') is None:
+                    continue
+                d = haversine_km(lat, lon, pharmacy['latitude'], pharmacy['longitude'])
+                if radius_km is None or d <= radius_km:
+                    scored.append((d, pid))
+            return [self._result(pid, holders[pid], d) for d, pid in heapq.nsmallest(k, scored)]
+
+        # Walk grid rings outward; a cell in ring r is at least (r - 1) cells away
+        ci, cj = _cell(lat, lon)
+        cell_km = CELL_DEG * KM_PER_DEGREE * max(math.cos(math.radians(min(abs(lat) + 1.0, 89.0))), 0.01)
+        min_i, max_i, min_j, max_j = self.bounds
+        last_ring = max(ci - min_i, max_i - ci, cj - min_j, max_j - cj, 0)
+        if radius_km is not None:
+            last_ring = min(last_ring, int(radius_km // cell_km) + 1)
+        heap: List[Tuple[float, str]] = []  # the k best so far as (-distance, pid)
+        for ring in range(last_ring + 1):
+            if len(heap) == k and max(ring - 1, 0) * cell_km > -heap[0][0]:
+                break
+            for cell in _ring_cells(ci, cj, ring):
+                for pid in self.cells.get(cell, ()):
+                    entry = holders.get(pid)
+                    if entry is None or entry['quantity'] <= 0:
+                        continue
+                    pharmacy = self.pharmacies[pid]
+                    d = haversine_km(lat, lon, pharmacy['latitude'], pharmacy['longitude'])
+                    if radius_km is not None and d > radius_km:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d, pid))
+                    elif d < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d, pid))
+        return [self._result(pid, holders[pid], -neg_d) for neg_d, pid in sorted(heap, reverse=True)]
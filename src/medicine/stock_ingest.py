@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Incremental pharmacy stock ingestion.
+Stock deltas are applied to a copy-on-write clone of the live PharmacyIndex
+and the service's index reference is then swapped in one assignment, so
+searches in flight keep reading a consistent snapshot and never block.
+
+Accepted deltas are also appended to a shared NDJSON log (fsynced, under an
+exclusive file lock). Every server process rebuilds its index as the stock
+CSV plus a replay of that log, then keeps applying entries appended after
+its own offset, so all gunicorn workers converge on the same stock and a
+restart or worker recycle loses nothing. The log only grows: fold it into
+the stock CSV and delete it during maintenance (a shorter log than a
+process has read makes that process rebuild from the CSV).
+
+Each delta is one JSON object (one per line in NDJSON feeds and drop files):
+    {"pharmacy_id": "P1", "medicine_name": "Paracetamol", "quantity": 30, "price": 12}
+    {"pharmacy_id": "P1", "medicine_name": "Paracetamol", "delta": -2}
+    {"op": "pharmacy", "pharmacy_id": "P9", "pharmacy_name": "...", "latitude": 30.3, "longitude": 76.1}
+"""
+
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: served by a single waitress process, the thread lock is enough
+    fcntl = None
+
+MAX_REPORTED_ERRORS = 10
+
+
+def parse_ndjson(text: str) -> List[Dict[str, Any]]:
+    """Parse NDJSON, skipping blank lines; raises ValueError on a bad line"""
+    records = []
+    for number, line in enumerate(text.splitlines(), 1):
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}")
+    return records
+
+
+def _apply_one(index, record: Dict[str, Any]) -> None:
+    if not isinstance(record, dict):
+        raise ValueError("delta must be a JSON object")
+    pid = str(record.get('pharmacy_id') or '').strip()
+    if not pid:
+        raise ValueError("missing pharmacy_id")
+    op = record.get('op') or ('adjust' if 'delta' in record else 'set')
+    if op == 'pharmacy':
+        pharmacy = dict(index.pharmacies.get(pid, {}))
+        pharmacy.update({k: v for k, v in record.items() if k != 'op'})
+        pharmacy['pharmacy_id'] = pid
+        for coord in ('latitude', 'longitude'):
+            if pharmacy.get(coord) is not None:
+                pharmacy[coord] = float(pharmacy[coord])
+        index.add_pharmacy(pharmacy)
+        return
+    if pid not in index.pharmacies:
+        raise ValueError(f"unknown pharmacy {pid}")
+    medicine = str(record.get('medicine_name') or '').strip()
+    if not medicine:
+        raise ValueError("missing medicine_name")
+    if op == 'adjust':
+        index.adjust_stock(pid, medicine, int(record['delta']))
+    elif op == 'set':
+        price = record.get('price')
+        index.set_stock(pid, medicine, int(record.get('quantity', 0)), float(price) if price is not None else None)
+    else:
+        raise ValueError(f"unknown op {op!r}")
+
+
+class StockIngestor:
+    """Applies stock deltas to a MedicineService by swapping in updated indexes"""
+
+    def __init__(self, service, log_path: Optional[str] = None, load_base: Optional[Callable[[], Any]] = None):
+        self.service = service
+        # Shared delta log (None: deltas live in this process only) and how to rebuild without it
+        self.log_path = log_path
+        self._load_base = load_base
+        # Bytes of the log already applied to service.index
+        self._offset = 0
+        # Serializes writers only; readers never take this lock
+        self._write_lock = threading.Lock()
+        self.applied = 0
+        self.rejected = 0
+
+    def _apply_to_clone(self, records: Iterable[Dict[str, Any]]) -> Tuple[Any, List[Dict[str, Any]], List[Dict[str, Any]]]:
+        index = self.service.index.clone()
+        accepted, errors = [], []
+        for number, record in enumerate(records):
+            try:
+                _apply_one(index, record)
+                accepted.append(record)
+            except (ValueError, KeyError, TypeError) as e:
+                errors.append({'index': number, 'error': str(e)})
+        return index, accepted, errors
+
+    @contextmanager
+    def _locked_log(self):
+        """The log opened for appending, exclusively locked across processes"""
+        if not self.log_path:
+            yield None
+            return
+        with open(self.log_path, 'ab') as log:
+            if fcntl is not None:
+                fcntl.flock(log.fileno(), fcntl.LOCK_EX)
+            try:
+                yield log
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(log.fileno(), fcntl.LOCK_UN)
+
+    def apply(self, records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """Apply a batch of deltas as one new index version and append the accepted ones to the log"""
+        records = list(records)
+        with self._write_lock, self._locked_log() as log:
+            # Validate against the latest stock, including other processes' deltas
+            self._catch_up()
+            index, accepted, errors = self._apply_to_clone(records)
+            if log is not None and accepted:
+                data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in accepted).encode('utf-8')
+                if os.fstat(log.fileno()).st_size > self._offset:
+                    # A writer died mid-line; end that line so ours parse on their own
+                    data = b'\n' + data
+                log.write(data)
+                log.flush()
+                os.fsync(log.fileno())
+                self._offset = log.tell()
+            # Single reference assignment: readers see the old or the new index, never a mix
+            self.service.index = index
+            self.applied += len(accepted)
+            self.rejected += len(errors)
+        return {
+            'applied': len(accepted),
+            'rejected': len(errors),
+            'errors': errors[:MAX_REPORTED_ERRORS],
+            'version': index.version,
+        }
+
+    def sync(self) -> int:
+        """Apply log entries appended since the last call (by any process); returns how many"""
+        if not self.log_path:
+            return 0
+        try:
+            if os.path.getsize(self.log_path) == self._offset:
+                return 0
+        except OSError:
+            return 0
+        # Another thread of this process is already catching up; use the current index meanwhile
+        if not self._write_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._catch_up()
+        finally:
+            self._write_lock.release()
+
+    def _catch_up(self) -> int:
+        """Apply the complete log lines after the offset as one index version; needs _write_lock"""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return 0
+        with open(self.log_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < self._offset:
+                # The log was compacted or replaced: rebuild from the stock CSV
+                print("[Medicine] Stock log is shorter than already applied; rebuilding from the stock CSV")
+                if self._load_base is not None:
+                    self.service.index = self._load_base()
+                self._offset = 0
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b'\n') + 1
+        if not end:
+            return 0
+        records = []
+        for line in data[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError as e:
+                print(f"[Medicine] Skipping unreadable stock log line: {e}")
+        self._offset += end
+        if records:
+            index, accepted, errors = self._apply_to_clone(records)
+            self.service.index = index
+            self.applied += len(accepted)
+            self.rejected += len(errors)
+        return len(records)
+
+    def ingest_file(self, path: str) -> Dict[str, Any]:
+        with open(path, encoding='utf-8') as f:
+            return self.apply(parse_ndjson(f.read()))
+
+    def ingest_drop_files(self, directory: str) -> int:
+        """
+        Apply every *.ndjson drop file in directory that no other process has claimed.
+
+        Every worker polls the same directory. A file is claimed by renaming it
+        into processing/, which exactly one process can do. The claimant logs
+        its deltas and the other workers pick them up from the shared log.
+        Applied files move to processed/. Returns the files this process ingested.
+        """
+        processing = os.path.join(directory, 'processing')
+        processed = os.path.join(directory, 'processed')
+        os.makedirs(processing, exist_ok=True)
+        os.makedirs(processed, exist_ok=True)
+        ingested = 0
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if not name.endswith('.ndjson') or not os.path.isfile(path):
+                continue
+            claimed = os.path.join(processing, name)
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                continue  # another worker claimed it first
+            try:
+                result = self.ingest_file(claimed)
+                print(f"[Medicine] Ingested {name}: {result['applied']} applied, {result['rejected']} rejected")
+            except Exception as e:
+                print(f"[Medicine] Failed to ingest {name}: {e}")
+            os.replace(claimed, os.path.join(processed, name))
+            ingested += 1
+        return ingested
+
+    def watch_directory(self, directory: str, interval: float = 10.0) -> threading.Thread:
+        """Poll directory for *.ndjson drop files (see ingest_drop_files)"""
+
+        def loop():
+            while True:
+                try:
+                    self.ingest_drop_files(directory)
+                    # Also keeps an idle worker current with deltas from the others
+                    self.sync()
+                except Exception as e:
+                    print(f"[Medicine] Stock drop watcher error: {e}")
+                time.sleep(interval)
+
+        thread = threading.Thread(target=loop, name='stock-drop-watcher', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1 @@
+"""Natural-language processing of patient transcripts"""
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Misspelling-tolerant lookup over the symptom vocabulary.
+Every vocabulary word is indexed by its boundary-padded character bigrams
+("<pa", "pa", ... "n>"). A misspelled token only gathers the words that share
+enough bigrams with it (one edit, even a transposition, destroys at most
+three), and only those are checked with a banded edit distance that stops as
+soon as the bound is exceeded. Nothing is compared against the whole
+vocabulary. Bigrams rather than trigrams: short words with a transposition
+("pian" / "pain") share no trigram at all.
+"""
+
+from typing import Dict, Iterable, List
+
+# Shorter tokens are too ambiguous to correct ("hav" -> "hip"?)
+MIN_FUZZY_LENGTH = 4
+
+
+def max_edits(word: str) -> int:
+    """Edit budget for a token: 1 for 4-7 characters, 2 for longer words"""
+    if len(word) < MIN_FUZZY_LENGTH:
+        return 0
+    # Two edits on a 7-letter word already turn "morning" into "burning"
+    return 1 if len(word) <= 7 else 2
+
+
+# Tokens this long accept any edit within their budget; shorter ones only the slips is_slip allows
+SHAPE_FREE_LENGTH = 7
+VOWELS = frozenset('aeiou')
+
+
+def is_slip(token: str, word: str) -> bool:
+    """
+    Whether a token one edit away from word reads as a misspelling of it.
+    Short English words sit one consonant edit apart ("less" / "legs",
+    "could" / "cold", "tried" / "tired"), so below SHAPE_FREE_LENGTH only
+    slips that rarely make another word are accepted: a doubled or undoubled
+    letter, a dropped vowel, swapped vowels and a trailing plural "s".
+    Devanagari and Gurmukhi tokens are not restricted.
+    """
+    if len(token) >= SHAPE_FREE_LENGTH or not token.isascii():
+        return True
+    if len(token) == len(word) + 1:
+        # An extra letter in the token
+        return any(token[:i] + token[i + 1:] == word and (_doubles(token, i) or (token[i] == 's' and i == len(word)))
+                   for i in range(len(token)))
+    if len(token) + 1 == len(word):
+        # A letter missing from the token
+        return any(word[:i] + word[i + 1:] == token and (word[i] in VOWELS or _doubles(word, i))
+                   for i in range(len(word)))
+    if len(token) == len(word):
+        diff = [i for i in range(len(token)) if token[i] != word[i]]
+        return (len(diff) == 2 and diff[1] == diff[0] + 1 and token[diff[0]] == word[diff[1]]
+                and token[diff[1]] == word[diff[0]] and token[diff[0]] in VOWELS and token[diff[1]] in VOWELS)
+    return False
+
+
+def _doubles(word: str, i: int) -> bool:
+    """Whether word[i] repeats the letter next to it"""
+    return (i > 0 and word[i - 1] == word[i]) or (i + 1 < len(word) and word[i + 1] == word[i])
+
+
+def _grams(word: str) -> List[str]:
+    padded = f'<{word}>'
+    return [padded[i:i + 2] for i in range(len(padded) - 1)]
+
+
+def bounded_distance(a: str, b: str, bound: int) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+    between a and b, or bound + 1 as soon as it must exceed bound.
+    """
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > bound:
+            return bound + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyIndex:
+    """Bigram candidate index with bounded edit-distance verification"""
+
+    def __init__(self, words: Iterable[str]):
+        self.words: List[str] = sorted(set(words))
+        self._postings: Dict[str, List[int]] = {}
+        for word_id, word in enumerate(self.words):
+            for gram in set(_grams(word)):
+                self._postings.setdefault(gram, []).append(word_id)
+
+    def _candidates(self, token: str, bound: int) -> List[str]:
+        """Words sharing enough bigrams with token to be within bound edits of it"""
+        grams = _grams(token)
+        shared: Dict[int, int] = {}
+        for gram in set(grams):
+            for word_id in self._postings.get(gram, ()):
+                shared[word_id] = shared.get(word_id, 0) + 1
+        # q-gram lemma: each edit destroys at most three of the token's bigrams
+        needed = max(1, len(grams) - 3 * bound)
+        return [self.words[word_id] for word_id, count in shared.items() if count >= needed]
+
+    def closest(self, token: str) -> List[str]:
+        """Every vocabulary word at the smallest distance within the token's edit budget"""
+        bound = max_edits(token)
+        if not bound:
+            return []
+        closest, best_distance = [], bound + 1
+        for word in self._candidates(token, bound):
+            distance = bounded_distance(token, word, best_distance)
+            if distance < best_distance:
+                closest, best_distance = [word], distance
+            elif distance == best_distance:
+                closest.append(word)
+        return sorted(closest) if best_distance <= bound else []
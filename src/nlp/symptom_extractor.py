@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Symptom extraction with a word-level Aho-Corasick automaton.
+Every symptom surface form ("skin_rash" -> "skin rash", "dischromic _patches"
+-> "dischromic patches") and every lexicon synonym is compiled once into an
+automaton over tokens. A transcript is then tokenized and matched in a single
+linear pass whose cost depends on the transcript length, not on the number of
+known symptoms. Tokens outside the automaton's vocabulary (typically
+misspellings such as "vomitting" or "hedache") are corrected through a
+bigram FuzzyIndex before they are fed to the automaton; corrections are
+memoized per token. A correction must keep the token's first letter, so that
+"again" does not become "gain" nor "more" "sore", and a short token must
+differ from the symptom word by a typing slip (is_slip), so that "less" does
+not become "legs" nor "tried" "tired".
+
+Hindi and Punjabi (Devanagari, Gurmukhi and romanized) terms live in the
+same lexicon and the same automaton, so adding a language adds states but no
+extra pass over the transcript. Indic tokens are folded to one spelling
+(nukta dropped, chandrabindu as anusvara, bindi as tippi, no zero-width
+joiners) both when the automaton is built and when a transcript is scanned.
+"""
+
+import os
+import re
+import csv
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Tuple, Iterable, Optional, Any
+
+from nlp.fuzzy_index import FuzzyIndex, is_slip
+
+# Letters and digits plus the Devanagari and Gurmukhi blocks: vowel signs and
+# viramas are combining marks, which \w alone would split words at ("बुखार"
+# -> "ब", "ख", "र"). The dandas (U+0964/5) are punctuation and stay separators.
+TOKEN_RE = re.compile(r"(?:[^\W_]|[\u0900-\u0963\u0966-\u097F\u0A00-\u0A7F\u200c\u200d])+")
+
+# Spelling variants that do not change an Indic word
+_INDIC_FOLD = str.maketrans({
+    '\u093c': None,        # Devanagari nukta (ज़ -> ज)
+    '\u0a3c': None,        # Gurmukhi nukta (ਸ਼ -> ਸ)
+    '\u0901': '\u0902',    # chandrabindu -> anusvara (आँख -> आंख)
+    '\u0a02': '\u0a70',    # bindi -> tippi
+    '\u200c': None,        # zero-width non-joiner
+    '\u200d': None,        # zero-width joiner
+})
+
+# Distinct unknown tokens whose correction (or lack of one) is remembered
+FUZZY_CACHE_SIZE = 65536
+
+
+
+def normalize_token(word: str) -> str:
+    """Canonical form of a lowercased token (ASCII tokens are returned as is)"""
+    if word.isascii():
+        return word
+    # NFD splits precomposed nukta letters (U+0958-095F, U+0A59-0A5E) so the fold can drop the dot
+    return unicodedata.normalize('NFD', word).translate(_INDIC_FOLD)
+
+
+# Words that carry no clinical meaning; ignored when comparing transcripts
+FILLER_WORDS = frozenset(normalize_token(word) for word in (
+    'a', 'an', 'the', 'i', 'im', 'me', 'my', 'we', 'he', 'she', 'it', 'is', 'am', 'are',
+    'was', 'be', 'been', 'have', 'has', 'had', 'having', 'and', 'or', 'with', 'also',
+    'of', 'in', 'on', 'at', 'to', 'for', 'from', 'some', 'feel', 'feeling', 'got',
+    'getting', 'since', 'very', 'bit', 'little', 'so', 'too', 'just', 'like',
+    'um', 'uh', 'hello', 'hi', 'doctor', 'please', 'today', 'now',
+    # Hindi / Punjabi, romanized
+    'mujhe', 'mere', 'mera', 'meri', 'hai', 'hain', 'ho', 'raha', 'rahi', 'aur', 'bahut',
+    'mainu', 'menu', 'ate', 'ji', 'namaste', 'aaj',
+    # Hindi
+    'मुझे', 'मेरा', 'मेरे', 'मेरी', 'है', 'हैं', 'हो', 'रहा', 'रही', 'और', 'बहुत', 'भी',
+    'आज', 'नमस्ते', 'डॉक्टर', 'जी',
+    # Punjabi
+    'ਮੈਨੂੰ', 'ਮੇਰਾ', 'ਮੇਰੇ', 'ਮੇਰੀ', 'ਹੈ', 'ਹਨ', 'ਹਾਂ', 'ਰਿਹਾ', 'ਰਹੀ', 'ਅਤੇ', 'ਬਹੁਤ', 'ਵੀ',
+    'ਅੱਜ', 'ਸਤ', 'ਸ੍ਰੀ', 'ਅਕਾਲ', 'ਡਾਕਟਰ', 'ਜੀ',
+))
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, normalized word tokens, splitting on whitespace, punctuation and underscores"""
+    return [normalize_token(word) for word in TOKEN_RE.findall(text.lower())]
+
+
+def load_lexicon(path: Optional[str]) -> List[Tuple[str, str]]:
+    """
+    (symptom, term) pairs from a lexicon CSV with Symptom,Term columns.
+    The Language column (en, hi, pa, hi-Latn, pa-Latn) is documentation only:
+    every term is matched whatever language the transcript is in.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return [
+            (row['Symptom'].strip(), row['Term'].strip())
+            for row in csv.DictReader(f)
+            if row.get('Symptom') and row.get('Term')
+        ]
+
+
+class SymptomExtractor:
+    """Find symptom mentions in free text"""
+
+    def __init__(self, symptoms: Iterable[str], lexicon_path: Optional[str] = None, fuzzy: bool = True):
+        self.symptoms = list(symptoms)
+        known = set(self.symptoms)
+        # State 0 is the root; goto[state] maps a token to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (symptom, pattern length in tokens) for every pattern ending at a state
+        self._out: List[List[Tuple[str, int]]] = [[]]
+
+        for symptom in self.symptoms:
+            self._add_pattern(tokenize(symptom), symptom)
+        for symptom, term in load_lexicon(lexicon_path):
+            if symptom in known:
+                self._add_pattern(tokenize(term), symptom)
+        self._build_failure_links()
+
+        # Every word that appears in some pattern; only other tokens are corrected
+        self.vocabulary = frozenset(word for edges in self._goto for word in edges)
+        self._correct = None
+        if fuzzy:
+            # Filler words are never symptom words; keep "feel" from becoming "feet"
+            self.fuzzy_index = FuzzyIndex(word for word in self.vocabulary if word not in FILLER_WORDS)
+            self._correct = lru_cache(maxsize=FUZZY_CACHE_SIZE)(self._correction)
+
+    def _correction(self, word: str) -> Optional[str]:
+        """Symptom word a misspelled token stands for, or None to leave it as written"""
+        # Misspellings keep the first letter; an edit there makes another word ("more" -> "sore")
+        for candidate in self.fuzzy_index.closest(word):
+            if candidate[0] == word[0] and is_slip(word, candidate):
+                return candidate
+        return None
+
+    def _add_pattern(self, words: List[str], symptom: str) -> None:
+        if not words:
+            return
+        state = 0
+        for word in words:
+            nxt = self._goto[state].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        if (symptom, len(words)) not in self._out[state]:
+            self._out[state].append((symptom, len(words)))
+
+    def _build_failure_links(self) -> None:
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for word, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(word, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _step(self, state: int, word: str) -> int:
+        while state and word not in self._goto[state]:
+            state = self._fail[state]
+        return self._goto[state].get(word, 0)
+
+    def scan(self, text: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        Tokenize and match in one pass.
+
+        Returns:
+            (matches, tokens) where each match is
+            {'symptom', 'text', 'start', 'end'} with character offsets into
+            text, overlapping matches resolved leftmost-longest, and tokens
+            are the lowercased, normalized words of the transcript as
+            written (uncorrected).
+        """
+        tokens: List[str] = []
+        spans: List[Tuple[int, int]] = []
+        candidates: List[Tuple[int, int, str]] = []
+        state = 0
+        for m in TOKEN_RE.finditer(text):
+            word = normalize_token(m.group().lower())
+            tokens.append(word)
+            spans.append(m.span())
+            if self._correct is not None and word not in self.vocabulary and word not in FILLER_WORDS:
+                word = self._correct(word) or word
+            state = self._step(state, word)
+            end = len(tokens)
+            for symptom, length in self._out[state]:
+                candidates.append((end - length, end, symptom))
+
+        matches = []
+        last_end = 0
+        for start, end, symptom in sorted(candidates, key=lambda c: (c[0], c[0] - c[1])):
+            if start < last_end:
+                continue
+            char_start, char_end = spans[start][0], spans[end - 1][1]
+            matches.append({
+                'symptom': symptom,
+                'text': text[char_start:char_end],
+                'start': char_start,
+                'end': char_end,
+            })
+            last_end = end
+        return matches, tokens
+
+    def extract_symptoms(self, text: str) -> List[str]:
+        """Unique symptom names mentioned in text, in order of appearance"""
+        matches, _ = self.scan(text)
+        return list(dict.fromkeys(m['symptom'] for m in matches))
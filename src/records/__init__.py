@@ -0,0 +1 @@
+"""Persistent health-record storage"""
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Health-record store backed by SQLite in WAL mode.
+Records live in one database file indexed by (patient_id, created_at), so
+saving never creates a file per record and listing or range queries never
+scan a directory. With synchronous=NORMAL, commits only append to the WAL
+and fsyncs are batched at checkpoints.
+"""
+
+import os
+import json
+import math
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    patient_id  TEXT NOT NULL,
+    title       TEXT NOT NULL,
+    notes       TEXT NOT NULL DEFAULT '',
+    created_at  REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_patient_created ON records (patient_id, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_records_created ON records (created_at, id);
+"""
+
+MAX_PAGE_SIZE = 200
+
+
+def _encode_cursor(created_at: float, record_id: int) -> str:
+    return f"{created_at!r}:{record_id}"
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, int]:
+    """Inverse of _encode_cursor; ValueError with a fixed message for anything else"""
+    try:
+        created_at, record_id = cursor.rsplit(':', 1)
+        created_at, record_id = float(created_at), int(record_id)
+    except (ValueError, TypeError):
+        raise ValueError("invalid cursor") from None
+    if not math.isfinite(created_at):
+        raise ValueError("invalid cursor")
+    return created_at, record_id
+
+
+class RecordStore:
+    """Append-mostly record store; one SQLite connection per thread"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def add(self, patient_id: str, title: str, notes: str = '', created_at: Optional[float] = None) -> Dict[str, Any]:
+        """Insert one record and return it with its ID"""
+        created_at = time.time() if created_at is None else created_at
+        conn = self._connection()
+        with conn:
+            cur = conn.execute(
+                'INSERT INTO records (patient_id, title, notes, created_at) VALUES (?, ?, ?, ?)',
+                (patient_id, title, notes, created_at),
+            )
+        return {'id': cur.lastrowid, 'patient_id': patient_id, 'title': title,
+                'notes': notes, 'created_at': created_at}
+
+    def add_many(self, records: List[Dict[str, Any]]) -> int:
+        """Insert many records in one transaction (one WAL commit)"""
+        now = time.time()
+        rows = [
+            (r.get('patient_id', 'anonymous'), r.get('title', 'record'), r.get('notes', ''),
+             float(r.get('created_at') or now))
+            for r in records
+        ]
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                'INSERT INTO records (patient_id, title, notes, created_at) VALUES (?, ?, ?, ?)', rows
+            )
+        return len(rows)
+
+    def get(self, record_id: int) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute('SELECT * FROM records WHERE id = ?', (record_id,)).fetchone()
+        return dict(row) if row else None
+
+    def query(self, patient_id: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: int = 50,
+              cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Newest-first page of records, optionally for one patient and a
+        [since, until) created_at range. Pagination is keyset-based: pass the
+        returned cursor to get the next page; it is None on the last page.
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = [], []
+        if patient_id is not None:
+            clauses.append('patient_id = ?')
+            params.append(patient_id)
+        if since is not None:
+            clauses.append('created_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('created_at < ?')
+            params.append(until)
+        if cursor:
+            created_at, record_id = _decode_cursor(cursor)
+            clauses.append('(created_at < ? OR (created_at = ? AND id < ?))')
+            params.extend([created_at, created_at, record_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connection().execute(
+            f'SELECT * FROM records {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+            params + [limit + 1],
+        ).fetchall()
+        records = [dict(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = records[-1]
+            next_cursor = _encode_cursor(last['created_at'], last['id'])
+        return records, next_cursor
+
+    def import_json_dir(self, directory: str) -> int:
+        """Load legacy records/{patient_id}_{timestamp}.json files; returns the count"""
+        if not os.path.isdir(directory):
+            return 0
+        records = []
+        for name in os.listdir(directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding='utf-8') as f:
+                    records.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return self.add_many(records) if records else 0
+
+
+# Global record store instance
+_record_store = None
+_record_store_lock = threading.Lock()
+
+def get_record_store(path: str) -> RecordStore:
+    """Get or create the process-wide record store"""
+    global _record_store
+    if _record_store is None:
+        with _record_store_lock:
+            if _record_store is None:
+                _record_store = RecordStore(path)
+    return _record_store
+
+
+if __name__ == '__main__':
+    # Migrate legacy JSON files: python src/records/record_store.py records/ records.db
+    import sys
+    source = sys.argv[1] if len(sys.argv) > 1 else 'records'
+    target = sys.argv[2] if len(sys.argv) > 2 else 'records.db'
+    print(f"Imported {RecordStore(target).import_json_dir(source)} records into {target}")
@@ -0,0 +1 @@
+"""Rule-based triage, disease matching and urgency"""
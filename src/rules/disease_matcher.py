@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Disease matching over a sparse disease x symptom incidence matrix.
+Symptoms are interned to integer IDs by the knowledge snapshot; match counts
+and coverage for every disease come from one sparse matrix-vector product, and
+top-k ranking uses argpartition instead of sorting every disease.
+"""
+
+from typing import Dict, List, Any, Iterable, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+
+from knowledge.snapshot import KnowledgeSnapshot
+
+DEFAULT_TOP_K = 5
+
+
+class DiseaseMatcher:
+    """Match extracted symptoms against the disease incidence matrix"""
+
+    def __init__(self, snapshot: KnowledgeSnapshot, top_k: int = DEFAULT_TOP_K):
+        self.diseases = snapshot.diseases
+        self.symptoms = snapshot.symptoms
+        self.symptom_ids = snapshot.symptom_ids
+        self.disease_ids = snapshot.disease_ids
+        self.knowledge = snapshot.knowledge
+        self.top_k = top_k
+        n_diseases, n_symptoms = len(self.diseases), len(self.symptoms)
+        self.incidence = sparse.csr_matrix(
+            (np.ones(len(snapshot.indices), dtype=np.float32), snapshot.indices, snapshot.indptr),
+            shape=(n_diseases, n_symptoms),
+        )
+        self.totals = np.diff(snapshot.indptr).astype(np.float32)
+
+    def to_ids(self, symptoms: Iterable[str]) -> List[int]:
+        """Intern symptom names, dropping unknown ones and duplicates"""
+        ids = []
+        for symptom in symptoms:
+            sid = self.symptom_ids.get(symptom)
+            if sid is not None and sid not in ids:
+                ids.append(sid)
+        return ids
+
+    def _query_matrix(self, id_lists: Sequence[Sequence[int]]) -> sparse.csc_matrix:
+        """Symptoms x queries indicator matrix, one column per query"""
+        indptr = np.zeros(len(id_lists) + 1, dtype=np.int32)
+        for i, ids in enumerate(id_lists):
+            indptr[i + 1] = indptr[i] + len(ids)
+        indices = np.fromiter((s for ids in id_lists for s in ids), dtype=np.int32, count=int(indptr[-1]))
+        data = np.ones(len(indices), dtype=np.float32)
+        return sparse.csc_matrix((data, indices, indptr), shape=(len(self.symptoms), len(id_lists)))
+
+    def _top_diseases(self, counts: np.ndarray, top_k: Optional[int]) -> np.ndarray:
+        """Disease IDs with at least one match, best first"""
+        candidates = np.flatnonzero(counts)
+        if len(candidates) == 0:
+            return candidates
+        coverage = counts[candidates] / self.totals[candidates]
+        # Count dominates; coverage (<= 1) only breaks ties between equal counts
+        score = counts[candidates] + coverage * 0.5
+        if top_k is not None and top_k < len(candidates):
+            # argpartition picks an arbitrary subset of the diseases tied at the k-th
+            # score; keep all of them so the sort below applies the CSV-order tie-break
+            kth = -np.partition(-score, top_k - 1)[top_k - 1]
+            keep = score >= kth
+            candidates, score = candidates[keep], score[keep]
+        order = np.lexsort((candidates, -score))
+        return candidates[order] if top_k is None else candidates[order[:top_k]]
+
+    def _diagnosis(self, disease_id: int, count: int, query_ids: Sequence[int]) -> Dict[str, Any]:
+        name = self.diseases[disease_id]
+        total = int(self.totals[disease_id])
+        row = self.incidence.indices[self.incidence.indptr[disease_id]:self.incidence.indptr[disease_id + 1]]
+        query_set = set(query_ids)
+        coverage = count / total if total else 0.0
+        knowledge = self.knowledge.get(name) or {}
+        return {
+            'name': name,
+            'match_count': count,
+            'total_symptoms': total,
+            'matched_symptoms': [self.symptoms[s] for s in row.tolist() if s in query_set],
+            'coverage': round(coverage, 4),
+            'score': round(coverage * 100, 1),
+            'description': knowledge.get('Description'),
+        }
+
+    def retrieved(self, name: str, similarity: float) -> Dict[str, Any]:
+        """Diagnosis for a disease found by semantic retrieval rather than symptom overlap"""
+        disease_id = self.disease_ids[name]
+        knowledge = self.knowledge.get(name) or {}
+        return {
+            'name': name,
+            'match_count': 0,
+            'total_symptoms': int(self.totals[disease_id]),
+            'matched_symptoms': [],
+            'coverage': 0.0,
+            'score': round(similarity * 100, 1),
+            'description': knowledge.get('Description'),
+            'retrieved': True,
+        }
+
+    def match_ids(self, symptom_ids: Sequence[int], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Ranked diagnoses for one interned symptom set"""
+        if not symptom_ids:
+            return []
+        query = np.zeros(len(self.symptoms), dtype=np.float32)
+        query[list(symptom_ids)] = 1.0
+        counts = self.incidence.dot(query)
+        return [
+            self._diagnosis(int(d), int(counts[d]), symptom_ids)
+            for d in self._top_diseases(counts, top_k)
+        ]
+
+    def match_batch(self, id_lists: Sequence[Sequence[int]], top_k: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """Ranked diagnoses for many symptom sets using one sparse matrix-matrix product"""
+        if not id_lists:
+            return []
+        counts = (self.incidence @ self._query_matrix(id_lists)).toarray()
+        return [
+            [self._diagnosis(int(d), int(counts[d, q]), ids) for d in self._top_diseases(counts[:, q], top_k)]
+            for q, ids in enumerate(id_lists)
+        ]
+
+    def match(self, symptoms: List[str], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Top-k ranked diagnoses for a list of symptom names"""
+        return self.match_ids(self.to_ids(symptoms), self.top_k if top_k is None else top_k)
+
+    def find_matching_diseases(self, symptoms: List[str]) -> List[Dict[str, Any]]:
+        """All diseases sharing at least one symptom with the input, best first"""
+        return self.match_ids(self.to_ids(symptoms))
+
+    def rank_diseases(self, matches: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Keep the top_k matches (already ordered by find_matching_diseases)"""
+        limit = self.top_k if top_k is None else top_k
+        return matches[:limit]
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Rule-based triage: the overall urgency of a consultation.
+The orchestrator passes the extracted symptom names together with the words
+of the transcript, so red flags are recognised both as catalog symptoms
+(chest_pain) and as plain words the catalog has no symptom for
+("unconscious", "seizure"). The highest level with a matching red flag wins;
+a consultation without one is Standard.
+"""
+
+from typing import Any, Dict, Iterable, List
+
+# Catalog symptoms (DiseaseAndSymptoms.csv names) that are red flags on their own
+EMERGENCY_SYMPTOMS = frozenset({
+    'chest_pain', 'breathlessness', 'coma', 'altered_sensorium', 'slurred_speech',
+    'weakness_of_one_body_side', 'stomach_bleeding', 'blood_in_sputum', 'acute_liver_failure',
+})
+URGENT_SYMPTOMS = frozenset({
+    'high_fever', 'vomiting', 'dehydration', 'sunken_eyes', 'bloody_stool', 'stiff_neck',
+    'fast_heart_rate', 'palpitations', 'yellowing_of_eyes', 'dark_urine', 'visual_disturbances',
+    'loss_of_balance', 'swollen_legs', 'fluid_overload',
+})
+
+# Transcript words (lowercased) with no catalog symptom of their own
+EMERGENCY_WORDS = frozenset({
+    'unconscious', 'unresponsive', 'fainted', 'seizure', 'seizures', 'convulsion', 'convulsions',
+    'fits', 'choking', 'bleeding', 'haemorrhage', 'hemorrhage', 'suicide', 'suicidal', 'poisoning',
+    'poisoned', 'overdose', 'snakebite', 'burns', 'paralysis', 'paralysed', 'paralyzed',
+    'बेहोश', 'दौरा', 'खून', 'ਬੇਹੋਸ਼', 'ਦੌਰਾ', 'ਖੂਨ',
+})
+URGENT_WORDS = frozenset({
+    'severe', 'unbearable', 'worsening', 'pregnant', 'pregnancy', 'infant', 'newborn',
+    'fracture', 'faint', 'dizzy', 'तेज', 'गर्भवती', 'ਤੇਜ਼', 'ਗਰਭਵਤੀ',
+})
+
+LEVELS = {
+    'Emergency': ('red', 'Call emergency services (102/911) or go to the nearest emergency center now'),
+    'Urgent': ('amber', 'See a doctor today'),
+    'Standard': ('green', 'Book a routine consultation; seek care sooner if symptoms worsen'),
+}
+
+
+class TriageEngine:
+    """Overall triage level from symptom names and transcript words"""
+
+    def determine_triage_level(self, symptoms: Iterable[str]) -> Dict[str, Any]:
+        """
+        Triage for a consultation.
+
+        Args:
+            symptoms: extracted symptom names and/or lowercased transcript words
+
+        Returns:
+            {'level', 'color', 'reason', 'action', 'red_flags'}, level being
+            Emergency, Urgent or Standard
+        """
+        terms = list(dict.fromkeys(str(s).strip().lower() for s in symptoms if s))
+        emergency = [t for t in terms if t in EMERGENCY_SYMPTOMS or t in EMERGENCY_WORDS]
+        if emergency:
+            return self._result('Emergency', f"Emergency warning signs: {_describe(emergency)}", emergency)
+
+        urgent = [t for t in terms if t in URGENT_SYMPTOMS or t in URGENT_WORDS]
+        if urgent:
+            return self._result('Urgent', f"Warning signs that need prompt care: {_describe(urgent)}", urgent)
+        return self._result('Standard', 'No warning signs reported', [])
+
+    @staticmethod
+    def _result(level: str, reason: str, red_flags: List[str]) -> Dict[str, Any]:
+        color, action = LEVELS[level]
+        return {'level': level, 'color': color, 'reason': reason, 'action': action, 'red_flags': red_flags}
+
+
+def _describe(terms: List[str]) -> str:
+    return ', '.join(term.replace('_', ' ') for term in terms)
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Precomputed per-disease urgency.
+Each disease is classified once (high / medium / low severity) from the
+keywords in disease_severity.csv. Urgency for a diagnosis is then a lookup of
+(disease, match-count bucket) into shared, immutable response objects.
+"""
+
+import os
+import csv
+import copy
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SEVERITY_LEVELS = ('high', 'medium')
+
+# Response templates per (severity, bucket); bucket 0 = 0-1 matches, 1 = 2-3, 2 = 4+
+_TEMPLATES = {
+    ('high', 2): ('Critical', 'red', '🚨', '{name} is a critical condition',
+                  'Call emergency services (102/911) immediately'),
+    ('high', 1): ('Urgent', 'red', '⚠️', '{name} requires immediate hospital visit',
+                  'Go to hospital/emergency center NOW'),
+    ('high', 0): ('Moderate', 'amber', '⏱️', 'Symptoms suggest {name}, needs urgent evaluation',
+                  'Visit hospital within 2-4 hours'),
+    ('medium', 2): ('Urgent', 'amber', '⚠️', '{name} needs prompt medical attention',
+                    'Visit hospital/clinic today'),
+    ('medium', 1): ('Moderate', 'amber', '⏱️', '{name} requires medical consultation soon',
+                    'See doctor within 24 hours'),
+    ('medium', 0): ('Mild', 'green', '✓', 'Possible {name}, monitor symptoms',
+                    'Home care, consult doctor if symptoms worsen'),
+    ('low', 2): ('Moderate', 'amber', '⏱️', 'Likely {name}, moderate match',
+                 'See doctor within 2-3 days'),
+    ('low', 1): ('Mild', 'green', '✓', 'Possible {name}, monitor symptoms',
+                 'Home care, consult doctor if needed'),
+    ('low', 0): ('Mild', 'green', '✓', 'Low likelihood of {name}',
+                 'Monitor symptoms, consult if they persist'),
+}
+
+
+class FrozenDict(dict):
+    """A dict that refuses mutation, so one instance can be shared by every response"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("urgency responses are shared and read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.items())))
+
+    def __reduce__(self):
+        # Pickle from a plain dict: the default protocol refills the copy through __setitem__
+        return FrozenDict, (dict(self),)
+
+    def __copy__(self) -> dict:
+        # A copy is taken to be edited, so it is a plain dict
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> dict:
+        return copy.deepcopy(dict(self), memo)
+
+
+def match_bucket(match_count: int) -> int:
+    """0 for 0-1 matching symptoms, 1 for 2-3, 2 for 4 or more"""
+    if match_count >= 4:
+        return 2
+    if match_count >= 2:
+        return 1
+    return 0
+
+
+def load_severity_keywords(path: Optional[str]) -> Dict[str, List[str]]:
+    """Severity level -> lowercase disease keywords from a Keyword,Severity CSV"""
+    keywords: Dict[str, List[str]] = {level: [] for level in SEVERITY_LEVELS}
+    if not path or not os.path.exists(path):
+        return keywords
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            keyword = (row.get('Keyword') or '').strip().lower()
+            level = (row.get('Severity') or '').strip().lower()
+            if keyword and level in keywords:
+                keywords[level].append(keyword)
+    return keywords
+
+
+class UrgencyTable:
+    """Urgency responses for every known disease, built once at load time"""
+
+    def __init__(self, diseases: Iterable[str], severity_path: Optional[str] = None):
+        self.keywords = load_severity_keywords(severity_path)
+        self._table: Dict[str, Tuple[FrozenDict, ...]] = {}
+        for disease in diseases:
+            self._table[disease] = self._build(disease)
+
+    def classify(self, disease_name: str) -> str:
+        """'high', 'medium' or 'low' severity for a disease name"""
+        disease_lower = disease_name.lower()
+        for level in SEVERITY_LEVELS:
+            if any(keyword in disease_lower for keyword in self.keywords[level]):
+                return level
+        return 'low'
+
+    def _build(self, disease_name: str) -> Tuple[FrozenDict, ...]:
+        severity = self.classify(disease_name)
+        responses = []
+        for bucket in range(3):
+            level, color, icon, reasoning, action = _TEMPLATES[(severity, bucket)]
+            responses.append(FrozenDict(
+                level=level,
+                color=color,
+                icon=icon,
+                reasoning=reasoning.format(name=disease_name),
+                action=action,
+            ))
+        return tuple(responses)
+
+    def lookup(self, disease_name: str, match_count: int) -> FrozenDict:
+        """Shared urgency response for a disease and its match count"""
+        responses = self._table.get(disease_name)
+        if responses is None:
+            # Names outside the knowledge base are classified on the fly
+            responses = self._build(disease_name)
+        return responses[match_bucket(match_count)]
+
+    def actions(self) -> List[str]:
+        """Every distinct action string the table can return"""
+        return list(dict.fromkeys(template[4] for template in _TEMPLATES.values()))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures; modules are imported the way orchestrator.py imports them (src on sys.path)"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+DATA_DIR = os.path.join(ROOT, 'data') if os.path.isdir(os.path.join(ROOT, 'data')) else ROOT
+
+
+def data_path(name: str) -> str:
+    return os.path.join(DATA_DIR, name)
+
+
+@pytest.fixture(scope='session')
+def snapshot(tmp_path_factory):
+    """Knowledge snapshot compiled from the shipped CSVs into a temporary file"""
+    from knowledge.snapshot import load_snapshot
+    out = tmp_path_factory.mktemp('snapshot') / 'knowledge.snap'
+    return load_snapshot(data_path('DiseaseAndSymptoms.csv'), data_path('disease_knowledgebase.csv'),
+                         data_path('Disease precaution.csv'), str(out))
+
+
+@pytest.fixture(scope='session')
+def extractor(snapshot):
+    from nlp.symptom_extractor import SymptomExtractor
+    return SymptomExtractor(snapshot.symptoms, data_path('symptom_lexicon.csv'))
+
+
+@pytest.fixture(scope='session')
+def orchestrator(tmp_path_factory):
+    """The real orchestrator module, with its compiled files in a temporary directory"""
+    out = tmp_path_factory.mktemp('orchestrator')
+    os.environ.setdefault('SEHAT_SNAPSHOT_PATH', str(out / 'knowledge.snap'))
+    os.environ.setdefault('SEHAT_SEMANTIC_INDEX_PATH', str(out / 'knowledge.vec'))
+    os.environ.setdefault('SEHAT_KNOWLEDGE_POLL', '0')
+    import orchestrator
+    return orchestrator
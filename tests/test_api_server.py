@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import json
+import threading
+
+import pytest
+
+import api_server
+import components
+from components import Component
+
+
+@pytest.fixture
+def client():
+    return api_server.app.test_client()
+
+
+@pytest.fixture
+def fresh_warmup(monkeypatch):
+    """Run warmup() as a newly started worker would, over the given components"""
+    monkeypatch.setattr(api_server, '_ready', threading.Event())
+    monkeypatch.setattr(api_server, '_warmup_failures', {})
+    monkeypatch.setattr(components, 'LAZY_START', False)
+
+    def run(*preloaded):
+        monkeypatch.setattr(components, 'COMPONENTS', list(preloaded))
+        api_server.warmup()
+    return run
+
+
+def _broken():
+    raise ImportError("No module named 'scipy'")
+
+
+def test_ready_after_warmup(client, fresh_warmup):
+    assert client.get('/api/ready').status_code == 503
+    fresh_warmup(Component('chat', lambda: object(), preload=True))
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json()['ready'] is True
+
+
+def test_not_ready_when_a_preloaded_component_fails(client, fresh_warmup):
+    fresh_warmup(Component('chat', _broken, preload=True))
+    response = client.get('/api/ready')
+    assert response.status_code == 503
+    body = response.get_json()
+    assert body['ready'] is False
+    assert 'scipy' in body['failures']['chat']
+    # Liveness still answers, and says which component failed
+    health = client.get('/api/health')
+    assert health.status_code == 200
+    assert health.get_json()['components']['chat'] == 'failed'
+
+
+def test_speech_job_language_is_normalized(client, monkeypatch):
+    submitted = []
+
+    class Jobs:
+        def submit(self, kind, data, language=None):
+            submitted.append((kind, data, language))
+            return type('Job', (), {'id': 'j1', 'to_dict': lambda self: {'job_id': 'j1'}})()
+
+    voice = type('Voice', (), {'get_voice_jobs': staticmethod(lambda: Jobs())})
+    monkeypatch.setattr(components, 'voice', Component('voice', lambda: voice))
+    for language, expected in (('Hindi', 'hi'), ('ਪੰਜਾਬੀ', 'pa'), ('xx', 'en'), (None, 'en')):
+        response = client.post('/api/voice/jobs', json={'text': 'namaste', 'language': language})
+        assert response.status_code == 202
+        assert submitted.pop() == ('speak', 'namaste', expected)
+
+
+def test_streamed_batch_ends_with_an_error_line(client, monkeypatch):
+    calls = []
+
+    def analyze_many(records):
+        calls.append(records)
+        if len(calls) > 1:
+            raise RuntimeError('knowledge bundle missing')
+        return [{'symptoms': [], 'diseases': []} for _ in records]
+
+    monkeypatch.setattr(api_server, 'analyze_many', analyze_many)
+    monkeypatch.setattr(api_server, 'format_chat_response', lambda message, result: {'success': True})
+    monkeypatch.setattr(api_server, 'BATCH_CHUNK_SIZE', 1)
+    body = '\n'.join(json.dumps({'message': m}) for m in ('bukhar hai', 'sir dard'))
+    response = client.post('/api/chat/batch', data=body, content_type='application/x-ndjson')
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0] == {'index': 0, 'success': True}
+    assert lines[-1] == {'success': False, 'error': 'knowledge bundle missing'}
+
+
+@pytest.fixture
+def record_store(tmp_path, monkeypatch):
+    from src.records.record_store import RecordStore
+    store = RecordStore(str(tmp_path / 'records.db'))
+    monkeypatch.setattr(components, 'records', Component('records', lambda: store))
+    return store
+
+
+def test_health_record_requires_a_title(client, record_store):
+    for body in ({'patient_id': 'p1'}, {'patient_id': 'p1', 'title': None}, {'title': '  '}, ['not', 'an', 'object']):
+        response = client.post('/api/health-record', json=body)
+        assert response.status_code == 400, body
+        assert response.get_json()['success'] is False
+    response = client.post('/api/health-record', json={'patient_id': 'p1', 'title': 'BP check', 'notes': None})
+    assert response.status_code == 200
+    assert response.get_json()['record']['notes'] == ''
+
+
+def test_malformed_cursor_is_a_bad_request(client, record_store):
+    for cursor in ('garbage', '1.5:x', 'nan:3', '::'):
+        response = client.get('/api/health-records', query_string={'cursor': cursor})
+        assert response.status_code == 400, cursor
+        assert response.get_json()['error'] == 'Invalid query: invalid cursor'
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import numpy as np
+import pytest
+
+from audio_dsp import read_wav_frames
+
+
+def _wav(frames: bytes, channels=2, sample_width=2, rate=16000, declared=None):
+    """A PCM WAV whose data chunk declares `declared` bytes (default: the real length)"""
+    fmt = struct.pack('<HHIIHH', 1, channels, rate, rate * channels * sample_width,
+                      channels * sample_width, sample_width * 8)
+    size = len(frames) if declared is None else declared
+    body = b'WAVE' + b'fmt ' + struct.pack('<I', len(fmt)) + fmt + b'data' + struct.pack('<I', size) + frames
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def test_reads_declared_frames():
+    pcm = np.arange(8, dtype='<i2').tobytes()
+    samples, rate = read_wav_frames(_wav(pcm))
+    assert rate == 16000
+    assert samples.tolist() == [[0, 1], [2, 3], [4, 5], [6, 7]]
+
+
+@pytest.mark.parametrize('declared', [0xFFFFFFFF, 64])
+def test_size_past_the_end_is_clamped_to_whole_frames(declared):
+    # 4 stereo frames and half of a fifth: the upload was cut off mid-frame
+    pcm = np.arange(10, dtype='<i2').tobytes()[:-2]
+    samples, _ = read_wav_frames(_wav(pcm, declared=declared))
+    assert samples.shape == (4, 2)
+
+
+def test_size_that_is_not_whole_frames_is_rejected():
+    pcm = np.arange(8, dtype='<i2').tobytes()
+    with pytest.raises(ValueError, match='multiple'):
+        read_wav_frames(_wav(pcm, declared=6))
+
+
+def test_zero_channels_is_rejected():
+    with pytest.raises(ValueError):
+        read_wav_frames(_wav(b'\x00' * 8, channels=0))
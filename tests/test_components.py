@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import components
+from components import Component
+
+
+def _broken():
+    raise ImportError("No module named 'scipy'")
+
+
+def test_warm_all_reports_failed_preloaded_components(monkeypatch):
+    calls = []
+    monkeypatch.setattr(components, 'COMPONENTS', [
+        Component('chat', lambda: 'loaded', warm=calls.append, preload=True),
+        Component('speech', _broken, switch='chat', preload=True),
+        # Not preloaded: loads on first use, so warm_all() neither loads nor reports it
+        Component('records', _broken, switch='chat'),
+    ])
+    failures = components.warm_all()
+    assert calls == ['loaded']
+    assert list(failures) == ['speech']
+    assert 'scipy' in failures['speech']
+
+
+def test_warm_reports_a_failing_warm_up_hook():
+    def warm(value):
+        raise RuntimeError('snapshot is corrupt')
+
+    assert 'snapshot is corrupt' in Component('chat', lambda: 'loaded', warm=warm, preload=True).warm()
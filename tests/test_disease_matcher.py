@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from rules.disease_matcher import DiseaseMatcher
+
+
+@pytest.fixture(scope='module')
+def matcher(snapshot):
+    return DiseaseMatcher(snapshot)
+
+
+def test_top_k_is_prefix_of_full_ranking(matcher):
+    # Ties at the k-th score must be broken by CSV order, exactly as in the full ranking
+    rng = random.Random(7)
+    for _ in range(1000):
+        symptoms = rng.sample(matcher.symptoms, rng.randint(1, 4))
+        top = [d['name'] for d in matcher.match(symptoms)]
+        full = [d['name'] for d in matcher.find_matching_diseases(symptoms)][:matcher.top_k]
+        assert top == full, symptoms
+
+
+def test_ties_follow_csv_order(matcher):
+    # A symptom shared by many diseases: equal counts, ordered by coverage then disease ID
+    symptom = max(matcher.symptoms, key=lambda s: len(matcher.find_matching_diseases([s])))
+    ranked = matcher.find_matching_diseases([symptom])
+    assert len(ranked) > matcher.top_k
+    keys = [(-(d['match_count'] + d['coverage'] * 0.5), matcher.disease_ids[d['name']]) for d in ranked]
+    assert keys == sorted(keys)
+
+
+def test_batch_matches_single(matcher):
+    rng = random.Random(11)
+    queries = [matcher.to_ids(rng.sample(matcher.symptoms, 3)) for _ in range(200)]
+    batch = matcher.match_batch(queries, top_k=matcher.top_k)
+    for ids, ranked in zip(queries, batch):
+        assert [d['name'] for d in ranked] == [d['name'] for d in matcher.match_ids(ids, matcher.top_k)]
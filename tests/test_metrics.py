@@ -0,0 +1,130 @@
+import os
+import time
+import signal
+
+import pytest
+
+import metrics
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork')
+
+
+@pytest.fixture
+def store(tmp_path):
+    registry = metrics.Registry()
+    registry.counter('requests_total', 'Requests', ['endpoint'])
+    registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    return metrics.MultiProcessStore(registry, str(tmp_path))
+
+
+def _metric(store, name):
+    return next(metric for metric in store.registry._metrics if metric.name == name)
+
+
+def _fork_worker(store, requests, latency):
+    """A forked worker that counts, writes its file and waits to be killed"""
+    ready_r, ready_w = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(ready_r)
+            _metric(store, 'requests_total').inc('chat', amount=requests)
+            _metric(store, 'latency_seconds').observe(latency)
+            store.flush()
+            os.write(ready_w, b'1')
+            while True:
+                time.sleep(1)
+        finally:
+            os._exit(0)
+    os.close(ready_w)
+    assert os.read(ready_r, 1) == b'1'
+    os.close(ready_r)
+    return pid
+
+
+def _stop_worker(pid):
+    # Like gunicorn killing a worker: nothing is written on the way out
+    os.kill(pid, signal.SIGKILL)
+    os.waitpid(pid, 0)
+
+
+def test_scrape_adds_up_every_worker(store):
+    _metric(store, 'requests_total').inc('chat', amount=2)
+    workers = [_fork_worker(store, 3, 0.05), _fork_worker(store, 4, 0.5)]
+    try:
+        merged = store.collect()
+    finally:
+        for worker in workers:
+            _stop_worker(worker)
+
+    # Forked workers start from zero instead of repeating the parent's 2
+    assert merged['requests_total'] == {('chat',): 9}
+    counts, total = merged['latency_seconds'][()]
+    assert counts == [1, 1, 0]
+    assert total == pytest.approx(0.55)
+
+
+def test_totals_survive_exited_workers(store):
+    first = store.collect()['requests_total'].get(('chat',), 0)
+    for requests in (5, 7):
+        _stop_worker(_fork_worker(store, requests, 0.05))
+
+    merged = store.collect()
+    assert merged['requests_total'] == {('chat',): first + 12}
+    # Exited workers are folded into the archive, and only once
+    files = sorted(os.listdir(store.directory))
+    assert metrics.ARCHIVE_FILE in files
+    assert len([f for f in files if f.endswith('.json')]) == 2
+    assert store.collect()['requests_total'] == {('chat',): first + 12}
+
+
+def test_render_labels_collector_values_with_worker(store, monkeypatch):
+    registry = store.registry
+    registry.add_collector(lambda: [('queue_depth', 'gauge', 'Depth', [({}, 3)])])
+    _metric(store, 'requests_total').inc('chat')
+    monkeypatch.setattr(metrics, '_store', store)
+
+    text = registry.render()
+    assert 'requests_total{endpoint="chat"} 1' in text
+    assert f'queue_depth{{worker="{os.getpid()}"}} 3' in text
+
+
+def test_enable_multiprocess_clears_previous_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, '_store', None)
+    stale = tmp_path / '1-old.json'
+    stale.write_text('{"sehat_http_exceptions_total": [[["chat"], 40]]}')
+
+    store = metrics.enable_multiprocess(str(tmp_path), clear=True)
+    assert store.directory == str(tmp_path)
+    assert not stale.exists()
+
+
+def test_profile_is_readable_from_another_worker(store, monkeypatch):
+    monkeypatch.setattr(metrics, '_store', store)
+    monkeypatch.setattr(metrics, '_profiles', metrics.OrderedDict())
+    pid = os.fork()
+    if pid == 0:
+        try:
+            profiler = metrics.Profiler()
+            profiler.samples = {'api_server.py:chat:1;orchestrator.py:analyze:2': 3}
+            metrics._store_profile(profiler)
+            with open(os.path.join(store.directory, 'id'), 'w') as f:
+                f.write(profiler.id)
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+    with open(os.path.join(store.directory, 'id')) as f:
+        profile_id = f.read()
+
+    assert metrics.get_profile(profile_id) is None
+    assert metrics.folded_profile(profile_id) == 'api_server.py:chat:1;orchestrator.py:analyze:2 3\n'
+    assert metrics.folded_profile('../archive') is None
+
+
+def test_only_the_newest_profiles_are_kept(store, monkeypatch):
+    monkeypatch.setattr(metrics, 'MAX_PROFILES', 3)
+    for i in range(5):
+        store.save_profile(f'{i:012x}', f'stack {i}\n')
+        os.utime(os.path.join(store.directory, metrics.PROFILES_DIR, f'{i:012x}.folded'), (i, i))
+    assert sorted(os.listdir(os.path.join(store.directory, metrics.PROFILES_DIR))) == \
+        [f'{i:012x}.folded' for i in (2, 3, 4)]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+
+def test_analyze_end_to_end(orchestrator):
+    result = orchestrator.analyze("I have chest pain and breathlessness with a high fever", age=58, sex='M')
+    assert result['success'], result.get('error')
+    assert result['overall_triage']['level'] == 'Emergency'
+    assert result['diagnoses']
+    top = result['diagnoses'][0]
+    assert top['urgency']['level'] and isinstance(top['precautions'], list)
+    assert result['mapped_precautions']['disease'] == top['name']
+    assert result['knowledge_version'] == orchestrator.knowledge.current().version
+
+
+def test_triage_levels(orchestrator):
+    assert orchestrator.analyze("my father is unconscious")['overall_triage']['level'] == 'Emergency'
+    assert orchestrator.analyze("I keep vomiting")['overall_triage']['level'] == 'Urgent'
+    assert orchestrator.analyze("I have an itchy skin rash")['overall_triage']['level'] == 'Standard'
+
+
+CONSULTATIONS = [
+    "fever, cough and headache",
+    "itching and a skin rash with nodal skin eruptions",
+    "vomiting, diarrhoea and stomach pain since yesterday",
+    "joint pain, fatigue and high fever",
+    "burning micturition and bladder discomfort",
+]
+
+
+def test_analyze_ranks_like_the_full_matcher(orchestrator):
+    matcher = orchestrator.knowledge.current().disease_matcher
+    for transcript in CONSULTATIONS:
+        result = orchestrator.analyze(transcript)
+        symptoms = [s['name'] for s in result['symptoms_extracted']]
+        assert len(symptoms) >= 2, transcript
+        expected = [d['name'] for d in matcher.find_matching_diseases(symptoms)][:matcher.top_k]
+        assert [d['name'] for d in result['diagnoses']] == expected, transcript
+
+
+def test_analyze_many_matches_analyze(orchestrator):
+    records = [{'transcript': t, 'age': 30, 'sex': 'F'} for t in CONSULTATIONS * 2]
+    orchestrator.analysis_cache.clear()
+    batch = orchestrator.analyze_many(records)
+    for record, result in zip(records, batch):
+        single = orchestrator.analyze(record['transcript'], record['age'], record['sex'])
+        assert result['success'] and single['success']
+        assert [(d['name'], d['match_count']) for d in result['diagnoses']] == \
+               [(d['name'], d['match_count']) for d in single['diagnoses']]
+        assert result['overall_triage'] == single['overall_triage']
+
+
+def test_symptoms_extracted_through_the_pipeline(orchestrator):
+    text = "Mujhe bukhar hai, a skin rash and I have been vomitting"
+    result = orchestrator.analyze(text)
+    extracted = result['symptoms_extracted']
+    assert [s['name'] for s in extracted] == ['high_fever', 'skin_rash', 'vomiting']
+    for s in extracted:
+        assert text[s['start']:s['end']] == s['text']
+    # Longest match: "skin rash" is one symptom, not "rash" plus something else
+    assert extracted[1]['text'] == 'skin rash'
+
+
+def test_indic_symptoms_through_the_pipeline(orchestrator):
+    assert 'high_fever' in [s['name'] for s in orchestrator.analyze('मुझे बुखार है')['symptoms_extracted']]
+    assert 'cough' in [s['name'] for s in orchestrator.analyze('ਮੈਨੂੰ ਖੰਘ ਹੈ')['symptoms_extracted']]
+
+
+def test_cached_results_are_not_shared_between_calls(orchestrator):
+    transcript = 'I have high fever, headache and vomiting'
+    first = orchestrator.analyze(transcript)
+    first['diagnoses'][0]['name'] = 'edited'
+    first['diagnoses'][0]['precautions'].append('edited')
+    first['diagnoses'].clear()
+    first['overall_triage']['level'] = 'edited'
+    first['mapped_precautions']['precautions'].clear()
+
+    for second in (orchestrator.analyze(transcript), orchestrator.analyze_many([{'transcript': transcript}])[0]):
+        assert second['diagnoses'] and second['diagnoses'][0]['name'] != 'edited'
+        assert 'edited' not in second['diagnoses'][0]['precautions']
+        assert second['overall_triage']['level'] != 'edited'
+        assert second['mapped_precautions']['precautions']
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+from medicine.pharmacy_index import PharmacyIndex, haversine_km
+
+
+def _random_index(seed: int, n_pharmacies: int = 400, holder_share: float = 0.5):
+    rng = random.Random(seed)
+    pharmacies = [
+        {'pharmacy_id': f'P{i}', 'pharmacy_name': f'Pharmacy {i}',
+         'latitude': 30.3 + rng.uniform(-1.5, 1.5), 'longitude': 76.1 + rng.uniform(-1.5, 1.5)}
+        for i in range(n_pharmacies)
+    ]
+    stock = [
+        {'pharmacy_id': p['pharmacy_id'], 'medicine_name': 'Paracetamol', 'quantity': rng.choice([0, 0, 3, 20])}
+        for p in pharmacies if rng.random() < holder_share
+    ]
+    return PharmacyIndex(pharmacies, stock), rng
+
+
+def _brute_force(index, lat, lon, radius_km, k):
+    scored = []
+    for pid, entry in index.stock['paracetamol'].items():
+        if entry['quantity'] <= 0:
+            continue
+        p = index.pharmacies[pid]
+        d = haversine_km(lat, lon, p['latitude'], p['longitude'])
+        if radius_km is None or d <= radius_km:
+            scored.append((d, pid))
+    return [pid for _, pid in sorted(scored)[:k]]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('radius_km', [None, 25.0, 80.0])
+def test_grid_walk_matches_brute_force(seed, radius_km):
+    index, rng = _random_index(seed)
+    for _ in range(20):
+        lat, lon = 30.3 + rng.uniform(-2, 2), 76.1 + rng.uniform(-2, 2)
+        found = [r['pharmacy_id'] for r in index.nearest('Paracetamol', lat, lon, radius_km, k=5)]
+        assert found == _brute_force(index, lat, lon, radius_km, 5)
+
+
+def test_small_holder_list_matches_brute_force():
+    index, rng = _random_index(9, n_pharmacies=40, holder_share=0.3)
+    for _ in range(20):
+        lat, lon = 30.3 + rng.uniform(-2, 2), 76.1 + rng.uniform(-2, 2)
+        found = [r['pharmacy_id'] for r in index.nearest('paracetamol', lat, lon, k=5)]
+        assert found == _brute_force(index, lat, lon, None, 5)
+
+
+def test_sold_out_pharmacies_are_skipped():
+    index = PharmacyIndex(
+        [{'pharmacy_id': 'A', 'latitude': 30.0, 'longitude': 76.0},
+         {'pharmacy_id': 'B', 'latitude': 30.5, 'longitude': 76.5}],
+        [{'pharmacy_id': 'A', 'medicine_name': 'ORS', 'quantity': 5},
+         {'pharmacy_id': 'B', 'medicine_name': 'ORS', 'quantity': 5}],
+    )
+    index.adjust_stock('A', 'ORS', -5)
+    assert [r['pharmacy_id'] for r in index.nearest('ors', 30.0, 76.0)] == ['B']
+    assert [r['pharmacy_id'] for r in index.nearest('ors')] == ['B']
+
+
+def test_without_location_most_stock_first():
+    index, _ = _random_index(3)
+    results = index.nearest('Paracetamol', k=10)
+    assert all(r['quantity'] > 0 and r['distance_km'] is None for r in results)
+    assert [r['quantity'] for r in results] == sorted((r['quantity'] for r in results), reverse=True)
+
+
+def test_clone_isolates_readers():
+    index, _ = _random_index(4, n_pharmacies=20, holder_share=1.0)
+    before = {pid: e['quantity'] for pid, e in index.stock['paracetamol'].items()}
+    updated = index.clone()
+    updated.set_stock('P0', 'Paracetamol', 99)
+    assert {pid: e['quantity'] for pid, e in index.stock['paracetamol'].items()} == before
+    assert updated.stock['paracetamol']['P0']['quantity'] == 99
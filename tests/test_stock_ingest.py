@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import csv
+
+import pytest
+
+from src.medicine.medicine_service import MedicineService
+
+STOCK_FIELDS = ['pharmacy_id', 'pharmacy_name', 'address', 'phone', 'latitude', 'longitude',
+                'village', 'medicine_name', 'quantity', 'price']
+
+
+@pytest.fixture
+def stock_files(tmp_path):
+    stock_path = tmp_path / 'pharmacy_stock.csv'
+    with open(stock_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, STOCK_FIELDS)
+        writer.writeheader()
+        writer.writerow({'pharmacy_id': 'P1', 'pharmacy_name': 'Nabha Medicos', 'latitude': 30.37,
+                         'longitude': 76.15, 'medicine_name': 'Paracetamol', 'quantity': 10, 'price': 2})
+        writer.writerow({'pharmacy_id': 'P2', 'pharmacy_name': 'City Chemist', 'latitude': 30.40,
+                         'longitude': 76.20, 'medicine_name': 'ORS', 'quantity': 5, 'price': 20})
+    return str(stock_path), str(tmp_path / 'stock_deltas.ndjson')
+
+
+def _quantity(service, pharmacy_id, medicine):
+    service.ingestor.sync()
+    return service.index.stock[medicine.lower()][pharmacy_id]['quantity']
+
+
+def test_deltas_reach_every_worker(stock_files):
+    # Two services on one log stand in for two gunicorn workers
+    worker_a, worker_b = MedicineService(*stock_files), MedicineService(*stock_files)
+    result = worker_a.apply_stock_updates([
+        {'pharmacy_id': 'P1', 'medicine_name': 'Paracetamol', 'delta': -3},
+        {'pharmacy_id': 'P2', 'medicine_name': 'Paracetamol', 'quantity': 40},
+    ])
+    assert result['applied'] == 2
+    assert _quantity(worker_a, 'P1', 'Paracetamol') == 7
+    assert _quantity(worker_b, 'P1', 'Paracetamol') == 7
+    search = worker_b.search_medicine('Paracetamol')
+    assert [p['pharmacy_id'] for p in search['pharmacies']] == ['P2', 'P1']
+
+
+def test_relative_deltas_from_both_workers_add_up(stock_files):
+    worker_a, worker_b = MedicineService(*stock_files), MedicineService(*stock_files)
+    worker_a.apply_stock_updates([{'pharmacy_id': 'P1', 'medicine_name': 'Paracetamol', 'delta': -2}])
+    worker_b.apply_stock_updates([{'pharmacy_id': 'P1', 'medicine_name': 'Paracetamol', 'delta': -5}])
+    assert _quantity(worker_a, 'P1', 'Paracetamol') == 3
+    assert _quantity(worker_b, 'P1', 'Paracetamol') == 3
+
+
+def test_restart_replays_the_log(stock_files):
+    MedicineService(*stock_files).apply_stock_updates([
+        {'op': 'pharmacy', 'pharmacy_id': 'P9', 'pharmacy_name': 'New Store', 'latitude': 30.3, 'longitude': 76.1},
+        {'pharmacy_id': 'P9', 'medicine_name': 'Cetirizine', 'quantity': 12},
+        {'pharmacy_id': 'P1', 'medicine_name': 'Paracetamol', 'delta': 4},
+    ])
+    restarted = MedicineService(*stock_files)
+    assert 'P9' in restarted.index.pharmacies
+    assert _quantity(restarted, 'P9', 'Cetirizine') == 12
+    assert _quantity(restarted, 'P1', 'Paracetamol') == 14
+
+
+def test_rejected_deltas_are_not_logged(stock_files):
+    worker = MedicineService(*stock_files)
+    result = worker.apply_stock_updates([
+        {'pharmacy_id': 'P404', 'medicine_name': 'ORS', 'quantity': 1},
+        {'pharmacy_id': 'P2', 'medicine_name': 'ORS', 'delta': 1},
+    ])
+    assert (result['applied'], result['rejected']) == (1, 1)
+    with open(stock_files[1], encoding='utf-8') as f:
+        assert len(f.read().splitlines()) == 1
+    assert _quantity(MedicineService(*stock_files), 'P2', 'ORS') == 6
+
+
+def test_truncated_log_rebuilds_from_csv(stock_files):
+    worker = MedicineService(*stock_files)
+    worker.apply_stock_updates([{'pharmacy_id': 'P1', 'medicine_name': 'Paracetamol', 'delta': -4}])
+    # Compacted: the earlier delta is now folded away, a shorter log remains
+    with open(stock_files[1], 'w', encoding='utf-8') as f:
+        f.write('{"pharmacy_id": "P1", "medicine_name": "Paracetamol", "delta": 1}\n')
+    assert _quantity(worker, 'P1', 'Paracetamol') == 11
+
+
+def test_drop_file_is_applied_once_and_reaches_every_worker(stock_files, tmp_path):
+    drop_dir = tmp_path / 'drop'
+    drop_dir.mkdir()
+    (drop_dir / 'batch1.ndjson').write_text(
+        '{"pharmacy_id": "P2", "medicine_name": "ORS", "delta": -1}\n', encoding='utf-8')
+    workers = [MedicineService(*stock_files) for _ in range(3)]
+    claimed = [worker.ingestor.ingest_drop_files(str(drop_dir)) for worker in workers]
+    assert sorted(claimed) == [0, 0, 1]
+    assert not (drop_dir / 'batch1.ndjson').exists()
+    assert (drop_dir / 'processed' / 'batch1.ndjson').exists()
+    # Applied exactly once, visible everywhere
+    assert [_quantity(worker, 'P2', 'ORS') for worker in workers] == [4, 4, 4]
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from nlp.symptom_extractor import SymptomExtractor, tokenize
+
+
+def test_multiword_patterns_prefer_longest(extractor):
+    assert extractor.extract_symptoms('I have a skin rash and a high fever') == ['skin_rash', 'high_fever']
+
+
+def test_lexicon_synonyms_and_offsets(extractor):
+    text = 'Mujhe bukhar hai and my tummy hurts'
+    matches, tokens = extractor.scan(text)
+    assert 'high_fever' in [m['symptom'] for m in matches]
+    for m in matches:
+        assert text[m['start']:m['end']] == m['text']
+    assert tokens == tokenize(text)
+
+
+def test_overlapping_matches_resolved_leftmost_longest():
+    extractor = SymptomExtractor(['pain', 'chest_pain', 'pain_behind_the_eyes'], fuzzy=False)
+    assert extractor.extract_symptoms('chest pain behind the eyes') == ['chest_pain']
+
+
+def test_devanagari_and_gurmukhi(extractor):
+    assert 'high_fever' in extractor.extract_symptoms('मुझे बुखार है')
+    assert 'cough' in extractor.extract_symptoms('ਮੈਨੂੰ ਖੰਘ ਹੈ')
+
+
+@pytest.mark.parametrize('text, symptom', [
+    ('I have been vomitting all night', 'vomiting'),
+    ('bad hedache since morning', 'headache'),
+    ('sharp chest pian', 'chest_pain'),
+])
+def test_misspellings_are_corrected(extractor, text, symptom):
+    assert symptom in extractor.extract_symptoms(text)
+
+
+@pytest.mark.parametrize('word', ['again', 'could', 'more', 'good', 'food', 'less', 'four', 'tried', 'never', 'told'])
+def test_common_words_are_not_corrected(extractor, word):
+    # Each is one edit from a symptom word (gain, cold, sore, mood, legs, foul, tired, fever)
+    assert word not in extractor.vocabulary
+    assert extractor._correct(word) is None
+
+
+@pytest.mark.parametrize('word, near', [
+    ('paint', 'pain'), ('pair', 'pain'), ('noise', 'nose'), ('chess', 'chest'), ('cheat', 'chest'),
+    ('rush', 'rash'), ('lover', 'liver'), ('tied', 'tired'), ('fist', 'fast'), ('logs', 'legs'),
+    ('garden', 'gardan'), ('threat', 'throat'),
+])
+def test_words_one_consonant_edit_away_are_not_corrected(extractor, word, near):
+    # Nothing lists these words: a short token must differ from a symptom word by a typing slip
+    assert word not in extractor.vocabulary
+    assert near in extractor.fuzzy_index.closest(word)
+    assert extractor._correct(word) is None
+
+
+@pytest.mark.parametrize('token, word', [
+    ('pian', 'pain'), ('fevr', 'fever'), ('cugh', 'cough'), ('painn', 'pain'), ('pains', 'pain'),
+    ('swolen', 'swollen'), ('itchng', 'itching'), ('diarhea', 'diarrhea'),
+])
+def test_short_tokens_are_corrected_only_for_slips(extractor, token, word):
+    assert extractor._correct(token) == word
+
+
+def test_correction_keeps_first_letter(extractor):
+    # "gone" -> "one" and "hold" -> "cold" would change the first letter
+    for word in ('gone', 'hold', 'mean'):
+        corrected = extractor._correct(word)
+        assert corrected is None or corrected[0] == word[0]
+
+
+@pytest.mark.parametrize('text, wrong', [
+    ('I lost weight again', 'weight_gain'),
+    ('the food was good', 'mood_swings'),
+    ('I could not eat', 'cold_hands_and_feets'),
+    ('more than four days', 'foul_smell_of urine'),
+])
+def test_no_symptoms_from_ordinary_words(extractor, text, wrong):
+    assert wrong not in extractor.extract_symptoms(text)
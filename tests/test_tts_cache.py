@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import os
+
+from tts_cache import TTSCache, cache_key
+
+
+def _files(directory):
+    return sorted(name for _, _, names in os.walk(directory) for name in names if not name.startswith('.'))
+
+
+def test_variants_survive_reindexing(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=10_000)
+    key = cache_key('Drink plenty of water')
+    cache.put(key, b'W' * 100)
+    variant = cache.get_variant(key, 'ulaw', 'wav', lambda wav: b'U' * 50)
+    assert os.path.basename(variant) == f'{key}.ulaw.wav'
+
+    restarted = TTSCache(str(tmp_path), max_bytes=10_000)
+    assert restarted.stats()['entries'] == 2
+    assert restarted.stats()['bytes'] == 150
+
+    transcoded = []
+    path = restarted.get_variant(key, 'ulaw', 'wav', lambda wav: transcoded.append(wav) or b'U' * 50)
+    assert path == variant and not transcoded
+    assert restarted.stats()['bytes'] == 150
+
+
+def test_eviction_after_restart_removes_variant_files(tmp_path):
+    cache = TTSCache(str(tmp_path), max_bytes=10_000)
+    key = cache_key('Rest well')
+    cache.put(key, b'W' * 100)
+    cache.get_variant(key, 'opus', 'ogg', lambda wav: b'O' * 60)
+    cache.get_variant(key, 'ulaw', 'wav', lambda wav: b'U' * 50)
+
+    # Shrinking the bound evicts on load; every evicted entry's file must go with it
+    small = TTSCache(str(tmp_path), max_bytes=60)
+    remaining = _files(tmp_path)
+    assert small.stats()['bytes'] == sum(os.path.getsize(p) for p in
+                                         (small._path(k) for k in small._index))
+    assert len(remaining) == small.stats()['entries'] <= 1
+
+
+def test_filename_round_trip():
+    key = cache_key('hello')
+    for k in (key, f'{key}.ulaw.wav', f'{key}.opus.ogg', f'{key}.mp3'):
+        assert TTSCache._key(TTSCache._filename(k)) == k
+
+
+def test_clip_stored_by_another_worker_is_a_hit(tmp_path):
+    # Both caches index the empty directory at startup, as two gunicorn workers would
+    a = TTSCache(str(tmp_path), max_bytes=10_000)
+    b = TTSCache(str(tmp_path), max_bytes=10_000)
+    key = cache_key('Take rest')
+    path = a.put(key, b'W' * 100)
+
+    assert b.get_path(key) == path
+    assert b.stats()['entries'] == 1 and b.stats()['hits'] == 1
+    os.remove(path)
+    assert b.get_path(key) is None
+    assert b.stats()['entries'] == 0
+
+
+def test_size_bound_covers_every_worker(tmp_path, monkeypatch):
+    import tts_cache
+    monkeypatch.setattr(tts_cache, 'TTS_CACHE_SCAN_SECONDS', 0)
+    a = TTSCache(str(tmp_path), max_bytes=250)
+    b = TTSCache(str(tmp_path), max_bytes=250)
+    first = cache_key('one')
+    a.put(first, b'1' * 100)
+    os.utime(a._path(first), (1, 1))
+    b.put(cache_key('two'), b'2' * 100)
+    a.put(cache_key('three'), b'3' * 100)
+
+    # 300 bytes across two processes: the oldest clip goes, whoever stored it
+    assert sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(tmp_path)
+               for name in names) == 200
+    assert not os.path.exists(a._path(first))
+    assert b.get_path(first) is None
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import copy
+import json
+import pickle
+
+import pytest
+
+from rules.urgency_table import FrozenDict, UrgencyTable
+
+
+@pytest.fixture
+def table():
+    return UrgencyTable(['Heart attack', 'Common Cold'])
+
+
+def test_responses_are_shared_and_read_only(table):
+    response = table.lookup('Heart attack', 5)
+    assert response is table.lookup('Heart attack', 4)
+    with pytest.raises(TypeError):
+        response['level'] = 'Mild'
+
+
+def test_responses_copy_and_pickle(table):
+    response = table.lookup('Common Cold', 2)
+
+    for copied in (copy.copy(response), copy.deepcopy(response), copy.deepcopy({'urgency': response})['urgency']):
+        assert type(copied) is dict and copied == response
+        copied['level'] = 'edited'
+    assert response['level'] != 'edited'
+
+    restored = pickle.loads(pickle.dumps(response))
+    assert isinstance(restored, FrozenDict) and restored == response
+    assert json.loads(json.dumps(response, ensure_ascii=False)) == response
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+import time
+
+import pytest
+
+import voice_jobs
+from voice_jobs import VoiceJobQueue, VoiceQueueFull
+
+
+# Stand-ins for the speech tasks; module level so the spawned pool can import them
+
+def fake_speak(text, language=None):
+    if text == 'slow':
+        time.sleep(1.0)
+    return f'{language}:{text}'.encode('utf-8')
+
+
+def fake_transcribe(audio, language=None):
+    return language or 'en', audio.decode('utf-8')
+
+
+TASKS = {'speak': fake_speak, 'transcribe': fake_transcribe}
+
+
+@pytest.fixture
+def queues(tmp_path):
+    """Queues of two server processes sharing one job database"""
+    created = []
+
+    def make(**kwargs):
+        queue = VoiceJobQueue(str(tmp_path / 'voice_jobs.db'), tasks=TASKS, initializer=None,
+                              **{'workers': 1, 'queue_size': 4, **kwargs})
+        created.append(queue)
+        return queue
+    yield make
+    for queue in created:
+        queue.shutdown()
+
+
+def _wait_for_pool(*queues, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        owners = [q for q in queues if q.stats()['runs_pool']]
+        if owners:
+            return owners
+        time.sleep(0.05)
+    raise AssertionError('no process took the voice pool')
+
+
+def test_job_is_visible_from_every_process(queues):
+    a, b = queues(), queues()
+    assert len(_wait_for_pool(a, b)) == 1
+
+    job = a.submit('transcribe', 'mujhe bukhar hai'.encode('utf-8'), 'hi')
+    finished = b.wait(job.id, 30)
+    assert finished.status == 'done'
+    assert b.result(finished) == ('hi', 'mujhe bukhar hai')
+    assert b.run('speak', 'namaste', 'pa', timeout=30) == b'pa:namaste'
+    assert b.get('no-such-job') is None
+
+
+def test_queue_bound_is_shared(queues):
+    a, b = queues(queue_size=2), queues(queue_size=2)
+    _wait_for_pool(a, b)
+    a.submit('speak', 'slow')
+    a.submit('speak', 'slow')
+    with pytest.raises(VoiceQueueFull):
+        b.submit('speak', 'hello')
+    assert b.stats()['pending'] == 2
+
+
+def test_pool_moves_to_another_process(queues, monkeypatch):
+    monkeypatch.setattr(voice_jobs, 'TAKEOVER_SECONDS', 0.1)
+    a, b = queues(), queues()
+    owner, = _wait_for_pool(a, b)
+    other = b if owner is a else a
+
+    running = owner.submit('speak', 'slow')
+    assert owner.wait(running.id, 0.5).status == 'running'
+    owner.shutdown()
+
+    # The job the old pool was running can never finish; new jobs run in the new pool
+    assert _wait_for_pool(other) == [other]
+    assert other.get(running.id).status == 'failed'
+    assert other.run('speak', 'hello', 'en', timeout=30) == b'en:hello'
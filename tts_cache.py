@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Content-addressed cache of synthesized speech.
+Audio is stored on disk under the SHA-256 of (text, language, voice, rate)
+and indexed in memory in LRU order; the total size is bounded and the least
+recently used clips are evicted first. Cached clips are served straight from
+disk with send_file, so a hit costs no synthesis and no copy into Python.
+
+The directory is shared by every server worker and by --prewarm: a clip
+another process wrote is adopted on first use, hits touch the file's mtime
+so recency is visible to all of them, and the size bound is applied to the
+whole directory by rescanning it when this process stores a clip.
+
+Pre-warm every precaution and urgency action ahead of time with:
+    python tts_cache.py --prewarm
+"""
+
+import os
+import sys
+import hashlib
+import tempfile
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TTS_CACHE_DIR = os.environ.get('SEHAT_TTS_CACHE_DIR', os.path.join(BASE_DIR, 'cache', 'tts'))
+TTS_CACHE_MAX_BYTES = int(float(os.environ.get('SEHAT_TTS_CACHE_MB', '256')) * 1024 * 1024)
+# How often put() rescans the directory for clips other processes stored
+TTS_CACHE_SCAN_SECONDS = float(os.environ.get('SEHAT_TTS_CACHE_SCAN_SECONDS', '30'))
+
+# Speech rate VoiceProcessor synthesizes at; part of the cache key
+DEFAULT_RATE = 150
+
+GREETINGS = [
+    "Hello! I am your health assistant. Please tell me about your symptoms.",
+    "Please consult a qualified doctor for a proper diagnosis.",
+    "In an emergency, call 102 immediately.",
+]
+
+
+def cache_key(text: str, language: str = 'en', voice: str = 'default', rate: int = DEFAULT_RATE) -> str:
+    """Content address of a synthesized clip"""
+    material = '\0'.join([text.strip(), language or 'en', voice or 'default', str(rate)])
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class TTSCache:
+    """Size-bounded disk cache of WAV clips with an in-memory LRU index"""
+
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._index: 'OrderedDict[str, int]' = OrderedDict()
+        self._total = 0
+        self._scanned = 0.0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._load_index()
+
+    @staticmethod
+    def _filename(key: str) -> str:
+        # Plain keys are WAV clips; encoded variants ("<key>.<codec>.<ext>") are stored under their key
+        return key if '.' in key else f"{key}.wav"
+
+    @staticmethod
+    def _key(filename: str) -> str:
+        """Inverse of _filename"""
+        stem = filename[:-4] if filename.endswith('.wav') else filename
+        return stem if '.' not in stem else filename
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], self._filename(key))
+
+    def _load_index(self) -> None:
+        """Rebuild the LRU index from disk, least recently used files first"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.startswith('.'):
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except OSError:
+                        continue  # evicted by another process mid-scan
+                    entries.append((st.st_mtime, self._key(name), st.st_size))
+        self._index.clear()
+        self._total = 0
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self._total += size
+        self._scanned = time.monotonic()
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._total > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def get_path(self, key: str) -> Optional[str]:
+        """Path of a cached clip, or None on a miss"""
+        path = self._path(key)
+        with self._lock:
+            try:
+                # Touch on every hit so the LRU order on disk is shared by all processes
+                os.utime(path)
+                size = os.path.getsize(path)
+            except OSError:
+                # Never stored, or another process evicted it
+                self._total -= self._index.pop(key, 0)
+                self.misses += 1
+                return None
+            if key not in self._index:
+                # Stored by another worker or by --prewarm since the last scan
+                self._index[key] = size
+                self._total += size
+            self._index.move_to_end(key)
+            self.hits += 1
+            return path
+
+    def put(self, key: str, audio: bytes) -> str:
+        """Store a clip atomically and return its path"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tts-')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(audio)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._total -= self._index.pop(key, 0)
+            self._index[key] = len(audio)
+            self._total += len(audio)
+            if time.monotonic() - self._scanned >= TTS_CACHE_SCAN_SECONDS:
+                # Count what the other processes stored before applying the bound
+                self._load_index()
+            else:
+                self._evict()
+        return path
+
+    def get_variant(self, key: str, codec: str, extension: str, encode: Callable[[bytes], bytes]) -> Optional[str]:
+        """Path of the clip for key in another encoding, transcoding the cached WAV on a miss"""
+        variant = f"{key}.{codec}.{extension}"
+        path = self.get_path(variant)
+        if path:
+            return path
+        source = self.get_path(key)
+        if source is None:
+            return None
+        with open(source, 'rb') as f:
+            audio = encode(f.read())
+        return self.put(variant, audio)
+
+    def get_or_synthesize(self, text: str, synthesize: Callable[[str, str], bytes], language: str = 'en',
+                          voice: str = 'default', rate: int = DEFAULT_RATE) -> Optional[str]:
+        """Path of the clip for text, synthesizing and storing it on a miss"""
+        key = cache_key(text, language, voice, rate)
+        path = self.get_path(key)
+        if path:
+            return path
+        audio = synthesize(text, language)
+        if not audio:
+            return None
+        return self.put(key, audio)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'entries': len(self._index),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+# Global TTS cache instance
+_tts_cache = None
+_tts_cache_lock = threading.Lock()
+
+def get_tts_cache() -> TTSCache:
+    """Get or create the process-wide TTS cache"""
+    global _tts_cache
+    if _tts_cache is None:
+        with _tts_cache_lock:
+            if _tts_cache is None:
+                _tts_cache = TTSCache()
+    return _tts_cache
+
+
+def prewarm_texts() -> List[str]:
+    """Every precaution, urgency action and greeting the API is likely to speak"""
+    sys.path.insert(0, BASE_DIR)
+    import orchestrator
+    texts: List[str] = list(GREETINGS)
+    texts += orchestrator.urgency_table.actions()
+    for precautions in orchestrator.precaution_loader.precautions.values():
+        texts += precautions
+    return list(dict.fromkeys(t.strip() for t in texts if t and t.strip()))
+
+
+def prewarm(language: str = 'en') -> int:
+    """Synthesize every prewarm text that is not cached yet; returns how many were added"""
+    from voice_processor import get_voice_processor
+    voice_processor = get_voice_processor()
+    cache = get_tts_cache()
+    added = 0
+    for text in prewarm_texts():
+        key = cache_key(text, language)
+        if cache.get_path(key):
+            continue
+        audio = voice_processor.text_to_speech(text, language)
+        if audio:
+            cache.put(key, audio)
+            added += 1
+    return added
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sehat Nabha TTS cache")
+    parser.add_argument('--prewarm', action='store_true', help="Synthesize precautions, urgency actions and greetings")
+    parser.add_argument('--language', default='en')
+    args = parser.parse_args()
+
+    if args.prewarm:
+        print(f"[TTS cache] Added {prewarm(args.language)} clips")
+    print(f"[TTS cache] {get_tts_cache().stats()}")
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Voice job subsystem.
+Runs CPU-heavy transcription and text-to-speech in a bounded process pool so
+they never block chat requests. Jobs get an ID immediately; callers poll or
+stream the result. When the queue is full, submit() raises VoiceQueueFull so
+the API can answer 429.
+
+Jobs live in a SQLite database (WAL) shared by every server process, so a
+job submitted to one gunicorn worker can be polled through any other, and
+the queue bound (SEHAT_VOICE_QUEUE_SIZE) holds for the whole server. The
+server has one pool of SEHAT_VOICE_WORKERS processes: the server process
+holding an exclusive lock next to the database runs it and dispatches
+queued jobs to it; when that process exits, another one takes over.
+"""
+
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no multi-process serving, every process runs its own pool
+    fcntl = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+VOICE_WORKERS = int(os.environ.get('SEHAT_VOICE_WORKERS', str(min(os.cpu_count() or 1, 4))))
+VOICE_QUEUE_SIZE = int(os.environ.get('SEHAT_VOICE_QUEUE_SIZE', '16'))
+JOB_TTL_SECONDS = float(os.environ.get('SEHAT_VOICE_JOB_TTL', '300'))
+VOICE_JOBS_DB_PATH = os.environ.get('SEHAT_VOICE_JOBS_DB', os.path.join(BASE_DIR, 'records', 'voice_jobs.db'))
+
+# How often waiting callers and the dispatcher look at the database, and how
+# often a process without the pool checks whether it should take it over
+POLL_SECONDS = 0.05
+TAKEOVER_SECONDS = 1.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    kind        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    payload     BLOB,
+    language    TEXT,
+    result      BLOB,
+    error       TEXT,
+    created_at  REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs (status, created_at);
+"""
+
+_PENDING = ('queued', 'running')
+
+
+class VoiceQueueFull(Exception):
+    """Raised when the voice queue has no free slot"""
+
+
+# Worker-side functions (run inside pool processes, must be module level)
+
+def _init_worker() -> None:
+    """Load every speech model once so jobs never pay for model loading"""
+    import speech_recognizer
+    speech_recognizer.installed_languages()
+
+
+def _run_transcribe(audio_data: bytes, language_hint: Optional[str] = None) -> Tuple[str, str]:
+    from voice_processor import get_voice_processor
+    return get_voice_processor().detect_language(audio_data, language_hint)
+
+
+def _run_speak(text: str, language: Optional[str] = None) -> bytes:
+    from voice_processor import get_voice_processor
+    return get_voice_processor().text_to_speech(text, language)
+
+
+_TASKS = {
+    'transcribe': _run_transcribe,
+    'speak': _run_speak,
+}
+
+
+# Job arguments and results as stored: audio and WAV bytes as is, text as UTF-8
+
+def _encode_payload(kind: str, data: Any) -> bytes:
+    return data.encode('utf-8') if kind == 'speak' else bytes(data)
+
+
+def _decode_payload(kind: str, payload: bytes) -> Any:
+    return payload.decode('utf-8') if kind == 'speak' else payload
+
+
+def _encode_result(kind: str, result: Any) -> Optional[bytes]:
+    if kind == 'speak':
+        return result
+    return json.dumps(list(result), ensure_ascii=False).encode('utf-8')
+
+
+def _decode_result(kind: str, result: Optional[bytes]) -> Any:
+    if kind == 'speak' or result is None:
+        return result
+    return tuple(json.loads(result.decode('utf-8')))
+
+
+class VoiceJob:
+    """One voice job as last read from the job database"""
+
+    __slots__ = ('id', 'kind', 'status', 'error', 'created_at', 'finished_at')
+
+    def __init__(self, id: str, kind: str, status: str, error: Optional[str],
+                 created_at: float, finished_at: Optional[float]):
+        self.id = id
+        self.kind = kind
+        self.status = status
+        self.error = error
+        self.created_at = created_at
+        self.finished_at = finished_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status not in _PENDING
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class VoiceJobQueue:
+    """Shared job database plus, in one server process, the worker pool that runs the jobs"""
+
+    def __init__(self, path: str = VOICE_JOBS_DB_PATH, workers: int = VOICE_WORKERS,
+                 queue_size: int = VOICE_QUEUE_SIZE, job_ttl: float = JOB_TTL_SECONDS,
+                 tasks: Optional[Dict[str, Callable]] = None,
+                 initializer: Optional[Callable[[], None]] = _init_worker):
+        self.path = path
+        self.workers = workers
+        self.queue_size = queue_size
+        self.job_ttl = job_ttl
+        self.submitted = 0
+        self.rejected = 0
+        self._tasks = tasks or _TASKS
+        self._initializer = initializer
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Set when a job is submitted or finishes in this process
+        self._changed = threading.Condition(self._lock)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock_file = None
+        self._running = 0
+        self._stopped = threading.Event()
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        self._thread = threading.Thread(target=self._serve, name='voice-dispatch', daemon=True)
+        self._thread.start()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; writes that read first take the write lock with BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _notify(self) -> None:
+        with self._changed:
+            self._changed.notify_all()
+
+    # Submitting and reading jobs (any server process)
+
+    def submit(self, kind: str, data: Any, language: Optional[str] = None) -> VoiceJob:
+        """Queue a task; raises VoiceQueueFull when every slot of the server is taken"""
+        if kind not in self._tasks:
+            raise ValueError(f"Unknown voice job kind: {kind}")
+        job = VoiceJob(uuid.uuid4().hex, kind, 'queued', None, time.time(), None)
+        conn = self._connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('DELETE FROM jobs WHERE finished_at < ?', (job.created_at - self.job_ttl,))
+            pending = conn.execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', _PENDING).fetchone()[0]
+            if pending >= self.queue_size:
+                conn.execute('COMMIT')
+                with self._lock:
+                    self.rejected += 1
+                raise VoiceQueueFull(f"Voice queue is full ({self.queue_size} jobs pending)")
+            conn.execute(
+                'INSERT INTO jobs (id, kind, status, payload, language, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (job.id, kind, job.status, _encode_payload(kind, data), language, job.created_at),
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        with self._lock:
+            self.submitted += 1
+        self._notify()
+        return job
+
+    def get(self, job_id: str) -> Optional[VoiceJob]:
+        row = self._connection().execute(
+            'SELECT id, kind, status, error, created_at, finished_at FROM jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        return VoiceJob(*row) if row else None
+
+    def wait(self, job_id: str, timeout: Optional[float]) -> Optional[VoiceJob]:
+        """The job once it finishes or timeout elapses (whichever is first); None if unknown"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job.finished:
+                return job
+            remaining = POLL_SECONDS if deadline is None else min(POLL_SECONDS, deadline - time.monotonic())
+            if remaining <= 0:
+                return job
+            # Jobs finished by this process's pool wake the waiter at once
+            with self._changed:
+                self._changed.wait(remaining)
+
+    def result(self, job: VoiceJob) -> Any:
+        """Result of a finished job: WAV bytes for speech, (language, text) for transcription"""
+        if job.status == 'failed':
+            raise RuntimeError(job.error)
+        row = self._connection().execute('SELECT result FROM jobs WHERE id = ?', (job.id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown or expired job {job.id}")
+        return _decode_result(job.kind, row['result'])
+
+    def run(self, kind: str, data: Any, language: Optional[str] = None, timeout: Optional[float] = None) -> Any:
+        """Submit and wait for the result (used by the synchronous endpoints)"""
+        job = self.wait(self.submit(kind, data, language).id, timeout)
+        if job is None or not job.finished:
+            raise TimeoutError(f"Voice job did not finish within {timeout}s")
+        return self.result(job)
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connection()
+        pending = conn.execute('SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)', _PENDING).fetchone()[0]
+        tracked = conn.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'pending': pending,
+                'tracked_jobs': tracked,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'runs_pool': int(self._executor is not None),
+            }
+
+    # Running jobs (the one server process holding the pool lock)
+
+    def _serve(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                if self._executor is None and not self._take_pool():
+                    self._stopped.wait(TAKEOVER_SECONDS)
+                    continue
+                if self._running >= self.workers or not self._dispatch():
+                    with self._changed:
+                        self._changed.wait(POLL_SECONDS)
+            except Exception as e:
+                print(f"[Voice] Dispatcher error: {str(e)}")
+                self._stopped.wait(TAKEOVER_SECONDS)
+
+    def _take_pool(self) -> bool:
+        """Become the process that runs the pool, if no other process is"""
+        if fcntl is not None:
+            lock_file = open(self.path + '.lock', 'a')
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        # Jobs the previous pool was running when its process exited will never finish
+        self._connection().execute(
+            "UPDATE jobs SET status = 'failed', error = ?, payload = NULL, finished_at = ? WHERE status = 'running'",
+            ('The voice worker pool restarted while the job was running', time.time()),
+        )
+        # spawn: forking a threaded server process is unsafe, and each worker
+        # initializes its own TTS engine and keeps its speech models resident
+        self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=self._initializer)
+        print(f"[Voice] Process {os.getpid()} runs the voice worker pool ({self.workers} workers)")
+        return True
+
+    def _dispatch(self) -> bool:
+        """Hand the oldest queued job to the pool; False if none is queued"""
+        conn = self._connection()
+        # An idle pool polls with plain reads; the write lock is taken only to claim a job
+        if conn.execute("SELECT 1 FROM jobs WHERE status = 'queued' LIMIT 1").fetchone() is None:
+            return False
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                "SELECT id, kind, payload, language, created_at FROM jobs WHERE status = 'queued' "
+                "ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return False
+            now = time.time()
+            if row['created_at'] < now - self.job_ttl:
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, payload = NULL, finished_at = ? WHERE id = ?",
+                    ('The job expired before a voice worker was free', now, row['id']),
+                )
+                conn.execute('COMMIT')
+                return True
+            conn.execute("UPDATE jobs SET status = 'running', payload = NULL WHERE id = ?", (row['id'],))
+            conn.execute('COMMIT')
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        with self._lock:
+            self._running += 1
+        future = self._executor.submit(self._tasks[row['kind']], _decode_payload(row['kind'], row['payload']),
+                                       row['language'])
+        future.add_done_callback(lambda f, job_id=row['id'], kind=row['kind']: self._complete(job_id, kind, f))
+        return True
+
+    def _complete(self, job_id: str, kind: str, future: Future) -> None:
+        try:
+            if self._stopped.is_set():
+                # Given up: the process that takes the pool over fails the job
+                return
+            error = RuntimeError('The voice worker pool shut down') if future.cancelled() else future.exception()
+            if error is None:
+                self._connection().execute(
+                    "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                    (_encode_result(kind, future.result()), time.time(), job_id),
+                )
+            else:
+                self._connection().execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ? AND status = 'running'",
+                    (str(error) or type(error).__name__, time.time(), job_id),
+                )
+        except Exception as e:
+            print(f"[Voice] Could not record the result of job {job_id}: {str(e)}")
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._notify()
+
+    def shutdown(self) -> None:
+        """Stop dispatching and give the pool up to another process"""
+        self._stopped.set()
+        self._notify()
+        self._thread.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+
+# Global job queue, created on first use in each server process
+_voice_jobs = None
+_voice_jobs_lock = threading.Lock()
+
+def get_voice_jobs() -> VoiceJobQueue:
+    """Get or create the process-wide voice job queue"""
+    global _voice_jobs
+    if _voice_jobs is None:
+        with _voice_jobs_lock:
+            if _voice_jobs is None:
+                _voice_jobs = VoiceJobQueue()
+    return _voice_jobs
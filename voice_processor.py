@@ -7,13 +7,45 @@ Supports audio recording from microphone and text-to-speech playback
 
 import os
 import sys
-import io
-import wave
-from typing import Tuple
+import tempfile
+import threading
+from typing import Optional, Tuple
 import pyttsx3
 import sounddevice as sd
 import numpy as np
 
+import audio_codec
+import audio_dsp
+import speech_recognizer
+
+
+def _scratch_dir() -> str:
+    """Directory for per-call TTS scratch files; RAM-backed /dev/shm when available"""
+    shm = '/dev/shm'
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return tempfile.gettempdir()
+
+
+SCRATCH_DIR = os.environ.get('SEHAT_TTS_SCRATCH_DIR') or _scratch_dir()
+
+
+# Language names as they appear in voice names/ids (Windows SAPI, macOS)
+TTS_LANGUAGE_NAMES = {'en': 'english', 'hi': 'hindi', 'pa': 'punjabi'}
+
+
+def _speaks(voice, language: str) -> bool:
+    """Whether a pyttsx3 voice speaks language (a code such as 'hi')"""
+    for code in getattr(voice, 'languages', None) or []:
+        # espeak reports b'\x05hi': a priority byte, then the code
+        if isinstance(code, bytes):
+            code = code[1:].decode('ascii', 'ignore')
+        code = str(code).lower().replace('_', '-')
+        if code == language or code.startswith(language + '-'):
+            return True
+    described = f"{voice.id} {voice.name}".lower()
+    return TTS_LANGUAGE_NAMES.get(language, language) in described
+
 
 class VoiceProcessor:
     """Process voice input and output using TTS and microphone recording"""
@@ -22,10 +54,16 @@ class VoiceProcessor:
         """Initialize voice processor with TTS engine"""
         self.tts_engine = pyttsx3.init()
         self.tts_engine.setProperty('rate', 150)  # Slower speech rate for clarity
+        self._default_voice = self.tts_engine.getProperty('voice')
+        # Language code -> installed voice id (None: no voice speaks it, use the default)
+        self._voices = {}
+        # pyttsx3 hands out one engine per process and it is not thread-safe;
+        # parallelism comes from the voice worker processes (voice_jobs.py)
+        self._tts_lock = threading.Lock()
         self.sample_rate = 16000  # Standard 16kHz
         self.channels = 1
         
-    def record_audio(self, duration: int = 5) -> bytes:
+    def record_pcm(self, duration: int = 5) -> np.ndarray:
         """
         Record audio from microphone
         
@@ -33,7 +71,8 @@ class VoiceProcessor:
             duration: Duration in seconds
         
         Returns:
-            Audio data as bytes (WAV format)
+            int16 samples shaped (frames, channels) at self.sample_rate;
+            empty on failure
         """
         try:
             print(f"[Recording] Starting {duration} second recording...")
@@ -44,30 +83,53 @@ class VoiceProcessor:
                              channels=self.channels, 
                              dtype=np.int16)
             sd.wait()
-            
-            # Convert to WAV format
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(self.channels)
-                wav_file.setsampwidth(2)
-                wav_file.setframerate(self.sample_rate)
-                wav_file.writeframes(recording.tobytes())
-            
-            wav_buffer.seek(0)
-            audio_data = wav_buffer.getvalue()
-            print(f"[Recording] Complete. Audio size: {len(audio_data)} bytes")
-            return audio_data
+            print(f"[Recording] Complete. {recording.nbytes} bytes of PCM")
+            return recording
             
         except Exception as e:
             print(f"[Error] Recording failed: {e}")
+            return np.zeros((0, self.channels), dtype=np.int16)
+    
+    def record_audio(self, duration: int = 5, codec: str = 'wav') -> bytes:
+        """
+        Record audio from microphone
+        
+        Args:
+            duration: Duration in seconds
+            codec: Output encoding (see audio_codec.CODECS)
+        
+        Returns:
+            Encoded audio (WAV format by default); empty on failure
+        """
+        recording = self.record_pcm(duration)
+        if not len(recording):
             return b''
+        # Header and samples go straight into one buffer; no BytesIO round trip
+        return audio_codec.encode_pcm(recording, self.sample_rate, codec)
     
-    def text_to_speech(self, text: str) -> bytes:
+    def _voice_for(self, language: Optional[str]) -> Optional[str]:
+        """Id of an installed voice that speaks language (en, hi, pa), or None"""
+        if not language:
+            return None
+        if language not in self._voices:
+            found = None
+            for voice in self.tts_engine.getProperty('voices'):
+                if _speaks(voice, language):
+                    found = voice.id
+                    break
+            if found is None and language != 'en':
+                print(f"[TTS] No installed voice speaks '{language}'; using the default voice")
+            self._voices[language] = found
+        return self._voices[language]
+
+    def text_to_speech(self, text: str, language: Optional[str] = None) -> bytes:
         """
         Convert text to speech using pyttsx3
         
         Args:
             text: Text to convert to speech
+            language: Language code (en, hi, pa); spoken with an installed
+                voice for it, or the default voice if there is none
         
         Returns:
             Audio data as bytes (WAV format)
@@ -79,37 +141,32 @@ class VoiceProcessor:
             
             print(f"[TTS] Converting: {text[:60]}...")
             
-            # Set engine properties
-            self.tts_engine.setProperty('rate', 150)
-            self.tts_engine.setProperty('volume', 1.0)
-            
-            # Create temporary WAV file
-            temp_wav = 'temp_speech.wav'
-            
-            # Clean up if exists
-            if os.path.exists(temp_wav):
+            # Unique scratch file per call so concurrent requests never clobber each other
+            fd, temp_wav = tempfile.mkstemp(suffix='.wav', prefix='tts-', dir=SCRATCH_DIR)
+            os.close(fd)
+            try:
+                with self._tts_lock:
+                    # Set engine properties
+                    self.tts_engine.setProperty('rate', 150)
+                    self.tts_engine.setProperty('volume', 1.0)
+                    self.tts_engine.setProperty('voice', self._voice_for(language) or self._default_voice)
+                    
+                    # Generate speech
+                    self.tts_engine.save_to_file(text, temp_wav)
+                    self.tts_engine.runAndWait()
+                
+                # Read the WAV file
+                with open(temp_wav, 'rb') as f:
+                    wav_data = f.read()
+                if wav_data:
+                    print(f"[TTS] Audio generated. Size: {len(wav_data)} bytes")
+                    return wav_data
+            finally:
                 try:
                     os.remove(temp_wav)
-                except:
+                except OSError:
                     pass
             
-            # Generate speech
-            self.tts_engine.save_to_file(text, temp_wav)
-            self.tts_engine.runAndWait()
-            
-            # Read the WAV file
-            if os.path.exists(temp_wav):
-                try:
-                    with open(temp_wav, 'rb') as f:
-                        wav_data = f.read()
-                    print(f"[TTS] Audio generated. Size: {len(wav_data)} bytes")
-                    return wav_data
-                finally:
-                    try:
-                        os.remove(temp_wav)
-                    except:
-                        pass
-            
             print("[TTS] Failed to generate audio file")
             return b''
             
@@ -134,21 +191,10 @@ class VoiceProcessor:
             
             print("[Playback] Starting playback...")
             
-            # Parse WAV format
-            wav_buffer = io.BytesIO(audio_data)
-            with wave.open(wav_buffer, 'rb') as wav_file:
-                channels = wav_file.getnchannels()
-                sample_width = wav_file.getsampwidth()
-                sample_rate = wav_file.getframerate()
-                frames = wav_file.readframes(wav_file.getnframes())
-            
-            # Convert bytes to numpy array
-            audio_array = np.frombuffer(frames, dtype=np.int16)
-            
-            # Normalize audio
-            max_val = np.max(np.abs(audio_array))
-            if max_val > 0:
-                audio_array = (audio_array / max_val * 32767).astype(np.int16)
+            # View the frames in whatever width/channel layout the file has,
+            # then normalize one float32 buffer in place for playback
+            samples, sample_rate = audio_dsp.read_wav_frames(audio_data)
+            audio_array = audio_dsp.normalize_peak(audio_dsp.to_float32(samples))
             
             # Play audio
             sd.play(audio_array, samplerate=sample_rate)
@@ -161,6 +207,26 @@ class VoiceProcessor:
             print(f"[Error] Playback failed: {e}")
             return False
     
+    def detect_language(self, audio_data: bytes, hint: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Identify the spoken language and transcribe in it
+        
+        Args:
+            audio_data: Audio bytes (WAV or 16-bit mono PCM)
+            hint: Language the client says it spoke ('en', 'Hindi', 'ਪੰਜਾਬੀ', ...);
+                  skips identification when a model for it is installed
+        
+        Returns:
+            (language code, transcript); transcript is empty on failure
+        """
+        try:
+            language, text = speech_recognizer.identify_and_transcribe(audio_data, hint)
+            print(f"[STT] Transcribed {len(audio_data)} bytes as {language}")
+            return language, text
+        except Exception as e:
+            print(f"[Error] Transcription failed: {e}")
+            return speech_recognizer.normalize_language(hint) or speech_recognizer.DEFAULT_LANGUAGE, ''
+    
     def get_available_voices(self) -> list:
         """Get list of available TTS voices"""
         try:
@@ -170,12 +236,15 @@ class VoiceProcessor:
             return []
 
 
-# Global voice processor instance
+# Global voice processor instance (one per process)
 _voice_processor = None
+_voice_processor_lock = threading.Lock()
 
 def get_voice_processor():
     """Get or create global voice processor"""
     global _voice_processor
     if _voice_processor is None:
-        _voice_processor = VoiceProcessor()
+        with _voice_processor_lock:
+            if _voice_processor is None:
+                _voice_processor = VoiceProcessor()
     return _voice_processor
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+WSGI entry point for production serving.
+Importing this module runs warmup, which loads the fork-safe components
+(chat, speech; see components.py), so with preload (gunicorn.conf.py) the
+knowledge structures are built once in the master process and shared
+copy-on-write by every worker. Set SEHAT_LAZY=1 to skip it and load each
+component on first use, and SEHAT_COMPONENTS to serve only some subsystems.
+Each worker polls the data files (SEHAT_KNOWLEDGE_POLL seconds) and swaps in
+rebuilt knowledge when they change; a reloaded worker holds its own copy
+until the next restart brings it back under the shared preload.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python api_server.py --production
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api_server import app, warmup
+
+warmup()
+
+
+def serve(host: str = '0.0.0.0', port: int = 5000):
+    """Run a production server: gunicorn where available, waitress otherwise (Windows)"""
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        BaseApplication = None
+
+    if BaseApplication is None:
+        from waitress import serve as waitress_serve
+        threads = int(os.environ.get('SEHAT_THREADS', '8'))
+        print(f"[WSGI] Serving with waitress on {host}:{port} ({threads} threads)")
+        waitress_serve(app, host=host, port=port, threads=threads,
+                       channel_timeout=int(os.environ.get('SEHAT_TIMEOUT', '60')))
+        return
+
+    class SehatApplication(BaseApplication):
+        def load_config(self):
+            config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn.conf.py')
+            self.load_config_from_file(config_path)
+            self.cfg.set('bind', f"{host}:{port}")
+
+        def load(self):
+            return app
+
+    SehatApplication().run()